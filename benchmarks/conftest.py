@@ -0,0 +1,46 @@
+"""
+Shared data sets of the benchmarks
+
+The data sets resemble vessel positions: random walks of many ships with a fix every few minutes,
+so consecutive positions are close to each other and distances span a realistic range.
+"""
+
+import numpy as np
+import pytest
+
+from latloncalc.arrays import LatLonArray
+
+N_POSITIONS = 10000  # Size of the batched data sets
+N_SCALAR = 1000  # Size of the data sets processed with one object per position
+
+
+def _random_walk(n, seed):
+    rng = np.random.default_rng(seed)
+    lat = np.clip(rng.uniform(-60, 60) + np.cumsum(rng.normal(0, 0.01, n)), -89, 89)
+    lon = (rng.uniform(-180, 180) + np.cumsum(rng.normal(0, 0.01, n)) + 180) % 360 - 180
+    return lat, lon
+
+
+@pytest.fixture(scope="session")
+def positions():
+    """
+    A LatLonArray with N_POSITIONS positions along a track
+    """
+    return LatLonArray(*_random_walk(N_POSITIONS, 1))
+
+
+@pytest.fixture(scope="session")
+def latlons(positions):
+    """
+    A list of N_SCALAR LatLon objects along a track
+    """
+    return positions[:N_SCALAR].to_latlons()
+
+
+@pytest.fixture(scope="session")
+def coordinate_strings(latlons):
+    """
+    Latitude and longitude strings of N_SCALAR positions in degree, minute, second format
+    """
+    strings = [latlon.to_string("d%, %m%, %S%, %H", n_digits_seconds=2) for latlon in latlons]
+    return [lat for lat, _ in strings], [lon for _, lon in strings]
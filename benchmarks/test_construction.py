@@ -0,0 +1,42 @@
+"""
+Benchmarks of the construction and modification of coordinate objects
+"""
+
+from latloncalc.latlon import FrozenLatLon, LatLon, Latitude
+
+
+def test_latlon(benchmark, positions):
+    lat, lon = positions.lat[:1000].tolist(), positions.lon[:1000].tolist()
+    benchmark(lambda: [LatLon(y, x) for y, x in zip(lat, lon)])
+
+
+def test_frozen_latlon(benchmark, positions):
+    lat, lon = positions.lat[:1000].tolist(), positions.lon[:1000].tolist()
+    benchmark(lambda: [FrozenLatLon(y, x) for y, x in zip(lat, lon)])
+
+
+def test_geocoord_update(benchmark):
+    latitude = Latitude(5.8833)
+
+    def update():
+        for minute in range(1000):
+            # Setting a component only changes the components, like string2geocoord does before
+            # it makes the coordinate consistent again with _update
+            latitude.minute = minute % 60
+            latitude._update()
+    benchmark(update)
+
+
+def test_set_hemisphere(benchmark):
+    latitude = Latitude(5.8833)
+
+    def update():
+        for i in range(500):
+            latitude.set_hemisphere("S")  # Sets all components and calls _update
+            latitude.set_hemisphere("N")
+    benchmark(update)
+
+
+def test_geocoord_components(benchmark, latlons):
+    # Degree, minute and second are calculated from the decimal degree on first access
+    benchmark(lambda: [Latitude(latlon.lat.decimal_degree).second for latlon in latlons])
@@ -0,0 +1,50 @@
+"""
+Benchmarks of scalar and batched distances, headings and offsets
+"""
+
+import numpy as np
+
+from latloncalc.arrays import batch_offset
+from latloncalc.cache import disable_inverse_cache, enable_inverse_cache
+
+
+def test_distance_scalar(benchmark, latlons):
+    benchmark(lambda: [p.distance(q) for p, q in zip(latlons[:-1], latlons[1:])])
+
+
+def test_distance_scalar_cached(benchmark, latlons):
+    enable_inverse_cache(maxsize=2 * len(latlons))
+    try:
+        benchmark(lambda: [p.distance(q) for p, q in zip(latlons[:-1], latlons[1:])])
+    finally:
+        disable_inverse_cache()
+
+
+def test_distance_batch(benchmark, positions):
+    benchmark(positions[:-1].distance, positions[1:])
+
+
+def test_distance_batch_haversine(benchmark, positions):
+    benchmark(positions[:-1].distance, positions[1:], backend="haversine")
+
+
+def test_heading_scalar(benchmark, latlons):
+    benchmark(lambda: [p.heading_initial(q) for p, q in zip(latlons[:-1], latlons[1:])])
+
+
+def test_heading_batch(benchmark, positions):
+    benchmark(positions[:-1].heading_initial, positions[1:])
+
+
+def test_offset_scalar(benchmark, latlons):
+    benchmark(lambda: [latlon.offset(45., 10.) for latlon in latlons])
+
+
+def test_offset_batch(benchmark, positions):
+    headings = np.linspace(0., 360., len(positions))
+    benchmark(batch_offset, positions, headings, 10.)
+
+
+def test_offset_batch_haversine(benchmark, positions):
+    headings = np.linspace(0., 360., len(positions))
+    benchmark(batch_offset, positions, headings, 10., backend="haversine")
@@ -0,0 +1,28 @@
+"""
+Benchmarks of GeoVector arithmetic, scalar and batched
+"""
+
+from latloncalc.latlon import GeoVector
+
+
+def test_latlon_difference(benchmark, latlons):
+    benchmark(lambda: [q - p for p, q in zip(latlons[:-1], latlons[1:])])
+
+
+def test_add_vector_to_latlon(benchmark, latlons):
+    vector = GeoVector(initial_heading=45., distance=10.)
+    benchmark(lambda: [latlon + vector for latlon in latlons])
+
+
+def test_vector_arithmetic(benchmark):
+    vectors = [GeoVector(dx, 1.) for dx in range(1000)]
+    benchmark(lambda: [(v + w) * 2 - w for v, w in zip(vectors[:-1], vectors[1:])])
+
+
+def test_latlonarray_difference(benchmark, positions):
+    benchmark(lambda: positions[1:] - positions[:-1])
+
+
+def test_vector_array_arithmetic(benchmark, positions):
+    vectors = positions[1:] - positions[:-1]
+    benchmark(lambda: ((vectors + vectors) * 2 - vectors).cumsum())
@@ -0,0 +1,34 @@
+"""
+Benchmarks of the startup time of short-lived processes
+
+Each benchmark starts a new Python interpreter. Compare the time of a worker which only parses and
+formats coordinates with the time of the same worker which also imports pyproj, which is what
+every worker paid before pyproj was imported lazily.
+"""
+
+import subprocess
+import sys
+
+WORKER = ("from latloncalc.latlon import string2latlon; "
+          "string2latlon('5 52 59.88 N', '162 4 59.88 W', 'd% %m% %S% %H').to_string('D')")
+
+
+def _run(code):
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_startup_python(benchmark):
+    benchmark.pedantic(_run, args=("pass",), rounds=10)
+
+
+def test_startup_parse_format(benchmark):
+    benchmark.pedantic(_run, args=(WORKER,), rounds=10)
+
+
+def test_startup_parse_format_with_pyproj(benchmark):
+    benchmark.pedantic(_run, args=("import pyproj; " + WORKER,), rounds=10)
+
+
+def test_startup_geodesic(benchmark):
+    code = "from latloncalc.latlon import LatLon; LatLon(5.8833, -162.0833).distance(LatLon(1, 2))"
+    benchmark.pedantic(_run, args=(code,), rounds=10)
@@ -0,0 +1,31 @@
+"""
+Benchmarks of parsing and formatting coordinate strings
+"""
+
+from latloncalc.arrays import LatLonArray
+from latloncalc.latlon import string2latlon
+
+FORMAT = "d%, %m%, %S%, %H"
+
+
+def test_parse(benchmark, coordinate_strings):
+    benchmark(lambda: [string2latlon(lat, lon, FORMAT) for lat, lon in zip(*coordinate_strings)])
+
+
+def test_format(benchmark, latlons):
+    benchmark(lambda: [latlon.to_string(FORMAT, n_digits_seconds=2) for latlon in latlons])
+
+
+def test_round_trip(benchmark, latlons):
+    def round_trip():
+        for latlon in latlons:
+            string2latlon(*latlon.to_string(FORMAT, n_digits_seconds=2), FORMAT)
+    benchmark(round_trip)
+
+
+def test_parse_array(benchmark, coordinate_strings):
+    benchmark(LatLonArray.from_strings, *coordinate_strings, FORMAT)
+
+
+def test_format_array(benchmark, positions):
+    benchmark(positions[:len(positions) // 10].to_string, FORMAT, n_digits_seconds=2)
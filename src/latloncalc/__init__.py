@@ -1,16 +1,31 @@
+import os
 import sys
 
-if sys.version_info[:2] >= (3, 8):
-    # TODO: Import directly (no need for conditional) when `python_requires = >= 3.8`
-    from importlib.metadata import PackageNotFoundError, version  # pragma: no cover
-else:
-    from importlib_metadata import PackageNotFoundError, version  # pragma: no cover
 
-try:
-    # Change here if project is renamed and does not equal the package name
-    dist_name = __name__
-    __version__ = version(dist_name)
-except PackageNotFoundError:  # pragma: no cover
-    __version__ = "unknown"
-finally:
-    del version, PackageNotFoundError
\ No newline at end of file
+def __getattr__(name):
+    # The version is looked up on first access instead of on import, as importing
+    # importlib.metadata and scanning the installed distributions slows down the startup
+    if name != "__version__":
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    if sys.version_info[:2] >= (3, 8):
+        # TODO: Import directly (no need for conditional) when `python_requires = >= 3.8`
+        from importlib.metadata import PackageNotFoundError, version  # pragma: no cover
+    else:
+        from importlib_metadata import PackageNotFoundError, version  # pragma: no cover
+
+    try:
+        # Change here if project is renamed and does not equal the package name
+        dist_name = __name__
+        __version__ = version(dist_name)
+    except PackageNotFoundError:  # pragma: no cover
+        __version__ = "unknown"
+    globals()["__version__"] = __version__
+    return __version__
+
+
+if os.environ.get("LATLONCALC_INSTRUMENT"):
+    # Only imported on request, as instrumenting imports the modules of all instrumented operations
+    from latloncalc.instrument import _enable_from_environment
+
+    _enable_from_environment()
+    del _enable_from_environment
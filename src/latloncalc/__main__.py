@@ -0,0 +1,83 @@
+"""
+Command line interface of latloncalc
+
+Usage::
+
+    $ python -m latloncalc convert --help
+"""
+
+import argparse
+import sys
+
+from latloncalc.convert import ERROR_MODES, convert_file
+
+
+def _parse_args(args):
+    """
+    Parse the command line arguments
+    """
+    parser = argparse.ArgumentParser(prog="python -m latloncalc",
+                                     description="Geographical calculations with "
+                                                 "longitudes/latitudes coordinates")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    convert = subparsers.add_parser(
+        "convert", help="Convert the coordinate columns of a delimited text file",
+        description="Convert the latitude and longitude columns of a delimited text file "
+                    "between coordinate formats, e.g. from degrees minutes seconds "
+                    "('d%% %%m%% %%S%% %%H') to decimal degrees ('D'). The file is converted "
+                    "in chunks, so it does not need to fit in memory.")
+    convert.add_argument("input", help="Input file, '-' reads from standard input")
+    convert.add_argument("output", nargs="?", default="-",
+                         help="Output file, '-' writes to standard output (default)")
+    convert.add_argument("--lat-column", required=True,
+                         help="Index or header name of the latitude column")
+    convert.add_argument("--lon-column", required=True,
+                         help="Index or header name of the longitude column")
+    convert.add_argument("--input-format", default="D",
+                         help="Format of the input coordinates (default: %(default)s)")
+    convert.add_argument("--output-format", default="D",
+                         help="Format of the output coordinates (default: %(default)s)")
+    convert.add_argument("--delimiter", default=",",
+                         help="Column delimiter, use '\\t' for tab separated files "
+                              "(default: %(default)s)")
+    convert.add_argument("--no-header", dest="header", action="store_false",
+                         help="The input has no header line")
+    convert.add_argument("--chunk-size", type=int, default=100000,
+                         help="Number of rows converted at once (default: %(default)s)")
+    convert.add_argument("--workers", type=int, default=None,
+                         help="Number of worker processes (default: convert in this process)")
+    convert.add_argument("--digits-seconds", type=int, default=7,
+                         help="Number of digits of the seconds in the output (default: "
+                              "%(default)s)")
+    convert.add_argument("--digits-minutes", type=int, default=7,
+                         help="Number of digits of the decimal minutes in the output (default: "
+                              "%(default)s)")
+    convert.add_argument("--errors", choices=ERROR_MODES, default="raise",
+                         help="Stop at rows that can not be parsed (raise) or copy them "
+                              "unchanged (keep) (default: %(default)s)")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """
+    Entry point of the command line interface
+    """
+    args = _parse_args(sys.argv[1:] if args is None else args)
+    if args.command == "convert":
+        delimiter = "\t" if args.delimiter in ("\\t", "tab") else args.delimiter
+        try:
+            convert_file(args.input, args.output, args.lat_column, args.lon_column,
+                         input_format=args.input_format, output_format=args.output_format,
+                         delimiter=delimiter, header=args.header, chunk_size=args.chunk_size,
+                         n_workers=args.workers, n_digits_seconds=args.digits_seconds,
+                         n_digits_decimal_minutes=args.digits_minutes, errors=args.errors)
+        except ValueError as err:
+            sys.stderr.write("Error: {}\n".format(err))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+"""
+Running statistics of moving objects, updated in place.
+
+A *TrackAccumulator* keeps the last position, total distance, last heading, mean speed and
+bounding box of one object. A *FleetAccumulator* keeps the same statistics for many objects in
+NumPy arrays and updates all objects of a batch with one vectorized geodesic call. Both are
+updated with new fixes (measured positions) or with dead reckoning steps (heading and distance
+travelled since the last position). Only floats are stored, so an update does not create any
+*LatLon*, *GeoVector* or coordinate objects.
+
+All distances are in km, headings in degrees, times in seconds (e.g. POSIX timestamps) and speeds
+in km/h. The bounding box is the range of the latitudes and longitudes of all positions, so it
+does not wrap around the antimeridian.
+"""
+
+import math
+
+import numpy as np
+
+from latloncalc.arrays import LatLonArray
+from latloncalc.geodesic import get_engine
+from latloncalc.latlon import LatLon
+
+
+class TrackAccumulator:
+    """
+    Running statistics of the track of one object
+
+    Parameters
+    ----------
+    ellipse : str or tuple, optional, default="WGS84"
+        Ellipsoid name or (a, f) tuple passed to the geodesic engine
+    backend : str, optional
+        Geodesic backend, see *latloncalc.geodesic.get_engine*
+    name : str, optional
+        Name of the object
+
+    Attributes
+    ----------
+    lat, lon : float
+        The last position in decimal degrees, NaN before the first fix
+    total_distance : float
+        Sum of the distances of all legs in km
+    last_heading : float
+        Initial heading in degrees of the last leg with a non-zero length, NaN if there is none
+    n_fixes : int
+        Number of positions, i.e. the first fix plus all later fixes and steps
+
+    Examples
+    --------
+    >>> ship = TrackAccumulator()
+    >>> ship.add_fix(5.8833, -162.0833, time=0.)
+    >>> ship.add_step(45., 10., time=1800.)
+    >>> round(ship.total_distance, 3), ship.last_heading, round(ship.mean_speed, 3)
+    (10.0, 45.0, 20.0)
+    """
+
+    __slots__ = ("name", "lat", "lon", "total_distance", "last_heading", "n_fixes", "first_time",
+                 "last_time", "min_lat", "min_lon", "max_lat", "max_lon", "_engine")
+
+    def __init__(self, ellipse="WGS84", backend=None, name=None):
+        """
+        Create the TrackAccumulator object
+        """
+        self.name = name
+        self._engine = get_engine(ellipse, backend)
+        self.reset()
+
+    def reset(self):
+        """
+        Forget all positions
+        """
+        self.lat = self.lon = math.nan
+        self.total_distance = 0.
+        self.last_heading = math.nan
+        self.n_fixes = 0
+        self.first_time = self.last_time = math.nan
+        self.min_lat = self.min_lon = self.max_lat = self.max_lon = math.nan
+
+    def _move_to(self, lat, lon, time):
+        """
+        Store a new position and update the bounding box and times
+        """
+        if self.n_fixes == 0:
+            self.min_lat = self.max_lat = lat
+            self.min_lon = self.max_lon = lon
+        else:
+            self.min_lat, self.max_lat = min(self.min_lat, lat), max(self.max_lat, lat)
+            self.min_lon, self.max_lon = min(self.min_lon, lon), max(self.max_lon, lon)
+        self.lat, self.lon = lat, lon
+        self.n_fixes += 1
+        if time is not None:
+            if math.isnan(self.first_time):
+                self.first_time = time
+            self.last_time = time
+
+    def add_fix(self, lat, lon, time=None):
+        """
+        Add a measured position
+
+        Parameters
+        ----------
+        lat, lon : float
+            The position in decimal degrees
+        time : float, optional
+            Time of the position in seconds
+        """
+        lat, lon = float(lat), float(lon)
+        if self.n_fixes:
+            heading, _, distance = self._engine.inv(self.lon, self.lat, lon, lat)
+            if distance > 0:
+                self.total_distance += distance / 1000.0
+                self.last_heading = heading
+        self._move_to(lat, lon, time)
+
+    def add_latlon(self, position, time=None):
+        """
+        Add a measured position given as LatLon object, see *add_fix*
+        """
+        self.add_fix(position.lat.decimal_degree, position.lon.decimal_degree, time)
+
+    def add_step(self, heading, distance, time=None):
+        """
+        Add a dead reckoning step from the last position
+
+        Parameters
+        ----------
+        heading : float
+            Initial heading of the step in degrees
+        distance : float
+            Distance of the step in km. A negative distance moves backwards, opposite to the
+            heading, and adds its absolute value to the total distance.
+        time : float, optional
+            Time at the end of the step in seconds
+        """
+        if self.n_fixes == 0:
+            raise ValueError("A dead reckoning step needs a start position, add a fix first")
+        heading, distance = float(heading), float(distance)
+        lon, lat, _ = self._engine.fwd(self.lon, self.lat, heading, distance * 1000.0)
+        if distance != 0:
+            self.total_distance += abs(distance)
+            self.last_heading = heading if distance > 0 else (heading + 180.) % 360.
+        self._move_to(float(lat), float(lon), time)
+
+    @property
+    def mean_speed(self):
+        """
+        Total distance divided by the time between the first and last position in km/h, NaN if
+        no time has passed
+        """
+        duration = self.last_time - self.first_time
+        if not duration > 0:
+            return math.nan
+        return self.total_distance / duration * 3600.
+
+    @property
+    def bounding_box(self):
+        """
+        Tuple (min_lat, min_lon, max_lat, max_lon) of all positions in decimal degrees
+        """
+        return self.min_lat, self.min_lon, self.max_lat, self.max_lon
+
+    def to_latlon(self):
+        """
+        Returns the last position as a LatLon object
+        """
+        if self.n_fixes == 0:
+            raise ValueError("No position has been added yet")
+        return LatLon(self.lat, self.lon, name=self.name)
+
+    def __repr__(self):
+        return "TrackAccumulator(name={!r}, n_fixes={}, total_distance={})".format(
+            self.name, self.n_fixes, self.total_distance)
+
+    @staticmethod
+    def type():
+        """
+        Identifies the object type
+        """
+        return "TrackAccumulator"
+
+
+def _occurrence(index):
+    """
+    Return for every element of index how often the same value occurred before it
+    """
+    order = np.argsort(index, kind="stable")
+    sorted_index = index[order]
+    first = np.r_[True, sorted_index[1:] != sorted_index[:-1]]
+    start = np.maximum.accumulate(np.where(first, np.arange(index.size), 0))
+    occurrence = np.empty(index.size, dtype=np.intp)
+    occurrence[order] = np.arange(index.size) - start
+    return occurrence
+
+
+class FleetAccumulator:
+    """
+    Running statistics of the tracks of many objects, stored in arrays
+
+    Parameters
+    ----------
+    n_objects : int
+        Number of objects. Objects are identified by their index 0 to n_objects - 1.
+    ellipse : str or tuple, optional, default="WGS84"
+        Ellipsoid name or (a, f) tuple passed to the geodesic engine
+    backend : str, optional
+        Geodesic backend, see *latloncalc.geodesic.get_engine*
+
+    Attributes
+    ----------
+    lat, lon : numpy.ndarray
+        The last positions in decimal degrees, NaN before the first fix of an object
+    total_distance : numpy.ndarray
+        Sums of the distances of all legs in km
+    last_heading : numpy.ndarray
+        Initial headings in degrees of the last legs with a non-zero length, NaN if there is none
+    n_fixes : numpy.ndarray
+        Numbers of positions of the objects
+
+    Notes
+    -----
+    The statistics are the same as those of a TrackAccumulator per object. An object may occur
+    more than once in an update, in which case its updates are applied in the given order.
+
+    Examples
+    --------
+    >>> fleet = FleetAccumulator(3)
+    >>> fleet.add_fixes([0, 1, 2], [5.8833, 21.3, 0.], [-162.0833, -157.8167, 0.])
+    >>> fleet.add_steps([0, 2, 2], 90., 10.)
+    >>> fleet.total_distance
+    array([10.,  0., 20.])
+    """
+
+    def __init__(self, n_objects, ellipse="WGS84", backend=None):
+        """
+        Create the FleetAccumulator object
+        """
+        self._engine = get_engine(ellipse, backend)
+        self.lat = np.full(n_objects, np.nan)
+        self.lon = np.full(n_objects, np.nan)
+        self.total_distance = np.zeros(n_objects)
+        self.last_heading = np.full(n_objects, np.nan)
+        self.n_fixes = np.zeros(n_objects, dtype=np.int64)
+        self.first_time = np.full(n_objects, np.nan)
+        self.last_time = np.full(n_objects, np.nan)
+        self.min_lat = np.full(n_objects, np.nan)
+        self.min_lon = np.full(n_objects, np.nan)
+        self.max_lat = np.full(n_objects, np.nan)
+        self.max_lon = np.full(n_objects, np.nan)
+
+    def _updates(self, index, *values):
+        """
+        Broadcast the values of an update against the object indices and yield them in rounds in
+        which every object occurs at most once
+        """
+        index = np.asarray(index, dtype=np.intp).reshape(-1)
+        values = [np.broadcast_to(np.asarray(value, dtype=np.float64), index.shape)
+                  for value in values]
+        occurrence = _occurrence(index)
+        if index.size == 0 or occurrence.max() == 0:
+            yield (index,) + tuple(values)
+            return
+        for number in range(occurrence.max() + 1):
+            selection = occurrence == number
+            yield (index[selection],) + tuple(value[selection] for value in values)
+
+    def _move_to(self, index, lat, lon, time):
+        """
+        Store the new positions of the objects with the (unique) indices and update their
+        bounding boxes and times
+        """
+        self.lat[index] = lat
+        self.lon[index] = lon
+        self.n_fixes[index] += 1
+        # fmin and fmax ignore the NaN of objects without a previous position
+        self.min_lat[index] = np.fmin(self.min_lat[index], lat)
+        self.max_lat[index] = np.fmax(self.max_lat[index], lat)
+        self.min_lon[index] = np.fmin(self.min_lon[index], lon)
+        self.max_lon[index] = np.fmax(self.max_lon[index], lon)
+        timed = ~np.isnan(time)
+        first = timed & np.isnan(self.first_time[index])
+        self.first_time[index[first]] = time[first]
+        self.last_time[index[timed]] = time[timed]
+
+    def add_fixes(self, index, lat, lon, time=None):
+        """
+        Add measured positions
+
+        Parameters
+        ----------
+        index : int or array_like
+            Indices of the objects
+        lat, lon : float or array_like
+            The positions in decimal degrees
+        time : float or array_like, optional
+            Times of the positions in seconds
+        """
+        time = np.nan if time is None else time
+        for index, lat, lon, time in self._updates(index, lat, lon, time):
+            known = self.n_fixes[index] > 0
+            if known.any():
+                legs = index[known]
+                heading, _, distance = self._engine.inv(self.lon[legs], self.lat[legs],
+                                                        lon[known], lat[known])
+                distance = np.asarray(distance) / 1000.0
+                moved = distance > 0
+                self.total_distance[legs] += distance
+                self.last_heading[legs[moved]] = np.asarray(heading)[moved]
+            self._move_to(index, lat, lon, time)
+
+    def add_steps(self, index, heading, distance, time=None):
+        """
+        Add dead reckoning steps from the last positions
+
+        Parameters
+        ----------
+        index : int or array_like
+            Indices of the objects
+        heading : float or array_like
+            Initial headings of the steps in degrees
+        distance : float or array_like
+            Distances of the steps in km. Negative distances move backwards, see
+            *TrackAccumulator.add_step*.
+        time : float or array_like, optional
+            Times at the end of the steps in seconds
+        """
+        time = np.nan if time is None else time
+        for index, heading, distance, time in self._updates(index, heading, distance, time):
+            if np.any(self.n_fixes[index] == 0):
+                raise ValueError("A dead reckoning step needs a start position, add a fix first")
+            lon, lat, _ = self._engine.fwd(self.lon[index], self.lat[index], heading,
+                                           distance * 1000.0)
+            moved = distance != 0
+            self.total_distance[index] += np.abs(distance)
+            leg_heading = np.where(distance < 0, (heading + 180.) % 360., heading)
+            self.last_heading[index[moved]] = leg_heading[moved]
+            self._move_to(index, np.asarray(lat), np.asarray(lon), time)
+
+    @property
+    def mean_speed(self):
+        """
+        Total distances divided by the times between the first and last positions in km/h, NaN
+        if no time has passed
+        """
+        duration = self.last_time - self.first_time
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(duration > 0, self.total_distance / duration * 3600., np.nan)
+
+    @property
+    def bounding_box(self):
+        """
+        Tuple of arrays (min_lat, min_lon, max_lat, max_lon) of all positions in decimal degrees
+        """
+        return self.min_lat, self.min_lon, self.max_lat, self.max_lon
+
+    def to_latlonarray(self):
+        """
+        Returns the last positions as a LatLonArray (NaN for objects without a position)
+        """
+        return LatLonArray(self.lat, self.lon)
+
+    def __len__(self):
+        return self.lat.size
+
+    def __repr__(self):
+        return "FleetAccumulator(n_objects={})".format(len(self))
+
+    @staticmethod
+    def type():
+        """
+        Identifies the object type
+        """
+        return "FleetAccumulator"
@@ -0,0 +1,516 @@
+"""
+Columnar containers for large collections of lat/lon coordinates.
+
+A *LatLonArray* stores the latitudes and longitudes of many positions in two contiguous float64
+NumPy arrays instead of one *LatLon* object per position. Distances and headings between arrays
+are computed with a single vectorized call to the geodesic solver, which is orders of magnitude
+faster than looping over *LatLon.distance* for large data sets.
+"""
+
+import numpy as np
+from latloncalc.formats import compile_format, compile_output_format
+from latloncalc.geodesic import get_engine
+from latloncalc.latlon import GeoVector, LatLon, Latitude, Longitude
+
+
+def _range180(lon):
+    """
+    Report longitudes using the range -180 to 180 (vectorized version of Longitude.range180)
+    """
+    return ((lon + 180) % 360) - 180
+
+
+def _as_latlonarray(positions):
+    """
+    Convert a LatLon, a LatLonArray or a sequence of LatLon objects into a LatLonArray
+    """
+    try:
+        if positions.type() == "LatLonArray":
+            return positions
+        if positions.type() == "LatLon":
+            return LatLonArray([positions.lat.decimal_degree], [positions.lon.decimal_degree])
+    except AttributeError:
+        pass
+    return LatLonArray.from_latlons(positions)
+
+
+def batch_offset(origins, heading_initial, distance, ellipse="WGS84", backend=None,
+                 outer=False):
+    """
+    Offset one or many origins by many headings and distances in one forward geodesic call
+
+    Parameters
+    ----------
+    origins : LatLon, LatLonArray or sequence of LatLon
+        The start positions
+    heading_initial : scalar or array_like
+        Initial headings in degrees
+    distance : scalar or array_like
+        Distances in km
+    ellipse : str or tuple, optional, default="WGS84"
+        Ellipsoid name or (a, f) tuple passed to the geodesic engine
+    backend : str, optional
+        Geodesic backend, see *latloncalc.geodesic.get_engine*
+    outer : bool, optional, default=False
+        If False, the origins, headings and distances are broadcast against each other like NumPy
+        arrays (e.g. one origin with many headings, or n origins with n headings). If True, every
+        origin is offset by every pair of heading and distance, which gives len(origins) times
+        the number of heading/distance pairs positions, ordered by origin.
+
+    Returns
+    -------
+    tuple:
+        A LatLonArray with the destinations (flattened in C order of the broadcast shape) and an
+        array with the back bearings in degrees, i.e. the headings at the destinations pointing
+        back along the geodesic, with the broadcast shape
+
+    Examples
+    --------
+    >>> # Range rings of 10, 20 and 30 km around Palmyra, every 10 degrees
+    >>> headings, distances = np.meshgrid(np.arange(0., 360., 10.), [10., 20., 30.])
+    >>> rings, back_bearings = batch_offset(LatLon(5.8833, -162.0833), headings, distances)
+    >>> len(rings), back_bearings.shape
+    (108, (3, 36))
+    """
+    origins = _as_latlonarray(origins)
+    heading_initial = np.asarray(heading_initial, dtype=np.float64)
+    distance = np.asarray(distance, dtype=np.float64) * 1000  # Convert km to meters
+    if outer:
+        heading_initial, distance = np.broadcast_arrays(heading_initial, distance)
+        shape = (len(origins),) + heading_initial.shape
+        lon1 = np.repeat(origins.lon, heading_initial.size)
+        lat1 = np.repeat(origins.lat, heading_initial.size)
+        heading_initial = np.tile(heading_initial.ravel(), len(origins))
+        distance = np.tile(distance.ravel(), len(origins))
+    else:
+        lat1, lon1 = origins.lat, origins.lon
+        if len(origins) == 1:
+            lat1, lon1 = lat1[0], lon1[0]  # Broadcast a single origin against any shape
+        lon1, lat1, heading_initial, distance = np.broadcast_arrays(lon1, lat1, heading_initial,
+                                                                    distance)
+        shape = lon1.shape
+    engine = get_engine(ellipse, backend)
+    lon2, lat2, back_bearing = engine.fwd(np.ravel(lon1), np.ravel(lat1),
+                                          np.ravel(heading_initial), np.ravel(distance))
+    back_bearing = np.asarray(back_bearing, dtype=np.float64).reshape(shape)
+    return LatLonArray(lat2, lon2), back_bearing
+
+
+class LatLonArray:
+    """
+    Object representing an array of lat/lon pairs
+
+    Parameters
+    ----------
+    lat : array_like
+        Latitudes in decimal degrees
+    lon : array_like
+        Longitudes in decimal degrees. Longitudes reported in the range 0 to 360 are converted to
+        the range -180 to 180, just like the Longitude class does.
+
+    Notes
+    -----
+    Both coordinates are stored as contiguous one dimensional float64 arrays in the attributes
+    *lat* and *lon*.
+
+    Examples
+    --------
+    >>> ports = LatLonArray([5.8833, 21.3], [-162.0833, -157.8167])
+    >>> ports.distance(LatLon(5.8833, -162.0833))  # Distance in km of each port to Palmyra
+    array([   0.        , 1766.69130376])
+    """
+
+    def __init__(self, lat, lon):
+        """
+        Create a LatLonArray object
+        """
+        lat = np.ascontiguousarray(lat, dtype=np.float64).reshape(-1)
+        lon = np.ascontiguousarray(lon, dtype=np.float64).reshape(-1)
+        if lat.shape != lon.shape:
+            raise ValueError("lat and lon must have the same length ({} != {})"
+                             "".format(lat.size, lon.size))
+        self.lat = lat
+        self.lon = np.ascontiguousarray(_range180(lon))
+
+    @classmethod
+    def from_latlons(cls, latlons):
+        """
+        Create a LatLonArray from a sequence of LatLon objects
+
+        Parameters
+        ----------
+        latlons : iterable of LatLon
+            The positions to store
+
+        Returns
+        -------
+        LatLonArray:
+            Array holding the decimal degrees of all positions
+        """
+        latlons = list(latlons)
+        lat = np.fromiter((p.lat.decimal_degree for p in latlons), dtype=np.float64,
+                          count=len(latlons))
+        lon = np.fromiter((p.lon.decimal_degree for p in latlons), dtype=np.float64,
+                          count=len(latlons))
+        return cls(lat, lon)
+
+    @classmethod
+    def from_strings(cls, lat_strs, lon_strs, format_str, errors=None):
+        """
+        Create a LatLonArray from sequences of latitude and longitude strings
+
+        Parameters
+        ----------
+        lat_strs : list of str or numpy.ndarray
+            String representations of the latitudes (e.g. "5 52 59.88 N")
+        lon_strs : list of str or numpy.ndarray
+            String representations of the longitudes (e.g. "162 4 59.88 W")
+        format_str : str
+            Format in which the coordinate strings are given (e.g. "d% %m% %S% %H").
+            See function *string2geocoord* for a detailed explanation on how to specify formats.
+        errors : list, optional
+            If given, strings which can not be parsed are stored as NaN and reported in this list
+            as tuples (row_index, coord_str) instead of raising a ValueError.
+
+        Returns
+        -------
+        LatLonArray:
+            Array holding the decimal degrees of all positions
+        """
+        lat = compile_format(format_str, Latitude).parse_array(lat_strs, errors=errors)
+        lon = compile_format(format_str, Longitude).parse_array(lon_strs, errors=errors)
+        return cls(lat, lon)
+
+    def to_latlons(self):
+        """
+        Convert to a list of LatLon objects
+        """
+        return [LatLon(Latitude(lat), Longitude(lon))
+                for lat, lon in zip(self.lat.tolist(), self.lon.tolist())]
+
+    def to_string(self, formatter="D", n_digits_seconds=7, n_digits_decimal_minutes=7):
+        """
+        Return string representations of the latitudes and longitudes as a tuple of two lists
+        using the format specified by formatter. The strings are identical to those returned by
+        LatLon.to_string for each position.
+        """
+        output_format = compile_output_format(formatter, n_digits_seconds,
+                                              n_digits_decimal_minutes)
+        return (output_format.format_array(self.lat, Latitude),
+                output_format.format_array(self.lon, Longitude))
+
+    def _coordinates_of(self, other):
+        """
+        Return the latitudes and longitudes of other (a LatLon or LatLonArray) as arrays which
+        can be broadcast against self
+        """
+        if other.type() == "LatLon":
+            return other.lat.decimal_degree, other.lon.decimal_degree
+        if other.type() == "LatLonArray":
+            if len(other) != len(self):
+                raise ValueError("Arrays must have the same length ({} != {})"
+                                 "".format(len(self), len(other)))
+            return other.lat, other.lon
+        raise TypeError("Expected a LatLon or LatLonArray object, got {}".format(other.type()))
+
+    def _pyproj_inv(self, other, ellipse="WGS84", backend=None):
+        """
+        Perform the inverse geodesic operation between self and other (a LatLon or LatLonArray)
+        in a single vectorized call. Returns the initial heading and reverse heading in degrees,
+        and the distance in km, as arrays.
+        """
+        lat2, lon2 = self._coordinates_of(other)
+        lon2 = np.broadcast_to(lon2, self.lon.shape)
+        lat2 = np.broadcast_to(lat2, self.lat.shape)
+        engine = get_engine(ellipse, backend)
+        heading_initial, heading_reverse, distance = engine.inv(self.lon, self.lat, lon2, lat2)
+        heading_initial = np.asarray(heading_initial, dtype=np.float64)
+        heading_reverse = np.asarray(heading_reverse, dtype=np.float64)
+        distance = np.asarray(distance, dtype=np.float64) / 1000.0
+        # Reverse heading not well handled for coordinates that are directly south
+        heading_reverse[heading_initial == 0.0] = 180.0
+        return {"heading_initial": heading_initial, "heading_reverse": heading_reverse,
+                "distance": distance}
+
+    def heading_initial(self, other, **kwargs):
+        """
+        Returns initial bearings between self and other in degrees using the geodesic engine.
+        Other can be a single LatLon or a LatLonArray of the same length.
+        Assumes the WGS84 ellipsoid by default. Choose ellipse = "sphere" for the FAI ellipsoid.
+        """
+        return self._pyproj_inv(other, **kwargs)["heading_initial"]
+
+    def heading_reverse(self, other, **kwargs):
+        """
+        Returns reverse bearings between self and other in degrees using the geodesic engine.
+        Other can be a single LatLon or a LatLonArray of the same length.
+        Assumes the WGS84 ellipsoid by default. Choose ellipse = "sphere" for the FAI ellipsoid.
+        """
+        return self._pyproj_inv(other, **kwargs)["heading_reverse"]
+
+    def distance(self, other, **kwargs):
+        """
+        Returns great circle distances between self and other in km using the geodesic engine.
+        Other can be a single LatLon or a LatLonArray of the same length.
+        Assumes the WGS84 ellipsoid by default. Choose ellipse = "sphere" for the FAI ellipsoid.
+        """
+        return self._pyproj_inv(other, **kwargs)["distance"]
+
+    def offset(self, heading_initial, distance, ellipse="WGS84", backend=None):
+        """
+        Offset all positions by headings (in degrees) and distances (in km) in a single
+        vectorized forward geodesic call. The headings and distances are scalars or arrays of the
+        same length as self. Returns a new LatLonArray. See *batch_offset* to also obtain the
+        back bearings or to offset each position in many directions.
+        """
+        if np.size(heading_initial) not in (1, len(self)) or np.size(distance) not in (1, len(self)):
+            raise ValueError("Headings and distances must be scalars or arrays of length {}"
+                             "".format(len(self)))
+        return batch_offset(self, heading_initial, distance, ellipse=ellipse, backend=backend)[0]
+
+    def _add_vector(self, other):
+        """
+        Called when adding a GeoVector or GeoVectorArray object to self
+        """
+        heading, distance = other()
+        if other.type() == "GeoVectorArray" and len(other) != len(self):
+            raise ValueError("Arrays must have the same length ({} != {})"
+                             "".format(len(self), len(other)))
+        return self.offset(heading, distance)
+
+    def __add__(self, other):
+        # other is a GeoVector or GeoVectorArray object
+        return self._add_vector(other)
+
+    def __radd__(self, other):
+        return self._add_vector(other)
+
+    def _sub_latlon(self, other):
+        """
+        Called when subtracting a LatLon or LatLonArray object from self
+        """
+        inv = self._pyproj_inv(other)
+        return GeoVectorArray(initial_heading=inv["heading_reverse"], distance=inv["distance"])
+
+    def __sub__(self, other):
+        # other is a LatLon or LatLonArray object; returns a GeoVectorArray object
+        return self._sub_latlon(other)
+
+    def __len__(self):
+        return self.lat.size
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return LatLon(Latitude(float(self.lat[item])), Longitude(float(self.lon[item])))
+        return LatLonArray(self.lat[item], self.lon[item])
+
+    def __iter__(self):
+        return iter(self.to_latlons())
+
+    def __eq__(self, other):
+        # other is a LatLonArray object, anything else is left to the other object
+        if not isinstance(other, LatLonArray):
+            return NotImplemented
+        return bool(np.array_equal(self.lat, other.lat) and np.array_equal(self.lon, other.lon))
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return NotImplemented
+        return not equal
+
+    def __str__(self):
+        return "\n".join("%s, %s" % (lat, lon)
+                         for lat, lon in zip(self.lat.tolist(), self.lon.tolist()))
+
+    def __repr__(self):
+        return "LatLonArray(n=%d)" % len(self)
+
+    @staticmethod
+    def type():
+        """
+        Identifies the object type
+        """
+        return "LatLonArray"
+
+
+class GeoVectorArray:
+    """
+    Object representing many vectors (distances and headings) between lat/lon coordinates
+
+    Parameters
+    ----------
+    dx : array_like
+        The zonal components of the vectors in km
+    dy : array_like
+        The meridional components of the vectors in km
+    initial_heading : array_like
+        The initial headings of the vectors in degrees
+    distance : array_like
+        The magnitudes of the vectors in km
+
+    Notes
+    -----
+    Just like GeoVector, a GeoVectorArray is created by passing either dx and dy, or
+    initial_heading and distance, or by subtracting a LatLon or LatLonArray from a LatLonArray.
+
+    Headings and magnitudes are calculated from dx and dy with atan2 and hypot, so vectors
+    pointing west have a positive magnitude and a heading between 180 and 360 degrees, and there
+    is no special case for dx == 0. (GeoVector uses atan(dy / dx), which gives such vectors a
+    negative magnitude and the opposite heading; both describe the same displacement.)
+
+    Examples
+    --------
+    >>> drift = GeoVectorArray(initial_heading=[90., 90., 0.], distance=[1., 2., 3.])
+    >>> total = drift.sum()
+    >>> round(total.heading, 6), round(total.magnitude, 6)
+    (45.0, 4.242641)
+    """
+
+    def __init__(self, dx=None, dy=None, initial_heading=None, distance=None):
+        """
+        Create a GeoVectorArray object
+        """
+        if dx is not None and dy is not None and initial_heading is None and distance is None:
+            dx, dy = np.broadcast_arrays(np.asarray(dx, dtype=np.float64).reshape(-1),
+                                         np.asarray(dy, dtype=np.float64).reshape(-1))
+            self.dx = np.ascontiguousarray(dx)
+            self.dy = np.ascontiguousarray(dy)
+            self._update()
+        elif dx is None and dy is None and initial_heading is not None and distance is not None:
+            heading, magnitude = np.broadcast_arrays(
+                np.asarray(initial_heading, dtype=np.float64).reshape(-1),
+                np.asarray(distance, dtype=np.float64).reshape(-1))
+            self.heading = np.ascontiguousarray(heading)
+            self.magnitude = np.ascontiguousarray(magnitude)
+            theta_rad = np.radians(GeoVector._angle_or_heading(self.heading))
+            self.dx = self.magnitude * np.cos(theta_rad)
+            self.dy = self.magnitude * np.sin(theta_rad)
+        else:
+            raise NameError("Class GeoVectorArray requires two arguments (dx and dy or "
+                            "initial_heading and distance)")
+
+    def _update(self):
+        """
+        Calculate the headings and magnitudes from dx and dy
+        """
+        self.magnitude = np.hypot(self.dx, self.dy)
+        theta = np.degrees(np.arctan2(self.dy, self.dx))
+        heading = GeoVector._angle_or_heading(theta)
+        # Vectors without length point north, like GeoVector(0, 0)
+        self.heading = np.where(self.magnitude == 0, 0., heading)
+
+    @classmethod
+    def from_geovectors(cls, vectors):
+        """
+        Create a GeoVectorArray from a sequence of GeoVector objects
+        """
+        # The components are used, because the heading and magnitude of a GeoVector created from
+        # dx == 0 and dy < 0 point north instead of south
+        vectors = list(vectors)
+        return cls(dx=[v.dx for v in vectors], dy=[v.dy for v in vectors])
+
+    def to_geovectors(self):
+        """
+        Convert to a list of GeoVector objects
+        """
+        return [GeoVector(initial_heading=heading, distance=magnitude)
+                for heading, magnitude in zip(self.heading.tolist(), self.magnitude.tolist())]
+
+    def _components_of(self, other):
+        """
+        Return dx and dy of other (a GeoVector or GeoVectorArray) as arrays which can be broadcast
+        against self
+        """
+        if other.type() == "GeoVector":
+            return other.dx, other.dy
+        if other.type() == "GeoVectorArray":
+            if len(other) != len(self):
+                raise ValueError("Arrays must have the same length ({} != {})"
+                                 "".format(len(self), len(other)))
+            return other.dx, other.dy
+        raise TypeError("Expected a GeoVector or GeoVectorArray object, got {}"
+                        "".format(other.type()))
+
+    def sum(self):
+        """
+        Return the sum of all vectors as a GeoVector
+        """
+        total = GeoVectorArray(dx=self.dx.sum(), dy=self.dy.sum())
+        return GeoVector(initial_heading=float(total.heading[0]),
+                         distance=float(total.magnitude[0]))
+
+    def cumsum(self):
+        """
+        Return the cumulative sums of the vectors as a GeoVectorArray, e.g. the total drift after
+        each time step
+        """
+        return GeoVectorArray(dx=np.cumsum(self.dx), dy=np.cumsum(self.dy))
+
+    def almost_equals(self, other, e=0.000001):
+        """
+        Determine for each vector if self and other (a GeoVector or GeoVectorArray) are equal to
+        within e km in dx and dy. Returns a boolean array.
+        """
+        dx, dy = self._components_of(other)
+        return (np.abs(self.dx - dx) < e) & (np.abs(self.dy - dy) < e)
+
+    def __call__(self):
+        return self.heading, self.magnitude
+
+    def __neg__(self):
+        return GeoVectorArray(-self.dx, -self.dy)
+
+    def __pos__(self):
+        return GeoVectorArray(self.dx, self.dy)
+
+    def __add__(self, other):
+        # other is a GeoVector or GeoVectorArray object
+        dx, dy = self._components_of(other)
+        return GeoVectorArray(self.dx + dx, self.dy + dy)
+
+    def __radd__(self, other):
+        # other is a GeoVector object
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        # other is a GeoVector or GeoVectorArray object
+        dx, dy = self._components_of(other)
+        return GeoVectorArray(self.dx - dx, self.dy - dy)
+
+    def __rsub__(self, other):
+        # other is a GeoVector object
+        return (-self).__add__(other)
+
+    def __mul__(self, other):
+        # other is a scalar or an array of scalars; keeps the headings, just like GeoVector
+        return GeoVectorArray(initial_heading=self.heading, distance=self.magnitude * other)
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        # other is a scalar or an array of scalars
+        return GeoVectorArray(initial_heading=self.heading, distance=self.magnitude / other)
+
+    def __len__(self):
+        return self.heading.size
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return GeoVector(initial_heading=float(self.heading[item]),
+                             distance=float(self.magnitude[item]))
+        return GeoVectorArray(initial_heading=self.heading[item], distance=self.magnitude[item])
+
+    def __iter__(self):
+        return iter(self.to_geovectors())
+
+    def __repr__(self):
+        return "GeoVectorArray(n=%d)" % len(self)
+
+    @staticmethod
+    def type():
+        """
+        Identifies the object type
+        """
+        return "GeoVectorArray"
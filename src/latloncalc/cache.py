@@ -0,0 +1,529 @@
+"""
+Opt-in memoization of inverse geodesic results.
+
+Services which ask for the distances and headings between the same positions over and over can
+enable a size-bounded least-recently-used cache. *LatLon.distance*, *LatLon.heading_initial* and
+*LatLon.heading_reverse* (and everything built on *LatLon._pyproj_inv*) then share the results of
+one inverse solve per pair of positions.
+
+The cache is keyed by the backend, the ellipsoid and the coordinates rounded to a multiple of
+quantum degrees. With the default quantum of 1e-9 degrees (about 0.1 mm) positions which only
+differ by floating point noise share their results.
+
+Short-lived processes can share results through a persistent *InverseStore*, an SQLite file which
+many processes can read concurrently and which can be warmed with all pairs of a set of positions.
+
+Examples
+--------
+>>> from latloncalc.latlon import LatLon
+>>> enable_inverse_cache(maxsize=10000)
+>>> palmyra, honolulu = LatLon(5.8833, -162.0833), LatLon(21.3, -157.8167)
+>>> palmyra.distance(honolulu), palmyra.heading_initial(honolulu)
+(1766.691303757168, 14.690792202210424)
+>>> inverse_cache_info()
+CacheInfo(hits=1, misses=1, evictions=0, maxsize=10000, currsize=1)
+"""
+
+import collections
+import functools
+import os
+import pathlib
+import sqlite3
+import threading
+
+import numpy as np
+
+from latloncalc.geodesic import _ellipsoid_parameters, get_default_backend, get_engine
+
+CacheInfo = collections.namedtuple("CacheInfo", ["hits", "misses", "evictions", "maxsize",
+                                                 "currsize"])
+
+
+class InverseCache:
+    """
+    Thread-safe least-recently-used cache of inverse geodesic results
+
+    Parameters
+    ----------
+    maxsize : int, optional, default=4096
+        Maximum number of cached pairs of positions. The least recently used pair is evicted when
+        the cache is full.
+    quantum : float, optional, default=1e-9
+        Coordinates are rounded to a multiple of quantum degrees to build the keys
+    """
+
+    def __init__(self, maxsize=4096, quantum=1e-9):
+        """
+        Create the InverseCache object
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1, got {}".format(maxsize))
+        if quantum <= 0:
+            raise ValueError("quantum must be positive, got {}".format(quantum))
+        self.maxsize = int(maxsize)
+        self.quantum = float(quantum)
+        self._results = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, lat1, lon1, lat2, lon2, ellipse="WGS84", backend="pyproj"):
+        """
+        Return the key of a pair of positions, given in decimal degrees
+        """
+        if not isinstance(ellipse, str):
+            ellipse = tuple(ellipse)
+        quantum = self.quantum
+        return (backend, ellipse, round(lat1 / quantum), round(lon1 / quantum),
+                round(lat2 / quantum), round(lon2 / quantum))
+
+    def get(self, key):
+        """
+        Return the cached result of key, or None if it is not cached
+        """
+        with self._lock:
+            try:
+                result = self._results[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        """
+        Store the result of key, evicting the least recently used result if the cache is full
+        """
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+                self.evictions += 1
+
+    def info(self):
+        """
+        Return the statistics of the cache as a CacheInfo named tuple
+        """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize,
+                             len(self._results))
+
+    def clear(self):
+        """
+        Remove all cached results and reset the statistics
+        """
+        with self._lock:
+            self._results.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    def __repr__(self):
+        return "InverseCache(maxsize=%d, quantum=%g)" % (self.maxsize, self.quantum)
+
+
+_inverse_cache = None
+
+
+def enable_inverse_cache(maxsize=4096, quantum=1e-9):
+    """
+    Cache the results of all scalar inverse geodesic calculations of LatLon objects
+
+    Parameters
+    ----------
+    maxsize : int, optional, default=4096
+        Maximum number of cached pairs of positions
+    quantum : float, optional, default=1e-9
+        Coordinates are rounded to a multiple of quantum degrees to build the keys
+
+    Notes
+    -----
+    Enabling the cache again replaces the current cache, dropping its results and statistics.
+    """
+    global _inverse_cache
+    _inverse_cache = InverseCache(maxsize, quantum)
+
+
+def disable_inverse_cache():
+    """
+    Stop caching inverse geodesic results and drop the cache
+    """
+    global _inverse_cache
+    _inverse_cache = None
+
+
+def get_inverse_cache():
+    """
+    Return the active InverseCache, or None if caching is disabled
+    """
+    return _inverse_cache
+
+
+def inverse_cache_info():
+    """
+    Return the hits, misses, evictions, maxsize and current size of the active cache as a
+    CacheInfo named tuple, or None if caching is disabled
+    """
+    cache = _inverse_cache
+    return None if cache is None else cache.info()
+
+
+def clear_inverse_cache():
+    """
+    Remove all results from the active cache and reset its statistics
+    """
+    cache = _inverse_cache
+    if cache is not None:
+        cache.clear()
+
+
+@functools.lru_cache(maxsize=None)
+def _ellipse_key(ellipse):
+    """
+    Return the ellipsoid column of an InverseStore: the semi-major axis and flattening, so
+    equivalent names and (a, f) tuples share their results. Cached, as looking up a name in the
+    ellipsoids of pyproj is slower than a lookup in the store.
+    """
+    return "{!r},{!r}".format(*_ellipsoid_parameters(ellipse))
+
+
+def _solve_pairs(engine, lon1, lat1, lon2, lat2):
+    """
+    Solve the inverse geodesic problem of arrays of pairs and return the initial and reverse
+    headings in degrees and the distances in km, like LatLon._pyproj_inv
+    """
+    heading_initial, heading_reverse, distance = engine.inv(lon1, lat1, lon2, lat2)
+    heading_initial = np.asarray(heading_initial, dtype=np.float64)
+    heading_reverse = np.asarray(heading_reverse, dtype=np.float64)
+    # Same convention as LatLon._pyproj_inv
+    heading_reverse[heading_initial == 0.0] = 180.0
+    return heading_initial, heading_reverse, np.asarray(distance, dtype=np.float64) / 1000.0
+
+
+class InverseStore:
+    """
+    Persistent store of inverse geodesic results in an SQLite file, shared by processes
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        The SQLite file. It is created if it does not exist (unless readonly is True).
+    quantum : float, optional, default=1e-9
+        Coordinates are rounded to a multiple of quantum degrees to build the keys. A store always
+        keeps the quantum it was created with; opening it with another quantum raises a ValueError.
+    readonly : bool, optional, default=False
+        Open the store for reading only
+
+    Notes
+    -----
+    Results are keyed by the backend, the parameters (a, f) of the ellipsoid and the quantized
+    coordinates. Results of an ellipsoid are therefore never used for another ellipsoid, also not
+    if a name is redefined. Use *invalidate* to remove results.
+
+    The file uses SQLite's write-ahead log, so many processes can read it while one of them
+    writes. Each process (and thread) opens its own connection.
+    """
+
+    def __init__(self, path, quantum=1e-9, readonly=False):
+        """
+        Create the InverseStore object
+        """
+        if quantum <= 0:
+            raise ValueError("quantum must be positive, got {}".format(quantum))
+        self.path = str(path)
+        self.quantum = float(quantum)
+        self.readonly = readonly
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        connection = self._connection()
+        if not readonly:
+            with connection:
+                connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value)")
+                connection.execute("INSERT OR IGNORE INTO meta VALUES ('quantum', ?)",
+                                   (self.quantum,))
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS inverse (backend TEXT, ellipse TEXT, "
+                    "lat1 INTEGER, lon1 INTEGER, lat2 INTEGER, lon2 INTEGER, heading_initial REAL, "
+                    "heading_reverse REAL, distance REAL, "
+                    "PRIMARY KEY (backend, ellipse, lat1, lon1, lat2, lon2)) WITHOUT ROWID")
+        stored_quantum = connection.execute(
+            "SELECT value FROM meta WHERE name = 'quantum'").fetchone()[0]
+        if stored_quantum != self.quantum:
+            raise ValueError("Store {} was created with quantum {}, not {}"
+                             "".format(self.path, stored_quantum, self.quantum))
+
+    def _connection(self):
+        """
+        Return the connection of the current process and thread
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            if self.readonly:
+                uri = "{}?mode=ro".format(pathlib.Path(self.path).resolve().as_uri())
+                connection = sqlite3.connect(uri, uri=True, timeout=30)
+            else:
+                connection = sqlite3.connect(self.path, timeout=30)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def _ellipse_key(ellipse):
+        if isinstance(ellipse, list):
+            ellipse = tuple(ellipse)
+        return _ellipse_key(ellipse)
+
+    def key(self, lat1, lon1, lat2, lon2, ellipse="WGS84", backend="pyproj"):
+        """
+        Return the key of a pair of positions, given in decimal degrees
+        """
+        quantum = self.quantum
+        return (backend, self._ellipse_key(ellipse), round(lat1 / quantum), round(lon1 / quantum),
+                round(lat2 / quantum), round(lon2 / quantum))
+
+    def get(self, key):
+        """
+        Return the stored result of key, or None if it is not stored
+        """
+        result = self._connection().execute(
+            "SELECT heading_initial, heading_reverse, distance FROM inverse WHERE backend = ? AND "
+            "ellipse = ? AND lat1 = ? AND lon1 = ? AND lat2 = ? AND lon2 = ?", key).fetchone()
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """
+        Store the result of key
+        """
+        self.put_many([key + tuple(result)])
+
+    def put_many(self, rows):
+        """
+        Store many results at once, given as rows of key + (heading_initial, heading_reverse,
+        distance)
+        """
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO inverse VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def warm(self, a, b=None, ellipse="WGS84", backend=None, block_size=512):
+        """
+        Solve and store the inverse geodesic problem for all pairs of positions of a and b
+
+        Parameters
+        ----------
+        a : LatLonArray or sequence of LatLon
+            The first positions of the pairs
+        b : LatLonArray or sequence of LatLon, optional
+            The second positions of the pairs. Defaults to a.
+        ellipse : str or tuple, optional, default="WGS84"
+            Ellipsoid name or (a, f) tuple passed to the geodesic engine
+        backend : str, optional
+            Geodesic backend, see *latloncalc.geodesic.get_engine*
+        block_size : int, optional, default=512
+            Maximum number of rows and columns of a tile
+
+        Returns
+        -------
+        int:
+            The number of stored pairs
+
+        Notes
+        -----
+        The pairs are solved in tiles, just like *latloncalc.matrix.distance_matrix*, and each tile
+        is stored in one transaction. Use *warm_from_matrix* to store a precomputed distance
+        matrix instead.
+        """
+        from latloncalc.arrays import _as_latlonarray
+        from latloncalc.matrix import _tiles
+        a = _as_latlonarray(a)
+        b = a if b is None else _as_latlonarray(b)
+        if backend is None:
+            backend = get_default_backend()
+        engine = get_engine(ellipse, backend)
+        ellipse_key = self._ellipse_key(ellipse)
+        n_pairs = 0
+        for rows, columns in _tiles(len(a), len(b), block_size):
+            lon1, lon2 = np.meshgrid(a.lon[rows], b.lon[columns], indexing="ij")
+            lat1, lat2 = np.meshgrid(a.lat[rows], b.lat[columns], indexing="ij")
+            lon1, lat1, lon2, lat2 = lon1.ravel(), lat1.ravel(), lon2.ravel(), lat2.ravel()
+            heading_initial, heading_reverse, distance = _solve_pairs(engine, lon1, lat1, lon2,
+                                                                      lat2)
+            self._put_pairs(backend, ellipse_key, lat1, lon1, lat2, lon2, heading_initial,
+                            heading_reverse, distance)
+            n_pairs += lat1.size
+        return n_pairs
+
+    def warm_from_matrix(self, a, b, distances, headings=None, ellipse="WGS84", backend=None,
+                         block_size=512):
+        """
+        Store a precomputed distance matrix, e.g. the output of *latloncalc.matrix.distance_matrix*
+
+        Parameters
+        ----------
+        a : LatLonArray or sequence of LatLon
+            The positions corresponding to the rows of the matrix
+        b : LatLonArray or sequence of LatLon
+            The positions corresponding to the columns of the matrix, None if they are a
+        distances : array_like
+            The distances in km, of shape (len(a), len(b)). May be a numpy.memmap.
+        headings : tuple of array_like, optional
+            The initial and reverse headings in degrees, both of the same shape as distances.
+            Headings which are not given or NaN are solved with the geodesic engine.
+        ellipse : str or tuple, optional, default="WGS84"
+            Ellipsoid name or (a, f) tuple with which the matrix was computed
+        backend : str, optional
+            Geodesic backend with which the matrix was computed, see
+            *latloncalc.geodesic.get_engine*
+        block_size : int, optional, default=512
+            Maximum number of rows and columns stored in one transaction
+
+        Returns
+        -------
+        int:
+            The number of stored pairs
+        """
+        from latloncalc.arrays import _as_latlonarray
+        from latloncalc.matrix import _tiles
+        a = _as_latlonarray(a)
+        b = a if b is None else _as_latlonarray(b)
+        shape = (len(a), len(b))
+        distances = np.asarray(distances)
+        if headings is not None:
+            headings = [np.asarray(heading) for heading in headings]
+        if distances.shape != shape or (
+                headings is not None and any(heading.shape != shape for heading in headings)):
+            raise ValueError("The matrices must have the shape {}".format(shape))
+        if backend is None:
+            backend = get_default_backend()
+        ellipse_key = self._ellipse_key(ellipse)
+        n_pairs = 0
+        for rows, columns in _tiles(len(a), len(b), block_size):
+            lon1, lon2 = np.meshgrid(a.lon[rows], b.lon[columns], indexing="ij")
+            lat1, lat2 = np.meshgrid(a.lat[rows], b.lat[columns], indexing="ij")
+            lon1, lat1, lon2, lat2 = lon1.ravel(), lat1.ravel(), lon2.ravel(), lat2.ravel()
+            distance = np.asarray(distances[rows, columns], dtype=np.float64).ravel()
+            if headings is None:
+                heading_initial = np.full(lat1.size, np.nan)
+                heading_reverse = np.full(lat1.size, np.nan)
+            else:
+                heading_initial, heading_reverse = [
+                    np.array(heading[rows, columns], dtype=np.float64).ravel()
+                    for heading in headings]
+            missing = np.flatnonzero(np.isnan(heading_initial) | np.isnan(heading_reverse))
+            if missing.size:
+                heading_initial[missing], heading_reverse[missing], _ = _solve_pairs(
+                    get_engine(ellipse, backend), lon1[missing], lat1[missing], lon2[missing],
+                    lat2[missing])
+            self._put_pairs(backend, ellipse_key, lat1, lon1, lat2, lon2, heading_initial,
+                            heading_reverse, distance)
+            n_pairs += lat1.size
+        return n_pairs
+
+    def _put_pairs(self, backend, ellipse_key, lat1, lon1, lat2, lon2, heading_initial,
+                   heading_reverse, distance):
+        """
+        Store the results of arrays of pairs of positions in one transaction
+        """
+        keys = [np.rint(coordinate / self.quantum).astype(np.int64).tolist()
+                for coordinate in (lat1, lon1, lat2, lon2)]
+        self.put_many(zip([backend] * len(keys[0]), [ellipse_key] * len(keys[0]), *keys,
+                          heading_initial.tolist(), heading_reverse.tolist(), distance.tolist()))
+
+    def invalidate(self, ellipse=None, backend=None):
+        """
+        Remove the stored results of an ellipsoid and/or backend, or all results if neither is
+        given
+        """
+        conditions, parameters = [], []
+        if ellipse is not None:
+            conditions.append("ellipse = ?")
+            parameters.append(self._ellipse_key(ellipse))
+        if backend is not None:
+            conditions.append("backend = ?")
+            parameters.append(backend)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM inverse" + where, parameters)
+
+    def info(self):
+        """
+        Return the statistics of this process as a CacheInfo named tuple. The maxsize is None,
+        because the store is not bounded.
+        """
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return CacheInfo(hits, misses, 0, None, len(self))
+
+    def close(self):
+        """
+        Close the connection of the current thread
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM inverse").fetchone()[0]
+
+    def __repr__(self):
+        return "InverseStore(%r, quantum=%g)" % (self.path, self.quantum)
+
+
+_inverse_store = None
+
+
+def enable_inverse_store(path, quantum=1e-9, readonly=False):
+    """
+    Look up and store the results of all scalar inverse geodesic calculations of LatLon objects in
+    a persistent InverseStore. If the in-memory cache is enabled as well, it is consulted first.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        The SQLite file
+    quantum : float, optional, default=1e-9
+        Coordinates are rounded to a multiple of quantum degrees to build the keys
+    readonly : bool, optional, default=False
+        Only look up results, never store new ones
+
+    Returns
+    -------
+    InverseStore:
+        The active store, e.g. to warm it
+    """
+    global _inverse_store
+    _inverse_store = InverseStore(path, quantum, readonly)
+    return _inverse_store
+
+
+def disable_inverse_store():
+    """
+    Stop using the persistent store
+    """
+    global _inverse_store
+    if _inverse_store is not None:
+        _inverse_store.close()
+    _inverse_store = None
+
+
+def get_inverse_store():
+    """
+    Return the active InverseStore, or None if it is disabled
+    """
+    return _inverse_store
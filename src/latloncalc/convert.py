@@ -0,0 +1,265 @@
+"""
+Streaming conversion of coordinate columns in delimited text files.
+
+The input is read in chunks of a fixed number of rows, the latitude and longitude columns of each
+chunk are parsed with a compiled input format (see *latloncalc.formats.compile_format*) and written
+again with a compiled output format (see *latloncalc.formats.compile_output_format*). Only a few
+chunks are held in memory at any time, so files larger than the available memory can be converted.
+Chunks can optionally be converted by a pool of worker processes; the output order is always the
+same as the input order.
+
+The conversion is also available from the command line::
+
+    $ python -m latloncalc convert positions.csv converted.csv --lat-column lat
+        --lon-column lon --input-format "d% %m% %S% %H" --output-format "D"
+"""
+
+import collections
+import concurrent.futures
+import csv
+import itertools
+import sys
+
+import numpy as np
+
+from latloncalc.formats import compile_format, compile_output_format
+from latloncalc.latlon import Latitude, Longitude
+
+ERROR_MODES = ("raise", "keep")
+
+
+class ConversionSettings:
+    """
+    Settings of a conversion, shared by all chunks
+
+    Parameters
+    ----------
+    lat_column : int
+        Index of the latitude column
+    lon_column : int
+        Index of the longitude column
+    input_format : str, optional, default="D"
+        Format of the coordinates in the input, see *string2geocoord*
+    output_format : str, optional, default="D"
+        Format of the coordinates in the output, see *GeoCoord.to_string*
+    n_digits_seconds : int, optional, default=7
+        Number of digits used for the seconds given with %S in the output format
+    n_digits_decimal_minutes : int, optional, default=7
+        Number of digits used for the decimal minutes given with %M in the output format
+    errors : {"raise", "keep"}, optional, default="raise"
+        What to do with rows which can not be parsed. "raise" raises a ValueError, "keep" copies
+        these rows unchanged to the output.
+    """
+
+    def __init__(self, lat_column, lon_column, input_format="D", output_format="D",
+                 n_digits_seconds=7, n_digits_decimal_minutes=7, errors="raise"):
+        """
+        Initialise the ConversionSettings object
+        """
+        if errors not in ERROR_MODES:
+            raise ValueError("errors must be one of {}, got {}".format(", ".join(ERROR_MODES),
+                                                                      errors))
+        self.lat_column = lat_column
+        self.lon_column = lon_column
+        self.input_format = input_format
+        self.output_format = output_format
+        self.n_digits_seconds = n_digits_seconds
+        self.n_digits_decimal_minutes = n_digits_decimal_minutes
+        self.errors = errors
+
+
+def convert_chunk(rows, settings, first_line=1):
+    """
+    Convert the coordinate columns of a chunk of rows
+
+    Parameters
+    ----------
+    rows : list of list of str
+        The rows of the chunk, each row is a list of cell values
+    settings : ConversionSettings
+        The settings of the conversion
+    first_line : int, optional, default=1
+        Line number of the first row of the chunk, only used in error messages
+
+    Returns
+    -------
+    list of list of str:
+        The converted rows
+    """
+    lat_strs = [row[settings.lat_column] if len(row) > settings.lat_column else None
+                for row in rows]
+    lon_strs = [row[settings.lon_column] if len(row) > settings.lon_column else None
+                for row in rows]
+    errors = []
+    lat = compile_format(settings.input_format, Latitude).parse_array(lat_strs, errors=errors)
+    lon = compile_format(settings.input_format, Longitude).parse_array(lon_strs, errors=errors)
+    if errors and settings.errors == "raise":
+        index, coord_str = min(errors, key=lambda error: error[0])
+        raise ValueError("Coordinate string {!r} in line {} does not match format {!r}"
+                         "".format(coord_str, first_line + index, settings.input_format))
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    formatter = compile_output_format(settings.output_format, settings.n_digits_seconds,
+                                      settings.n_digits_decimal_minutes)
+    lat_out = formatter.format_array(lat[valid], Latitude)
+    lon_out = formatter.format_array(lon[valid], Longitude)
+    converted = []
+    formatted = zip(lat_out, lon_out)
+    for row, is_valid in zip(rows, valid.tolist()):
+        if is_valid:
+            row = list(row)
+            row[settings.lat_column], row[settings.lon_column] = next(formatted)
+        converted.append(row)
+    return converted
+
+
+def _chunks(rows, chunk_size):
+    """
+    Yield the rows in lists of at most chunk_size rows
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def convert_rows(rows, settings, chunk_size=100000, n_workers=None, first_line=1):
+    """
+    Convert the coordinate columns of a stream of rows
+
+    Parameters
+    ----------
+    rows : iterable of list of str
+        The rows to convert, e.g. a csv.reader object
+    settings : ConversionSettings
+        The settings of the conversion
+    chunk_size : int, optional, default=100000
+        Number of rows converted at once
+    n_workers : int, optional
+        If given and larger than 1, the chunks are converted by a pool of n_workers processes.
+        At most 2 * n_workers chunks are held in memory at any time.
+    first_line : int, optional, default=1
+        Line number of the first row, only used in error messages
+
+    Yields
+    ------
+    list of list of str:
+        The converted chunks, in the same order as the input
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1, got {}".format(chunk_size))
+    chunks = _chunks(rows, chunk_size)
+    if not n_workers or n_workers <= 1:
+        for index, chunk in enumerate(chunks):
+            yield convert_chunk(chunk, settings, first_line + index * chunk_size)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=n_workers) as executor:
+        pending = collections.deque()
+        for index, chunk in enumerate(chunks):
+            pending.append(executor.submit(convert_chunk, chunk, settings,
+                                           first_line + index * chunk_size))
+            if len(pending) >= 2 * n_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _column_index(column, header):
+    """
+    Return the index of a column given by index or by name
+    """
+    if isinstance(column, int):
+        return column
+    try:
+        return int(column)
+    except ValueError:
+        pass
+    if header is None:
+        raise ValueError("Column {!r} can only be given by name if the input has a header"
+                         "".format(column))
+    try:
+        return header.index(column)
+    except ValueError:
+        raise ValueError("Column {!r} not found in header {}".format(column, header))
+
+
+def convert_file(input_file, output_file, lat_column, lon_column, input_format="D",
+                 output_format="D", delimiter=",", header=True, chunk_size=100000, n_workers=None,
+                 n_digits_seconds=7, n_digits_decimal_minutes=7, errors="raise"):
+    """
+    Convert the coordinate columns of a delimited text file
+
+    Parameters
+    ----------
+    input_file : str or file object
+        Name of the input file or a text file opened for reading. "-" reads from standard input.
+    output_file : str or file object
+        Name of the output file or a text file opened for writing. "-" writes to standard output.
+    lat_column : int or str
+        Index or header name of the latitude column
+    lon_column : int or str
+        Index or header name of the longitude column
+    input_format : str, optional, default="D"
+        Format of the coordinates in the input, see *string2geocoord*
+    output_format : str, optional, default="D"
+        Format of the coordinates in the output, see *GeoCoord.to_string*
+    delimiter : str, optional, default=","
+        Delimiter between the columns, e.g. "\\t" for tab separated files
+    header : bool, optional, default=True
+        If True, the first line is a header which is copied to the output unchanged
+    chunk_size : int, optional, default=100000
+        Number of rows converted at once
+    n_workers : int, optional
+        If given and larger than 1, the chunks are converted by a pool of n_workers processes
+    n_digits_seconds : int, optional, default=7
+        Number of digits used for the seconds given with %S in the output format
+    n_digits_decimal_minutes : int, optional, default=7
+        Number of digits used for the decimal minutes given with %M in the output format
+    errors : {"raise", "keep"}, optional, default="raise"
+        What to do with rows which can not be parsed. "raise" raises a ValueError, "keep" copies
+        these rows unchanged to the output.
+
+    Returns
+    -------
+    int:
+        The number of converted data rows
+    """
+    close = []
+    if isinstance(input_file, str):
+        if input_file == "-":
+            input_file = sys.stdin
+        else:
+            input_file = open(input_file, "r", newline="")
+            close.append(input_file)
+    if isinstance(output_file, str):
+        if output_file == "-":
+            output_file = sys.stdout
+        else:
+            output_file = open(output_file, "w", newline="")
+            close.append(output_file)
+    try:
+        reader = csv.reader(input_file, delimiter=delimiter)
+        writer = csv.writer(output_file, delimiter=delimiter, lineterminator="\n")
+        header_row = None
+        if header:
+            header_row = next(reader, None)
+            if header_row is None:
+                return 0
+            writer.writerow(header_row)
+        settings = ConversionSettings(_column_index(lat_column, header_row),
+                                      _column_index(lon_column, header_row),
+                                      input_format=input_format, output_format=output_format,
+                                      n_digits_seconds=n_digits_seconds,
+                                      n_digits_decimal_minutes=n_digits_decimal_minutes,
+                                      errors=errors)
+        n_rows = 0
+        for chunk in convert_rows(reader, settings, chunk_size=chunk_size, n_workers=n_workers,
+                                  first_line=2 if header else 1):
+            writer.writerows(chunk)
+            n_rows += len(chunk)
+        return n_rows
+    finally:
+        for file in close:
+            file.close()
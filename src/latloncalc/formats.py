@@ -0,0 +1,487 @@
+"""
+Compiled coordinate formats for bulk string conversion.
+
+*string2geocoord* interprets its format string again for every coordinate string it parses.
+*compile_format* does this work once: the format string is translated into a single regular
+expression and the returned *CoordinateParser* object can be reused to parse one string or a
+whole list or array of strings straight into float64 decimal degrees.
+
+*compile_output_format* does the same for the output side: the returned *CoordinateFormatter*
+object renders one coordinate or whole arrays of coordinates to strings, or writes them straight
+into a text file.
+
+The format mini-language is the same as the one used by *string2geocoord*:
+
+    - `H` is a hemisphere identifier (e.g. N, S, E or W)
+    - `D` is a coordinate in decimal degrees notation
+    - `d` is a coordinate in degrees notation
+    - `M` is a coordinate in decimal minutes notation
+    - `m` is a coordinate in minutes notation
+    - `S` is a coordinate in seconds notation
+
+All components are separated by the "%" character, any other element is a literal separator.
+"""
+
+import functools
+import re
+
+import numpy as np
+
+_NUMBER_PATTERN = r"[ \t]*([-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)[ \t]*"
+
+# Which component of the coordinate is set by each identifier
+_FIELDS = {"D": "degree",
+           "d": "degree",
+           "M": "minute",
+           "m": "minute",
+           "S": "second"}
+
+
+def _calc_degreeminutes_array(decimal_degree):
+    """
+    Calculate degree, minute, decimal minute and second from decimal degrees (vectorized
+    version of GeoCoord._calc_degreeminutes giving identical results)
+    """
+    # Store whether the coordinate is negative or positive, 0 for 0 like cmp(decimal_degree, 0)
+    sign = (decimal_degree > 0).astype(np.float64) - (decimal_degree < 0)
+    decimal_degree = np.abs(decimal_degree)
+    degree = decimal_degree // 1
+    decimal_minute = (decimal_degree - degree) * 60.
+    minute = decimal_minute // 1
+    second = (decimal_minute - minute) * 60.
+    return degree * sign, minute * sign, decimal_minute, second * sign
+
+
+class CoordinateParser:
+    """
+    Reusable parser for coordinate strings of one format
+
+    Parameters
+    ----------
+    format_str : str
+        A string representation of the sections of the coordinate strings, e.g. "d% %m% %S% %H".
+        See *string2geocoord* for a detailed explanation on how to specify formats.
+    positive_hemispheres : str, optional, default="NE"
+        Hemisphere identifiers which give a positive coordinate
+    negative_hemispheres : str, optional, default="SW"
+        Hemisphere identifiers which give a negative coordinate
+
+    Notes
+    -----
+    Not meant to be created directly - use *compile_format*, which caches the parsers.
+    """
+
+    def __init__(self, format_str, positive_hemispheres="NE", negative_hemispheres="SW"):
+        """
+        Initialise the CoordinateParser object
+        """
+        self.format_str = format_str
+        self.positive_hemispheres = positive_hemispheres
+        self.negative_hemispheres = negative_hemispheres
+        hemisphere_pattern = "([{}])".format(
+            re.escape(positive_hemispheres + negative_hemispheres))
+        pattern = []
+        # Group number of each component. If a component is given twice, the last one is used,
+        # like string2geocoord does
+        self._groups = {}
+        self._n_groups = 0
+        for element in format_str.split("%"):
+            if element in _FIELDS:
+                pattern.append(_NUMBER_PATTERN)
+                self._groups[_FIELDS[element]] = self._n_groups
+                self._n_groups += 1
+            elif element == "H":
+                pattern.append(hemisphere_pattern)
+                self._groups["hemisphere"] = self._n_groups
+                self._n_groups += 1
+            else:
+                pattern.append(re.escape(element))
+        if not set(self._groups) - {"hemisphere"}:
+            raise ValueError("Format string {} does not contain a degree, minute or second "
+                             "identifier".format(format_str))
+        body = "".join(pattern)
+        self._regex = re.compile(r"[ \t]*" + body + r"[ \t]*\Z")
+        self._bulk_regex = re.compile(r"^[ \t]*" + body + r"[ \t]*$", re.MULTILINE)
+
+    def _combine(self, columns):
+        """
+        Combine the captured components (scalars or arrays) into decimal degrees
+        """
+        degree = columns.get("degree", 0.)
+        minute = columns.get("minute", 0.)
+        second = columns.get("second", 0.)
+        hemisphere = columns.get("hemisphere")
+        if hemisphere is None:
+            return degree + minute / 60. + second / 3600.
+        value = np.abs(degree) + np.abs(minute) / 60. + np.abs(second) / 3600.
+        value = np.where(np.isin(hemisphere, list(self.negative_hemispheres)), -value, value)
+        # string2geocoord updates the coordinate once more after setting the hemisphere.
+        # Do the same to get identical results
+        degree, minute, _, second = _calc_degreeminutes_array(value)
+        return degree + minute / 60. + second / 3600.
+
+    def _fields_of(self, groups):
+        """
+        Convert the captured groups of a single match into components
+        """
+        columns = {}
+        for name, index in self._groups.items():
+            columns[name] = groups[index] if name == "hemisphere" else float(groups[index])
+        return columns
+
+    def parse(self, coord_str):
+        """
+        Parse a single coordinate string
+
+        Parameters
+        ----------
+        coord_str : str
+            A string representation of a geographic coordinate (e.g. "5 52 59.88 N")
+
+        Returns
+        -------
+        float:
+            The coordinate in decimal degrees
+        """
+        match = self._regex.match(coord_str)
+        if match is None:
+            raise ValueError("Coordinate string {!r} does not match format {!r}"
+                             "".format(coord_str, self.format_str))
+        return float(self._combine(self._fields_of(match.groups())))
+
+    def parse_array(self, coord_strs, errors=None):
+        """
+        Parse a sequence of coordinate strings in one go
+
+        Parameters
+        ----------
+        coord_strs : list of str or numpy.ndarray
+            String representations of geographic coordinates
+        errors : list, optional
+            If given, strings which can not be parsed do not raise a ValueError. Instead, their
+            value is set to NaN and a tuple (row_index, coord_str) is appended to this list.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The coordinates in decimal degrees as a float64 array
+        """
+        if isinstance(coord_strs, np.ndarray):
+            coord_strs = coord_strs.ravel().tolist()
+        else:
+            coord_strs = list(coord_strs)
+        n_rows = len(coord_strs)
+        if n_rows == 0:
+            return np.empty(0, dtype=np.float64)
+
+        try:
+            text = "\n".join(coord_strs)
+        except TypeError:  # Some rows are not strings
+            text = ""
+        rows = None
+        if text.count("\n") == n_rows - 1 and text:
+            # Each line of text is one row, so each row can match only once
+            rows = self._bulk_regex.findall(text)
+            if len(rows) != n_rows:
+                rows = None
+        if rows is not None:
+            if self._n_groups == 1:
+                rows = [(row,) for row in rows]
+            valid = None
+        else:
+            # Not all rows match: do them one by one to find out which ones fail
+            rows = []
+            valid = np.ones(n_rows, dtype=bool)
+            empty = None
+            for index, coord_str in enumerate(coord_strs):
+                match = self._regex.match(coord_str) if isinstance(coord_str, str) else None
+                if match is None:
+                    if errors is None:
+                        raise ValueError("Coordinate string {!r} in row {} does not match "
+                                         "format {!r}".format(coord_str, index, self.format_str))
+                    errors.append((index, coord_str))
+                    valid[index] = False
+                    if empty is None:
+                        empty = ["0"] * self._n_groups
+                        if "hemisphere" in self._groups:
+                            empty[self._groups["hemisphere"]] = self.positive_hemispheres[0]
+                    rows.append(empty)
+                else:
+                    rows.append(match.groups())
+
+        group_columns = list(zip(*rows))
+        columns = {}
+        for name, index in self._groups.items():
+            if name == "hemisphere":
+                columns[name] = np.array(group_columns[index])
+            else:
+                columns[name] = np.array(group_columns[index], dtype=np.float64)
+        values = np.asarray(self._combine(columns), dtype=np.float64)
+        if valid is not None:
+            values[~valid] = np.nan
+        return values
+
+    def __call__(self, coord_str):
+        return self.parse(coord_str)
+
+    def __repr__(self):
+        return "CoordinateParser(%r)" % self.format_str
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_format(format_str, positive_hemispheres, negative_hemispheres):
+    return CoordinateParser(format_str, positive_hemispheres, negative_hemispheres)
+
+
+def compile_format(format_str, coord_class=None):
+    """
+    Compile a coordinate format string into a reusable parser
+
+    Parameters
+    ----------
+    format_str : str
+        A string representation of the sections of the coordinate strings (e.g.
+        "d% %m% %S% %H"). See *string2geocoord* for a detailed explanation on how to specify
+        formats.
+    coord_class : class, optional
+        Latitude or Longitude. If given, only the hemisphere identifiers of this class (N and S
+        or E and W) are accepted.
+
+    Returns
+    -------
+    CoordinateParser:
+        A parser for coordinate strings in the given format
+
+    Examples
+    --------
+    >>> parser = compile_format("d% %m% %S% %H")
+    >>> round(parser.parse("5 52 59.88 N"), 4)
+    5.8833
+    >>> parser.parse_array(["5 52 59.88 N", "162 4 59.88 W"])
+    array([   5.8833, -162.0833])
+    """
+    positive, negative = getattr(coord_class, "hemispheres", ("NE", "SW"))
+    return _compile_format(format_str, positive, negative)
+
+
+class CoordinateFormatter:
+    """
+    Reusable formatter which outputs coordinates as strings in one format
+
+    Parameters
+    ----------
+    format_str : str
+        A string of the form A%B%C where A, B and C are identifiers. Unknown identifiers (e.g. " ",
+        ", " or "_") will be inserted as separators in a position corresponding to the position in
+        format. See *GeoCoord.to_string*.
+    n_digits_seconds : int, optional, default=7
+        Number of digits used for the seconds given with %S
+    n_digits_decimal_minutes : int, optional, default=7
+        Number of digits used for the decimal minutes given with %M
+
+    Notes
+    -----
+    Not meant to be created directly - use *compile_output_format*, which caches the formatters.
+    The output is identical to the output of *GeoCoord.to_string* and *LatLon.to_string*.
+    Only the components referenced by the format string are calculated.
+    """
+
+    def __init__(self, format_str, n_digits_seconds=7, n_digits_decimal_minutes=7):
+        """
+        Initialise the CoordinateFormatter object
+        """
+        self.format_str = format_str
+        self.n_digits_seconds = int(n_digits_seconds)
+        self.n_digits_decimal_minutes = int(n_digits_decimal_minutes)
+        second_format = "{:." + "{:d}".format(self.n_digits_seconds) + "f}"
+        minutes_format = "{:." + "{:d}".format(self.n_digits_decimal_minutes) + "f}"
+        self._field_formats = {"H": "{}", "D": "{}", "d": "{}", "m": "{}",
+                               "M": minutes_format, "S": second_format}
+        format_elements = format_str.split("%")
+        self.fields = []  # The identifiers in the order in which they appear
+        template = []
+        for element in format_elements:
+            if element in self._field_formats:
+                template.append(self._field_formats[element])
+                self.fields.append(element)
+            else:
+                template.append(element.replace("{", "{{").replace("}", "}}"))
+        self._template = "".join(template)
+        # No negative values when hemispheres are indicated
+        self.strip_sign = "H" in format_elements
+
+    @staticmethod
+    def _coord_value(coord, field):
+        """
+        Return the value of a component of a GeoCoord object as used by the format string
+        """
+        if field == "H":
+            return coord.get_hemisphere()
+        if field == "D":
+            return coord.decimal_degree
+        if field == "d":
+            return int(coord.degree)
+        if field == "m":
+            return int(abs(coord.minute))
+        if field == "M":
+            return abs(coord.decimal_minute)
+        return abs(coord.second)
+
+    def format(self, coord):
+        """
+        Output a single Latitude or Longitude object as a string
+
+        Parameters
+        ----------
+        coord : GeoCoord
+            The coordinate to output
+
+        Returns
+        -------
+        str:
+            The coordinate formatted according to the format string
+        """
+        coord_str = self._template.format(*[self._coord_value(coord, field)
+                                            for field in self.fields])
+        if self.strip_sign:
+            coord_str = coord_str.replace("-", "")
+        return coord_str
+
+    @staticmethod
+    def _normalize(decimal_degree, coord_class):
+        """
+        Return the decimal degrees exactly as they are stored by coord_class(decimal_degree)
+        """
+        decimal_degree = np.asarray(decimal_degree, dtype=np.float64).reshape(-1)
+        decimal_degree = decimal_degree + 0. / 60. + 0. / 3600.
+        if hasattr(coord_class, "range180"):
+            # A Longitude reports its values in the range -180 to 180 (see Longitude.range180)
+            degree, minute, _, second = _calc_degreeminutes_array(
+                ((decimal_degree + 180) % 360) - 180)
+            decimal_degree = degree + minute / 60. + second / 3600.
+        return decimal_degree
+
+    def _columns(self, decimal_degree, coord_class):
+        """
+        Return the output of each identifier for an array of decimal degrees
+        """
+        decimal_degree = self._normalize(decimal_degree, coord_class)
+        components = None
+        columns = []
+        for field in self.fields:
+            if field == "H":
+                positive, negative = coord_class.hemispheres
+                columns.append(np.where(decimal_degree < 0, negative, positive).tolist())
+                continue
+            if field == "D":
+                columns.append(decimal_degree.tolist())
+                continue
+            if components is None:
+                components = _calc_degreeminutes_array(decimal_degree)
+            degree, minute, decimal_minute, second = components
+            if field == "d":
+                columns.append(degree.astype(np.int64).tolist())
+            elif field == "m":
+                columns.append(np.abs(minute).astype(np.int64).tolist())
+            elif field == "M":
+                columns.append(np.abs(decimal_minute).tolist())
+            else:
+                columns.append(np.abs(second).tolist())
+        return columns
+
+    def format_array(self, decimal_degree, coord_class):
+        """
+        Output an array of coordinates as strings
+
+        Parameters
+        ----------
+        decimal_degree : array_like
+            The coordinates in decimal degrees
+        coord_class : class
+            Latitude or Longitude. The output is identical to the output of
+            coord_class(value).to_string(...) for each value.
+
+        Returns
+        -------
+        list of str:
+            The coordinates formatted according to the format string
+        """
+        columns = self._columns(decimal_degree, coord_class)
+        if self._template == "{}":
+            coord_strs = list(map(str, columns[0]))
+        elif not columns:
+            coord_strs = [self._template.format()] * np.size(decimal_degree)
+        else:
+            coord_strs = list(map(self._template.format, *columns))
+        if self.strip_sign:
+            coord_strs = [coord_str.replace("-", "") for coord_str in coord_strs]
+        return coord_strs
+
+    def write(self, file, lat, lon, delimiter=", ", newline="\n", chunk_size=100000):
+        """
+        Write arrays of latitudes and longitudes to a text file, one lat/lon pair per line
+
+        Parameters
+        ----------
+        file : file object
+            Text buffer or file opened for writing
+        lat : array_like
+            The latitudes in decimal degrees
+        lon : array_like
+            The longitudes in decimal degrees
+        delimiter : str, optional, default=", "
+            String written between the latitude and longitude
+        newline : str, optional, default="\\n"
+            String written at the end of each line
+        chunk_size : int, optional, default=100000
+            Number of lines formatted at once. Limits the memory used for the intermediate
+            strings.
+        """
+        # Import here to prevent a circular import
+        from latloncalc.latlon import Latitude, Longitude
+        lat = np.asarray(lat, dtype=np.float64).reshape(-1)
+        lon = np.asarray(lon, dtype=np.float64).reshape(-1)
+        if lat.shape != lon.shape:
+            raise ValueError("lat and lon must have the same length ({} != {})"
+                             "".format(lat.size, lon.size))
+        line_format = "{}" + delimiter.replace("{", "{{").replace("}", "}}") + "{}" + newline
+        for start in range(0, lat.size, chunk_size):
+            lat_strs = self.format_array(lat[start:start + chunk_size], Latitude)
+            lon_strs = self.format_array(lon[start:start + chunk_size], Longitude)
+            file.write("".join(map(line_format.format, lat_strs, lon_strs)))
+
+    def __call__(self, coord):
+        return self.format(coord)
+
+    def __repr__(self):
+        return "CoordinateFormatter(%r)" % self.format_str
+
+
+@functools.lru_cache(maxsize=128)
+def compile_output_format(format_str, n_digits_seconds=7, n_digits_decimal_minutes=7):
+    """
+    Compile an output format string into a reusable formatter
+
+    Parameters
+    ----------
+    format_str : str
+        A string of the form A%B%C where A, B and C are identifiers, e.g. "d% %m% %S% %H".
+        See *GeoCoord.to_string* for the possible identifiers.
+    n_digits_seconds : int, optional, default=7
+        Number of digits used for the seconds given with %S
+    n_digits_decimal_minutes : int, optional, default=7
+        Number of digits used for the decimal minutes given with %M
+
+    Returns
+    -------
+    CoordinateFormatter:
+        A formatter for coordinates in the given format
+
+    Examples
+    --------
+    >>> from latloncalc.latlon import Latitude
+    >>> formatter = compile_output_format("d% %m% %S% %H", n_digits_seconds=2)
+    >>> formatter.format_array([5.8833, -12.05], Latitude)
+    ['5 52 59.88 N', '12 3 0.00 S']
+    """
+    return CoordinateFormatter(format_str, n_digits_seconds, n_digits_decimal_minutes)
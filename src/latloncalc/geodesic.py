@@ -0,0 +1,502 @@
+"""
+Geodesic engines shared by all distance, heading and offset calculations.
+
+Constructing a *pyproj.Geod* object is more expensive than solving a single inverse geodesic
+problem, so engines are created once per ellipsoid and backend and then handed out from a
+thread-safe cache by *get_engine*. Three backends are available:
+
+    - `pyproj` uses the geodesic algorithms of Karney as implemented by pyproj (default)
+    - `haversine` uses a pure NumPy spherical model (fast, approximate)
+    - `vincenty` uses a pure NumPy implementation of the Vincenty formulae on the ellipsoid
+
+Additional backends can be added with *register_backend*. Calculations which are not given a
+backend use the default backend, which can be changed with *set_default_backend*.
+
+All engines share the calling convention of *pyproj.Geod*: longitudes come before latitudes,
+angles are in degrees and distances in meters. Scalar input gives scalar output, array input
+gives array output.
+
+pyproj is imported when the first ellipsoid is looked up or the first pyproj engine is created,
+not when this module is imported, so parsing and formatting coordinates does not pay for it.
+"""
+
+import threading
+
+import numpy as np
+
+
+def _ellipsoid_parameters(ellipse):
+    """
+    Return the semi-major axis in meters and the flattening of an ellipsoid
+
+    Parameters
+    ----------
+    ellipse : str or tuple
+        Either the name of an ellipsoid known to pyproj (e.g. "WGS84" or "sphere") or a tuple
+        (a, f) with the semi-major axis in meters and the flattening.
+    """
+    if isinstance(ellipse, str):
+        import pyproj
+
+        try:
+            params = pyproj.get_ellps_map()[ellipse]
+        except KeyError:
+            raise ValueError("Unknown ellipsoid name: {}".format(ellipse))
+        a = params["a"]
+        if "rf" in params:
+            f = 1.0 / params["rf"]
+        else:
+            f = (a - params["b"]) / a
+        return float(a), float(f)
+    try:
+        a, f = ellipse
+    except (TypeError, ValueError):
+        raise ValueError("ellipse must be an ellipsoid name or an (a, f) tuple, got {}"
+                         "".format(ellipse))
+    return float(a), float(f)
+
+
+def _is_scalar(*values):
+    """
+    Return True if all values are scalars
+    """
+    return all(np.ndim(value) == 0 for value in values)
+
+
+def _as_output(values, scalar):
+    """
+    Convert the outputs of a NumPy engine to Python floats if the input was scalar
+    """
+    if scalar:
+        return tuple(float(value) for value in values)
+    return values
+
+
+def _wrap180(angle):
+    """
+    Wrap angles in degrees to the range -180 to 180
+    """
+    return (angle + 180.) % 360. - 180.
+
+
+class GeodesicEngine:
+    """
+    Base class of all geodesic engines
+
+    Parameters
+    ----------
+    a : float
+        Semi-major axis of the ellipsoid in meters
+    f : float
+        Flattening of the ellipsoid
+    ellipse : str or tuple, optional
+        Identifier used to create the engine
+
+    Notes
+    -----
+    Engines hold no state besides their ellipsoid parameters and may be shared between threads.
+    Not meant to be created directly - use *get_engine* to obtain a cached instance.
+    """
+
+    backend = None
+
+    def __init__(self, a, f, ellipse=None):
+        """
+        Initialise the GeodesicEngine object
+        """
+        self.a = a
+        self.f = f
+        self.ellipse = ellipse if ellipse is not None else (a, f)
+
+    def inv(self, lon1, lat1, lon2, lat2):
+        """
+        Solve the inverse geodesic problem
+
+        Parameters
+        ----------
+        lon1, lat1 : scalar or array_like
+            Coordinates of the first point(s) in degrees
+        lon2, lat2 : scalar or array_like
+            Coordinates of the second point(s) in degrees
+
+        Returns
+        -------
+        tuple:
+            The forward azimuths from point 1 to point 2 and the back azimuths from point 2 to
+            point 1 in degrees, and the distances in meters
+        """
+        raise NotImplementedError
+
+    def fwd(self, lon, lat, azimuth, distance):
+        """
+        Solve the direct geodesic problem
+
+        Parameters
+        ----------
+        lon, lat : scalar or array_like
+            Coordinates of the starting point(s) in degrees
+        azimuth : scalar or array_like
+            Forward azimuth(s) in degrees
+        distance : scalar or array_like
+            Distance(s) in meters
+
+        Returns
+        -------
+        tuple:
+            The longitudes and latitudes of the end point(s) in degrees and the back azimuths
+            from the end point(s) to the starting point(s) in degrees
+        """
+        raise NotImplementedError
+
+    def __repr__(self):
+        return "%s(ellipse=%s)" % (self.__class__.__name__, self.ellipse)
+
+
+class PyprojEngine(GeodesicEngine):
+    """
+    Geodesic engine using the algorithms of Karney as implemented by pyproj.Geod
+    """
+
+    backend = "pyproj"
+
+    def __init__(self, a, f, ellipse=None):
+        import pyproj
+
+        super().__init__(a, f, ellipse)
+        if isinstance(ellipse, str):
+            self.geod = pyproj.Geod(ellps=ellipse)
+        else:
+            self.geod = pyproj.Geod(a=a, f=f)
+
+    def inv(self, lon1, lat1, lon2, lat2):
+        if _is_scalar(lon1, lat1, lon2, lat2):
+            return self.geod.inv(lon1, lat1, lon2, lat2)
+        lon1, lat1, lon2, lat2 = [np.ascontiguousarray(value, dtype=np.float64) for value in
+                                  np.broadcast_arrays(lon1, lat1, lon2, lat2)]
+        return self.geod.inv(lon1, lat1, lon2, lat2)
+
+    def fwd(self, lon, lat, azimuth, distance):
+        if _is_scalar(lon, lat, azimuth, distance):
+            return self.geod.fwd(lon, lat, azimuth, distance)
+        lon, lat, azimuth, distance = [np.ascontiguousarray(value, dtype=np.float64) for value in
+                                       np.broadcast_arrays(lon, lat, azimuth, distance)]
+        return self.geod.fwd(lon, lat, azimuth, distance)
+
+
+def _tan_half(angle):
+    """
+    Return the tangents t of half of the angles in radians and 1 + t ** 2
+
+    NumPy evaluates float64 tangents several times faster than sines and cosines, which follow
+    from the half angle tangent as sin = 2 t / (1 + t ** 2) and cos = 2 / (1 + t ** 2) - 1.
+    """
+    t = np.tan(np.multiply(angle, 0.5))
+    return t, 1. + t * t
+
+
+class HaversineEngine(GeodesicEngine):
+    """
+    Geodesic engine using great circles on a sphere, implemented in pure NumPy
+
+    Notes
+    -----
+    For a true sphere (f = 0) the radius is the semi-major axis. For an ellipsoid the mean
+    radius (2a + b) / 3 is used. Distances are computed with the haversine formula and azimuths
+    with atan2, so both are accurate for short distances. All sines and cosines are derived from
+    half angle tangents.
+
+    Compared with the pyproj backend on the WGS84 ellipsoid, for positions spread over the whole
+    globe, the maximum errors are:
+
+        - distance: 0.57% of the distance (5.7 m over 1 km, 38 km for the longest lines)
+        - azimuths: 0.2 degrees for distances up to 10,000 km and 1.7 degrees up to 19,000 km.
+          For nearly antipodal positions the azimuths are not well defined on either model.
+        - destination of *fwd*: 0.57% of the distance travelled
+
+    These bounds are checked by tests/test_geodesic.py. The backend solves the inverse problem
+    about 15 times and the forward problem about 5 times faster than the pyproj backend.
+    """
+
+    backend = "haversine"
+
+    def __init__(self, a, f, ellipse=None):
+        super().__init__(a, f, ellipse)
+        self.radius = a * (1. - f / 3.)
+
+    def inv(self, lon1, lat1, lon2, lat2):
+        scalar = _is_scalar(lon1, lat1, lon2, lat2)
+        t1, q1 = _tan_half(np.radians(lat1))
+        t2, q2 = _tan_half(np.radians(lat2))
+        t, q = _tan_half(np.radians(np.subtract(lon2, lon1)))
+        sin_phi1, cos_phi1 = 2. * t1 / q1, 2. / q1 - 1.
+        sin_phi2, cos_phi2 = 2. * t2 / q2, 2. / q2 - 1.
+        sin_lambda, cos_lambda = 2. * t / q, 2. / q - 1.
+        # sin((phi2 - phi1) / 2) = (t2 - t1) / sqrt(q1 * q2) and sin(lambda / 2) = t / sqrt(q)
+        h = (t2 - t1) ** 2 / (q1 * q2) + cos_phi1 * cos_phi2 * (t * t / q)
+        distance = 2. * self.radius * np.arcsin(np.sqrt(np.clip(h, 0., 1.)))
+        azimuth12 = np.degrees(np.arctan2(sin_lambda * cos_phi2,
+                                          cos_phi1 * sin_phi2 - sin_phi1 * cos_phi2 * cos_lambda))
+        azimuth21 = np.degrees(np.arctan2(-sin_lambda * cos_phi1,
+                                          cos_phi2 * sin_phi1 - sin_phi2 * cos_phi1 * cos_lambda))
+        return _as_output((azimuth12, azimuth21, distance), scalar)
+
+    def fwd(self, lon, lat, azimuth, distance):
+        scalar = _is_scalar(lon, lat, azimuth, distance)
+        t1, q1 = _tan_half(np.radians(lat))
+        t_theta, q_theta = _tan_half(np.radians(azimuth))
+        t_delta, q_delta = _tan_half(np.divide(distance, self.radius))
+        sin_phi1, cos_phi1 = 2. * t1 / q1, 2. / q1 - 1.
+        sin_theta, cos_theta = 2. * t_theta / q_theta, 2. / q_theta - 1.
+        sin_delta, cos_delta = 2. * t_delta / q_delta, 2. / q_delta - 1.
+        sin_phi2 = sin_phi1 * cos_delta + cos_phi1 * sin_delta * cos_theta
+        # cos(phi2) times the sine and cosine of the longitude difference
+        y = sin_theta * sin_delta
+        x = cos_phi1 * cos_delta - sin_phi1 * sin_delta * cos_theta
+        lat2 = np.degrees(np.arctan2(sin_phi2, np.hypot(x, y)))
+        lon2 = _wrap180(np.add(lon, np.degrees(np.arctan2(y, x))))
+        # The azimuth at the destination pointing back to the start
+        azimuth21 = np.degrees(np.arctan2(-sin_theta * cos_phi1,
+                                          sin_phi1 * sin_delta - cos_phi1 * cos_delta * cos_theta))
+        return _as_output((lon2, lat2, azimuth21), scalar)
+
+
+class VincentyEngine(GeodesicEngine):
+    """
+    Geodesic engine using the iterative formulae of Vincenty, implemented in pure NumPy
+
+    Parameters
+    ----------
+    a : float
+        Semi-major axis of the ellipsoid in meters
+    f : float
+        Flattening of the ellipsoid
+    ellipse : str or tuple, optional
+        Identifier used to create the engine
+    tolerance : float, optional, default=1e-12
+        Convergence criterion of the iterations in radians
+    max_iterations : int, optional, default=200
+        Maximum number of iterations
+
+    Notes
+    -----
+    The inverse formula does not converge for nearly antipodal points. For those points the
+    result of the last iteration is returned; use the pyproj backend if they may occur.
+    """
+
+    backend = "vincenty"
+
+    def __init__(self, a, f, ellipse=None, tolerance=1e-12, max_iterations=200):
+        super().__init__(a, f, ellipse)
+        self.b = a * (1. - f)
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+
+    def _series(self, cos2_alpha):
+        """
+        Return the coefficients A and B of the Vincenty series expansion
+        """
+        u2 = cos2_alpha * (self.a ** 2 - self.b ** 2) / self.b ** 2
+        a_coef = 1. + u2 / 16384. * (4096. + u2 * (-768. + u2 * (320. - 175. * u2)))
+        b_coef = u2 / 1024. * (256. + u2 * (-128. + u2 * (74. - 47. * u2)))
+        return a_coef, b_coef
+
+    @staticmethod
+    def _delta_sigma(b_coef, sin_sigma, cos_sigma, cos_2sigma_m):
+        return b_coef * sin_sigma * (cos_2sigma_m + b_coef / 4. * (
+                cos_sigma * (-1. + 2. * cos_2sigma_m ** 2) -
+                b_coef / 6. * cos_2sigma_m * (-3. + 4. * sin_sigma ** 2) *
+                (-3. + 4. * cos_2sigma_m ** 2)))
+
+    def inv(self, lon1, lat1, lon2, lat2):
+        scalar = _is_scalar(lon1, lat1, lon2, lat2)
+        lon1, lat1, lon2, lat2 = [np.asarray(value, dtype=np.float64) for value in
+                                  np.broadcast_arrays(lon1, lat1, lon2, lat2)]
+        f = self.f
+        big_l = np.radians(_wrap180(lon2 - lon1))
+        u1 = np.arctan((1. - f) * np.tan(np.radians(lat1)))
+        u2 = np.arctan((1. - f) * np.tan(np.radians(lat2)))
+        sin_u1, cos_u1 = np.sin(u1), np.cos(u1)
+        sin_u2, cos_u2 = np.sin(u2), np.cos(u2)
+
+        lam = big_l.copy()
+        converged = np.zeros(lam.shape, dtype=bool)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for _ in range(self.max_iterations):
+                sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+                sin_sigma = np.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+                cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+                sigma = np.arctan2(sin_sigma, cos_sigma)
+                sin_alpha = np.where(sin_sigma == 0., 0.,
+                                     cos_u1 * cos_u2 * sin_lam / sin_sigma)
+                cos2_alpha = 1. - sin_alpha ** 2
+                cos_2sigma_m = np.where(cos2_alpha == 0., 0.,
+                                        cos_sigma - 2. * sin_u1 * sin_u2 / cos2_alpha)
+                c = f / 16. * cos2_alpha * (4. + f * (4. - 3. * cos2_alpha))
+                lam_new = big_l + (1. - c) * f * sin_alpha * (
+                        sigma + c * sin_sigma * (
+                            cos_2sigma_m + c * cos_sigma * (-1. + 2. * cos_2sigma_m ** 2)))
+                converged |= np.abs(lam_new - lam) < self.tolerance
+                lam = np.where(converged, lam, lam_new)
+                if converged.all():
+                    break
+
+        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+        a_coef, b_coef = self._series(cos2_alpha)
+        delta_sigma = self._delta_sigma(b_coef, sin_sigma, cos_sigma, cos_2sigma_m)
+        distance = self.b * a_coef * (sigma - delta_sigma)
+        azimuth12 = np.degrees(np.arctan2(cos_u2 * sin_lam,
+                                          cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam))
+        azimuth2 = np.degrees(np.arctan2(cos_u1 * sin_lam,
+                                         -sin_u1 * cos_u2 + cos_u1 * sin_u2 * cos_lam))
+        azimuth21 = _wrap180(azimuth2 + 180.)
+        return _as_output((azimuth12, azimuth21, distance), scalar)
+
+    def fwd(self, lon, lat, azimuth, distance):
+        scalar = _is_scalar(lon, lat, azimuth, distance)
+        lon, lat, azimuth, distance = [np.asarray(value, dtype=np.float64) for value in
+                                       np.broadcast_arrays(lon, lat, azimuth, distance)]
+        f = self.f
+        alpha1 = np.radians(azimuth)
+        sin_alpha1, cos_alpha1 = np.sin(alpha1), np.cos(alpha1)
+        u1 = np.arctan((1. - f) * np.tan(np.radians(lat)))
+        sin_u1, cos_u1 = np.sin(u1), np.cos(u1)
+        sigma1 = np.arctan2(np.tan(u1), cos_alpha1)
+        sin_alpha = cos_u1 * sin_alpha1
+        cos2_alpha = 1. - sin_alpha ** 2
+        a_coef, b_coef = self._series(cos2_alpha)
+
+        sigma_0 = distance / (self.b * a_coef)
+        sigma = sigma_0.copy()
+        for _ in range(self.max_iterations):
+            cos_2sigma_m = np.cos(2. * sigma1 + sigma)
+            sin_sigma, cos_sigma = np.sin(sigma), np.cos(sigma)
+            sigma_new = sigma_0 + self._delta_sigma(b_coef, sin_sigma, cos_sigma, cos_2sigma_m)
+            done = np.all(np.abs(sigma_new - sigma) < self.tolerance)
+            sigma = sigma_new
+            if done:
+                break
+
+        cos_2sigma_m = np.cos(2. * sigma1 + sigma)
+        sin_sigma, cos_sigma = np.sin(sigma), np.cos(sigma)
+        x = sin_u1 * sin_sigma - cos_u1 * cos_sigma * cos_alpha1
+        phi2 = np.arctan2(sin_u1 * cos_sigma + cos_u1 * sin_sigma * cos_alpha1,
+                          (1. - f) * np.hypot(sin_alpha, x))
+        lam = np.arctan2(sin_sigma * sin_alpha1,
+                         cos_u1 * cos_sigma - sin_u1 * sin_sigma * cos_alpha1)
+        c = f / 16. * cos2_alpha * (4. + f * (4. - 3. * cos2_alpha))
+        big_l = lam - (1. - c) * f * sin_alpha * (
+                sigma + c * sin_sigma * (
+                    cos_2sigma_m + c * cos_sigma * (-1. + 2. * cos_2sigma_m ** 2)))
+        lon2 = _wrap180(lon + np.degrees(big_l))
+        azimuth21 = _wrap180(np.degrees(np.arctan2(sin_alpha, -x)) + 180.)
+        return _as_output((lon2, np.degrees(phi2), azimuth21), scalar)
+
+
+_BACKENDS = {"pyproj": PyprojEngine,
+             "haversine": HaversineEngine,
+             "vincenty": VincentyEngine}
+_ENGINES = {}
+_ENGINES_LOCK = threading.Lock()
+_DEFAULT_BACKEND = "pyproj"
+
+
+def register_backend(name, engine_class):
+    """
+    Register a new geodesic backend
+
+    Parameters
+    ----------
+    name : str
+        Name under which the backend can be selected with *get_engine*
+    engine_class : class
+        A subclass of GeodesicEngine. It is instantiated as engine_class(a, f, ellipse).
+    """
+    with _ENGINES_LOCK:
+        _BACKENDS[name] = engine_class
+        # Drop engines created by a backend that was registered earlier under the same name
+        for key in [key for key in _ENGINES if key[0] == name]:
+            del _ENGINES[key]
+
+
+def available_backends():
+    """
+    Return the names of all registered geodesic backends
+    """
+    return sorted(_BACKENDS)
+
+
+def set_default_backend(backend):
+    """
+    Set the backend used by all calculations which are not given a backend
+
+    Parameters
+    ----------
+    backend : str
+        Name of the backend, see *available_backends*. Select "haversine" to trade the accuracy
+        of the ellipsoid for the speed of the spherical model (see *HaversineEngine*).
+
+    Returns
+    -------
+    str:
+        The previous default backend, so it can be restored
+    """
+    global _DEFAULT_BACKEND
+    if backend not in _BACKENDS:
+        raise ValueError("Unknown geodesic backend {}. Choose from {}"
+                         "".format(backend, ", ".join(sorted(_BACKENDS))))
+    previous, _DEFAULT_BACKEND = _DEFAULT_BACKEND, backend
+    return previous
+
+
+def get_default_backend():
+    """
+    Return the name of the backend used by all calculations which are not given a backend
+    """
+    return _DEFAULT_BACKEND
+
+
+def get_engine(ellipse="WGS84", backend=None):
+    """
+    Return a cached geodesic engine
+
+    Parameters
+    ----------
+    ellipse : str or tuple, optional, default="WGS84"
+        Either the name of an ellipsoid known to pyproj (e.g. "WGS84" or "sphere") or a tuple
+        (a, f) with the semi-major axis in meters and the flattening.
+    backend : str, optional
+        Name of the backend, see *available_backends*. Defaults to the backend set with
+        *set_default_backend*, which is "pyproj" unless changed.
+
+    Returns
+    -------
+    GeodesicEngine:
+        An engine which is created on the first request and shared by all later requests
+    """
+    if backend is None:
+        backend = _DEFAULT_BACKEND
+    if not isinstance(ellipse, str):
+        ellipse = _ellipsoid_parameters(ellipse)
+    key = (backend, ellipse)
+    try:
+        return _ENGINES[key]
+    except KeyError:
+        pass
+    with _ENGINES_LOCK:
+        if key not in _ENGINES:
+            try:
+                engine_class = _BACKENDS[backend]
+            except KeyError:
+                raise ValueError("Unknown geodesic backend {}. Choose from {}"
+                                 "".format(backend, ", ".join(sorted(_BACKENDS))))
+            a, f = _ellipsoid_parameters(ellipse)
+            _ENGINES[key] = engine_class(a, f, ellipse)
+        return _ENGINES[key]
+
+
+def clear_engine_cache():
+    """
+    Remove all cached geodesic engines
+    """
+    with _ENGINES_LOCK:
+        _ENGINES.clear()
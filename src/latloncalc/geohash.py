@@ -0,0 +1,393 @@
+"""
+Vectorized geohash encoding and decoding, and geohash based bucketing of positions.
+
+A geohash is a string of base32 characters in which each character adds 5 bits of alternating
+longitude and latitude bisections. Positions which share a geohash prefix lie in the same cell,
+so geohashes are well suited as keys for caches, partitioning and joins.
+
+All functions work on whole arrays of coordinates at once. Use *LatLon.geohash* for a single
+position.
+"""
+
+import numpy as np
+
+from latloncalc.arrays import LatLonArray
+from latloncalc.latlon import LatLon, Latitude, Longitude
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+MAX_PRECISION = 12  # 60 bits, the most that fits in an unsigned 64 bit integer
+
+_BASE32_CODES = np.frombuffer(BASE32.encode("ascii"), dtype=np.uint8)
+_BASE32_VALUES = np.full(256, -1, dtype=np.int64)
+_BASE32_VALUES[_BASE32_CODES] = np.arange(32)
+
+# Directions of the neighbours of a cell as (latitude steps, longitude steps)
+NEIGHBOUR_DIRECTIONS = {"n": (1, 0), "ne": (1, 1), "e": (0, 1), "se": (-1, 1),
+                        "s": (-1, 0), "sw": (-1, -1), "w": (0, -1), "nw": (1, -1)}
+
+
+def _bit_counts(precision):
+    """
+    Return the number of longitude and latitude bits of a geohash with the given precision
+    """
+    n_bits = 5 * precision
+    return (n_bits + 1) // 2, n_bits // 2
+
+
+def _check_precision(precision):
+    precision = int(precision)
+    if not 1 <= precision <= MAX_PRECISION:
+        raise ValueError("precision must be between 1 and {}, got {}".format(MAX_PRECISION,
+                                                                             precision))
+    return precision
+
+
+def _interleave(lon_int, lat_int, n_lon_bits, n_lat_bits):
+    """
+    Interleave the bits of the longitude and latitude cell numbers, starting with longitude
+    """
+    value = np.zeros(lon_int.shape, dtype=np.uint64)
+    for bit in range(n_lon_bits + n_lat_bits):
+        if bit % 2 == 0:
+            source, source_bit = lon_int, n_lon_bits - 1 - bit // 2
+        else:
+            source, source_bit = lat_int, n_lat_bits - 1 - bit // 2
+        value = (value << np.uint64(1)) | ((source >> np.uint64(source_bit)) & np.uint64(1))
+    return value
+
+
+def _deinterleave(value, n_lon_bits, n_lat_bits):
+    """
+    Split interleaved bits into the longitude and latitude cell numbers
+    """
+    lon_int = np.zeros(value.shape, dtype=np.uint64)
+    lat_int = np.zeros(value.shape, dtype=np.uint64)
+    n_bits = n_lon_bits + n_lat_bits
+    for bit in range(n_bits):
+        bit_value = (value >> np.uint64(n_bits - 1 - bit)) & np.uint64(1)
+        if bit % 2 == 0:
+            lon_int = (lon_int << np.uint64(1)) | bit_value
+        else:
+            lat_int = (lat_int << np.uint64(1)) | bit_value
+    return lon_int, lat_int
+
+
+def _cell_numbers(lat, lon, n_lon_bits, n_lat_bits):
+    """
+    Return the longitude and latitude cell numbers of positions
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = ((np.asarray(lon, dtype=np.float64) + 180) % 360) - 180  # Like Longitude.range180
+    n_lat_cells, n_lon_cells = 2 ** n_lat_bits, 2 ** n_lon_bits
+    lat_int = np.floor((lat + 90.) / 180. * n_lat_cells)
+    lon_int = np.floor((lon + 180.) / 360. * n_lon_cells)
+    lat_int = np.clip(lat_int, 0, n_lat_cells - 1).astype(np.uint64)
+    lon_int = np.clip(lon_int, 0, n_lon_cells - 1).astype(np.uint64)
+    return lon_int, lat_int
+
+
+def _to_strings(value, precision):
+    """
+    Convert interleaved bits into an array of geohash strings
+    """
+    codes = np.empty(value.shape + (precision,), dtype=np.uint8)
+    for position in range(precision):
+        shift = np.uint64(5 * (precision - 1 - position))
+        codes[..., position] = _BASE32_CODES[((value >> shift) & np.uint64(31)).astype(np.int64)]
+    return codes.view("S{}".format(precision))[..., 0].astype("U{}".format(precision))
+
+
+def _from_strings(geohashes, precision):
+    """
+    Convert an array of geohash strings of equal length into interleaved bits
+    """
+    codes = np.asarray(geohashes, dtype="S{}".format(precision)).reshape(-1, 1)
+    codes = codes.view(np.uint8).reshape(-1, precision)
+    values = _BASE32_VALUES[codes]
+    if (values < 0).any():
+        bad = np.asarray(geohashes).reshape(-1)[(values < 0).any(axis=1)][0]
+        raise ValueError("Invalid geohash {!r}".format(bad))
+    value = np.zeros(len(values), dtype=np.uint64)
+    for position in range(precision):
+        value = (value << np.uint64(5)) | values[:, position].astype(np.uint64)
+    return value
+
+
+def encode(lat, lon, precision=9):
+    """
+    Encode positions as geohashes
+
+    Parameters
+    ----------
+    lat : array_like
+        Latitudes in decimal degrees
+    lon : array_like
+        Longitudes in decimal degrees
+    precision : int, optional, default=9
+        Number of characters of the geohashes, between 1 and 12
+
+    Returns
+    -------
+    numpy.ndarray:
+        The geohashes as an array of strings with the shape of lat and lon
+
+    Examples
+    --------
+    >>> encode([5.8833, 21.3], [-162.0833, -157.8167], precision=6)
+    array(['83h9rx', '87zc0v'], dtype='<U6')
+    """
+    precision = _check_precision(precision)
+    lat, lon = np.broadcast_arrays(np.asarray(lat, dtype=np.float64),
+                                   np.asarray(lon, dtype=np.float64))
+    n_lon_bits, n_lat_bits = _bit_counts(precision)
+    lon_int, lat_int = _cell_numbers(lat, lon, n_lon_bits, n_lat_bits)
+    return _to_strings(_interleave(lon_int, lat_int, n_lon_bits, n_lat_bits), precision)
+
+
+def _decode_cells(geohashes):
+    """
+    Return the longitude and latitude cell numbers and bit counts of geohashes of equal length
+    """
+    geohashes = np.asarray(geohashes, dtype=str).reshape(-1)
+    precision = len(geohashes[0]) if len(geohashes) else 1
+    if len(geohashes) and (np.char.str_len(geohashes) != precision).any():
+        raise ValueError("All geohashes must have the same length")
+    precision = _check_precision(precision)
+    n_lon_bits, n_lat_bits = _bit_counts(precision)
+    lon_int, lat_int = _deinterleave(_from_strings(geohashes, precision), n_lon_bits, n_lat_bits)
+    return lon_int, lat_int, n_lon_bits, n_lat_bits
+
+
+def decode(geohashes):
+    """
+    Decode geohashes into the centres of their cells
+
+    Parameters
+    ----------
+    geohashes : str or array_like of str
+        Geohashes of equal length
+
+    Returns
+    -------
+    tuple:
+        The latitudes and longitudes of the centres of the cells in decimal degrees, and the
+        half heights and half widths of the cells in degrees (the maximum error of the centres)
+    """
+    scalar = isinstance(geohashes, str)
+    lon_int, lat_int, n_lon_bits, n_lat_bits = _decode_cells(geohashes)
+    lat_error = 90. / 2 ** n_lat_bits
+    lon_error = 180. / 2 ** n_lon_bits
+    lat = -90. + (lat_int.astype(np.float64) * 2 + 1) * lat_error
+    lon = -180. + (lon_int.astype(np.float64) * 2 + 1) * lon_error
+    if scalar:
+        return float(lat[0]), float(lon[0]), lat_error, lon_error
+    shape = np.shape(geohashes)
+    return lat.reshape(shape), lon.reshape(shape), lat_error, lon_error
+
+
+def geohash2latlon(geohash):
+    """
+    Create a LatLon object at the centre of the cell of a geohash
+
+    Parameters
+    ----------
+    geohash : str
+        A geohash (e.g. "83h9rx")
+
+    Returns
+    -------
+    LatLon:
+        A LatLon object at the centre of the cell
+    """
+    lat, lon, _, _ = decode(geohash)
+    return LatLon(Latitude(lat), Longitude(lon))
+
+
+def neighbours(geohashes):
+    """
+    Return the geohashes of the 8 neighbouring cells
+
+    Parameters
+    ----------
+    geohashes : str or array_like of str
+        Geohashes of equal length
+
+    Returns
+    -------
+    dict:
+        For each direction in NEIGHBOUR_DIRECTIONS ("n", "ne", "e", ...) the geohashes of the
+        neighbours in that direction. Neighbours across the antimeridian wrap around, neighbours
+        beyond a pole do not exist and are given as empty strings.
+    """
+    scalar = isinstance(geohashes, str)
+    lon_int, lat_int, n_lon_bits, n_lat_bits = _decode_cells(geohashes)
+    precision = (n_lon_bits + n_lat_bits) // 5
+    n_lat_cells, n_lon_cells = 2 ** n_lat_bits, 2 ** n_lon_bits
+    lat_int, lon_int = lat_int.astype(np.int64), lon_int.astype(np.int64)
+    result = {}
+    for direction, (lat_step, lon_step) in NEIGHBOUR_DIRECTIONS.items():
+        neighbour_lat = lat_int + lat_step
+        exists = (neighbour_lat >= 0) & (neighbour_lat < n_lat_cells)
+        neighbour_lon = (lon_int + lon_step) % n_lon_cells
+        value = _interleave(neighbour_lon.astype(np.uint64),
+                            np.clip(neighbour_lat, 0, n_lat_cells - 1).astype(np.uint64),
+                            n_lon_bits, n_lat_bits)
+        hashes = np.where(exists, _to_strings(value, precision), "")
+        result[direction] = str(hashes[0]) if scalar else hashes.reshape(np.shape(geohashes))
+    return result
+
+
+class GeohashBuckets:
+    """
+    Positions grouped in buckets by geohash prefix
+
+    Parameters
+    ----------
+    positions : LatLonArray or sequence of LatLon
+        The positions to bucket
+    precision : int, optional, default=6
+        Number of geohash characters which define a bucket
+
+    Notes
+    -----
+    The geohashes are stored sorted, so all lookups are binary searches and grouping, joining
+    and deduplication work on whole arrays at once.
+
+    Examples
+    --------
+    >>> buckets = GeohashBuckets(LatLonArray([5.8833, 5.8834, 21.3], [-162.0833, -162.0833, -157.8167]))
+    >>> buckets.lookup("83h9")
+    array([0, 1])
+    """
+
+    def __init__(self, positions, precision=6):
+        """
+        Create the GeohashBuckets object
+        """
+        try:
+            is_array = positions.type() == "LatLonArray"
+        except AttributeError:
+            is_array = False
+        if not is_array:
+            positions = LatLonArray.from_latlons(positions)
+        self.positions = positions
+        self.precision = _check_precision(precision)
+        geohashes = encode(positions.lat, positions.lon, self.precision)
+        self._order = np.argsort(geohashes, kind="stable")
+        self._sorted = geohashes[self._order]
+        self._cells, self._starts, self._counts = np.unique(self._sorted, return_index=True,
+                                                            return_counts=True)
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def geohashes(self):
+        """
+        The geohashes of the positions in their original order
+        """
+        geohashes = np.empty_like(self._sorted)
+        geohashes[self._order] = self._sorted
+        return geohashes
+
+    @property
+    def cells(self):
+        """
+        The sorted unique geohashes of all buckets
+        """
+        return self._cells
+
+    def lookup(self, prefix):
+        """
+        Return the indices of all positions of which the geohash starts with prefix
+
+        Parameters
+        ----------
+        prefix : str
+            A geohash or geohash prefix. Prefixes longer than the precision of the buckets are
+            truncated.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The sorted indices of the positions
+        """
+        prefix = prefix[:self.precision]
+        start = np.searchsorted(self._sorted, prefix, side="left")
+        # All base32 characters sort before "{", so this is the end of the prefix range
+        end = np.searchsorted(self._sorted, prefix + "{", side="left")
+        return np.sort(self._order[start:end])
+
+    def lookup_near(self, point):
+        """
+        Return the indices of all positions in the bucket of a point and its 8 neighbours
+
+        Parameters
+        ----------
+        point : LatLon
+            The query position
+
+        Returns
+        -------
+        numpy.ndarray:
+            The sorted indices of the positions
+        """
+        cell = point.geohash(self.precision)
+        cells = [cell] + [neighbour for neighbour in neighbours(cell).values() if neighbour]
+        return np.unique(np.concatenate([self.lookup(c) for c in cells]))
+
+    def groups(self):
+        """
+        Group the positions by bucket
+
+        Returns
+        -------
+        dict:
+            For each geohash of a bucket the indices of its positions
+        """
+        return dict(zip(self._cells.tolist(),
+                        np.split(self._order, self._starts[1:])))
+
+    def deduplicate(self):
+        """
+        Return the index of the first position in each bucket
+
+        Returns
+        -------
+        numpy.ndarray:
+            The sorted indices of one position per bucket
+        """
+        # The sort is stable, so the first index of each bucket is the lowest
+        return np.sort(self._order[self._starts])
+
+    def join(self, other):
+        """
+        Find all pairs of positions of self and other which are in the same bucket
+
+        Parameters
+        ----------
+        other : GeohashBuckets
+            Buckets of the same precision
+
+        Returns
+        -------
+        tuple:
+            Arrays with the indices in self and the indices in other of all pairs
+        """
+        if other.precision != self.precision:
+            raise ValueError("Can only join buckets of the same precision ({} != {})"
+                             "".format(self.precision, other.precision))
+        _, self_cells, other_cells = np.intersect1d(self._cells, other._cells,
+                                                    assume_unique=True, return_indices=True)
+        self_start, self_count = self._starts[self_cells], self._counts[self_cells]
+        other_start, other_count = other._starts[other_cells], other._counts[other_cells]
+        n_pairs = self_count * other_count
+        cell = np.repeat(np.arange(len(n_pairs)), n_pairs)
+        within = np.arange(n_pairs.sum()) - np.repeat(np.cumsum(n_pairs) - n_pairs, n_pairs)
+        self_index = self._order[self_start[cell] + within // other_count[cell]]
+        other_index = other._order[other_start[cell] + within % other_count[cell]]
+        return self_index, other_index
+
+    def __repr__(self):
+        return "GeohashBuckets(n=%d, precision=%d, buckets=%d)" % (len(self), self.precision,
+                                                                   len(self._cells))
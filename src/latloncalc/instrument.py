@@ -0,0 +1,213 @@
+"""
+Opt-in counting and timing of the internal operations of the package.
+
+When instrumentation is enabled, the following operations are counted and timed:
+
+    - `GeoCoord._update`: recalculation of a coordinate after changing its components
+    - `GeoCoord.to_string` and `LatLon.to_string`: formatting of coordinates
+    - `string2geocoord`: parsing of a coordinate string
+    - `LatLon._pyproj_inv`: inverse geodesic of two positions, including the cache lookups, and
+      `_solve_inverse`: the solution of the inverse geodesic problem by the engine
+    - `LatLon.offset`: forward geodesic of a position
+    - `LatLonArray._pyproj_inv` and `batch_offset`: batched inverse and forward geodesics
+
+Instrumentation is enabled by setting the environment variable LATLONCALC_INSTRUMENT to 1 before
+importing the package, by calling *enable*, or for a block of code with the context manager
+*instrumented*. The statistics are returned by *snapshot*, and callbacks receive the name and
+duration of every call. Timings of nested operations are inclusive, e.g. the time of
+`LatLon.to_string` contains the time of its two `GeoCoord.to_string` calls.
+
+Enabling replaces the instrumented functions by timing wrappers and disabling restores the
+original functions, so instrumentation costs nothing while it is disabled. Functions which were
+imported by name (``from latloncalc.latlon import string2geocoord``) before enabling keep
+referring to the original function.
+
+Examples
+--------
+>>> from latloncalc.latlon import LatLon
+>>> reset()
+>>> enable()
+>>> distance = LatLon(5.8833, -162.0833).distance(LatLon(21.3, -157.8167))
+>>> disable()
+>>> snapshot()["LatLon._pyproj_inv"]["count"]
+1
+"""
+
+import contextlib
+import functools
+import importlib
+import os
+import threading
+import time
+
+ENVIRONMENT_VARIABLE = "LATLONCALC_INSTRUMENT"
+
+# Module, class (None for module level functions) and attribute of the instrumented operations
+_TARGETS = (
+    ("latloncalc.latlon", "GeoCoord", "_update"),
+    ("latloncalc.latlon", "GeoCoord", "to_string"),
+    ("latloncalc.latlon", None, "string2geocoord"),
+    ("latloncalc.latlon", None, "_solve_inverse"),
+    ("latloncalc.latlon", "LatLon", "_pyproj_inv"),
+    ("latloncalc.latlon", "LatLon", "offset"),
+    ("latloncalc.latlon", "LatLon", "to_string"),
+    ("latloncalc.arrays", "LatLonArray", "_pyproj_inv"),
+    ("latloncalc.arrays", None, "batch_offset"),
+)
+
+_lock = threading.RLock()
+_statistics = {}  # name -> [count, total_time, min_time, max_time]
+_callbacks = []
+_originals = {}  # (owner, attribute) -> original function
+_depth = 0  # Number of enable calls which have not been matched by a disable call
+
+
+def _record(name, seconds):
+    """
+    Add a call of an operation to the statistics and pass it to the callbacks
+    """
+    with _lock:
+        statistics = _statistics.get(name)
+        if statistics is None:
+            _statistics[name] = [1, seconds, seconds, seconds]
+        else:
+            statistics[0] += 1
+            statistics[1] += seconds
+            statistics[2] = min(statistics[2], seconds)
+            statistics[3] = max(statistics[3], seconds)
+        callbacks = list(_callbacks)
+    for callback in callbacks:
+        callback(name, seconds)
+
+
+def _timed(name, function):
+    """
+    Return a wrapper of function which records the duration of each call under name
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _record(name, time.perf_counter() - start)
+    return wrapper
+
+
+def _install():
+    for module_name, class_name, attribute in _TARGETS:
+        owner = importlib.import_module(module_name)
+        name = attribute
+        if class_name is not None:
+            owner = getattr(owner, class_name)
+            name = "{}.{}".format(class_name, attribute)
+        original = owner.__dict__[attribute]
+        _originals[(owner, attribute)] = original
+        setattr(owner, attribute, _timed(name, original))
+
+
+def _uninstall():
+    for (owner, attribute), original in _originals.items():
+        setattr(owner, attribute, original)
+    _originals.clear()
+
+
+def is_enabled():
+    """
+    Return True if the operations are instrumented
+    """
+    return _depth > 0
+
+
+def enable(callback=None):
+    """
+    Start instrumenting the operations
+
+    Parameters
+    ----------
+    callback : callable, optional
+        Function called as callback(name, seconds) after every instrumented call
+
+    Notes
+    -----
+    Calls of enable and disable can be nested: the operations are instrumented until disable has
+    been called as often as enable.
+    """
+    global _depth
+    with _lock:
+        if callback is not None:
+            _callbacks.append(callback)
+        if _depth == 0:
+            _install()
+        _depth += 1
+
+
+def disable(callback=None):
+    """
+    Stop instrumenting the operations, see *enable*. The callback given to enable is removed.
+    """
+    global _depth
+    with _lock:
+        if callback is not None:
+            _callbacks.remove(callback)
+        if _depth == 0:
+            return
+        _depth -= 1
+        if _depth == 0:
+            _uninstall()
+
+
+def reset():
+    """
+    Clear the statistics
+    """
+    with _lock:
+        _statistics.clear()
+
+
+def snapshot():
+    """
+    Return the statistics of all operations which were called while instrumented
+
+    Returns
+    -------
+    dict:
+        Maps the name of each operation to a dict with the number of calls (count) and the total,
+        mean, minimum and maximum time of a call in seconds (total_time, mean_time, min_time and
+        max_time)
+    """
+    with _lock:
+        return {name: {"count": count, "total_time": total, "mean_time": total / count,
+                       "min_time": minimum, "max_time": maximum}
+                for name, (count, total, minimum, maximum) in _statistics.items()}
+
+
+@contextlib.contextmanager
+def instrumented(callback=None, clear=True):
+    """
+    Context manager which instruments the operations within its block
+
+    Parameters
+    ----------
+    callback : callable, optional
+        Function called as callback(name, seconds) after every instrumented call in the block
+    clear : bool, optional, default=True
+        Clear the statistics when entering the block. The statistics are kept after leaving the
+        block, so they can be obtained with *snapshot*.
+    """
+    if clear:
+        reset()
+    enable(callback)
+    try:
+        yield
+    finally:
+        disable(callback)
+
+
+def _enable_from_environment():
+    """
+    Enable instrumentation if the environment variable LATLONCALC_INSTRUMENT is set to a value
+    other than 0 or an empty string
+    """
+    if os.environ.get(ENVIRONMENT_VARIABLE, "0").strip() not in ("", "0"):
+        enable()
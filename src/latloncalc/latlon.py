@@ -3,7 +3,9 @@ import math
 import re
 import warnings
 
-import pyproj
+from latloncalc.cache import get_inverse_cache, get_inverse_store
+from latloncalc.formats import compile_output_format
+from latloncalc.geodesic import get_default_backend, get_engine
 
 """
 Methods for representing geographic coordinates (latitude and longitude)
@@ -47,16 +49,71 @@ class GeoCoord:
     Notes
     -----
     Not meant to be used directly - access through Subclasses Latitude() and Longitude()
+
+    Only the decimal degree is stored. The degree, minute, decimal_minute and second attributes are
+    calculated from it on first access and cached, which keeps the memory footprint of large
+    collections of coordinates small.
     """
 
+    __slots__ = ("_decimal_degree", "_components")
+
     def __init__(self, degree=0, minute=0, second=0):
         """
         Initialise the GeoCoord object
         """
-        self.degree = float(degree)
-        self.minute = float(minute)
-        self.second = float(second)
-        self._update()  # Clean up each variable and make them consistent
+        self._decimal_degree = self._calc_decimaldegree(float(degree), float(minute), float(second))
+        self._components = None  # (degree, minute, decimal_minute, second), calculated on access
+
+    def _get_components(self):
+        if self._components is None:
+            self._components = self._calc_degreeminutes(self._decimal_degree)
+        return self._components
+
+    def _set_component(self, index, value):
+        components = list(self._get_components())
+        components[index] = value
+        self._components = tuple(components)
+
+    @property
+    def decimal_degree(self):
+        return self._decimal_degree
+
+    @decimal_degree.setter
+    def decimal_degree(self, decimal_degree):
+        self._decimal_degree = decimal_degree
+        self._components = None
+
+    @property
+    def degree(self):
+        return self._get_components()[0]
+
+    @degree.setter
+    def degree(self, degree):
+        self._set_component(0, degree)
+
+    @property
+    def minute(self):
+        return self._get_components()[1]
+
+    @minute.setter
+    def minute(self, minute):
+        self._set_component(1, minute)
+
+    @property
+    def decimal_minute(self):
+        return self._get_components()[2]
+
+    @decimal_minute.setter
+    def decimal_minute(self, decimal_minute):
+        self._set_component(2, decimal_minute)
+
+    @property
+    def second(self):
+        return self._get_components()[3]
+
+    @second.setter
+    def second(self, second):
+        self._set_component(3, second)
 
     def set_minute(self, minute):
         self.minute = float(minute)
@@ -97,9 +154,8 @@ class GeoCoord:
         consistent (for example, if minutes > 60, add extra to degrees, or if degrees is
         a decimal, add extra to minutes).
         """
-        self.decimal_degree = self._calc_decimaldegree(self.degree, self.minute, self.second)
-        self.degree, self.minute, self.decimal_minute, self.second = self._calc_degreeminutes(
-            self.decimal_degree)
+        self._decimal_degree = self._calc_decimaldegree(self.degree, self.minute, self.second)
+        self._components = None  # Recalculated from the decimal degree on access
 
     def get_hemisphere(self):
         """
@@ -123,9 +179,14 @@ class GeoCoord:
             A string of the form A%B%C where A, B and C are identifiers. Unknown identifiers (e.g. " ", ", " or "_" will
             be inserted as separators in a position corresponding to the position in format.
         n_digit_seconds : int, optional, default=7
-            Number of digits used for the seconds given with %<
+            Number of digits used for the seconds given with %S
         n_digits_decimal_minutes : int, optional, default=7
-            Number of digits used for the decimal minutes given with %S
+            Number of digits used for the decimal minutes given with %M
+
+        Notes
+        -----
+        The format string is compiled once and cached, see *latloncalc.formats.compile_output_format*.
+        Use the compiled formatter directly to output whole arrays of coordinates at once.
 
         Examples
         --------
@@ -137,20 +198,8 @@ class GeoCoord:
         >>> palmyra.to_string("d%_%M", n_digits_decimal_minutes=3)
         ('5_52.998', '-162_4.998')
         """
-        second_format = "{:." + "{:d}".format(int(n_digit_seconds)) + "f}"
-        minutes_format = "{:." + "{:d}".format(int(n_digits_decimal_minutes)) + "f}"
-        format2value = {"H": self.get_hemisphere(),
-                        "M": minutes_format.format(abs(self.decimal_minute)),
-                        "m": int(abs(self.minute)),
-                        "d": int(self.degree),
-                        "D": self.decimal_degree,
-                        "S": second_format.format(abs(self.second))}
-        format_elements = format_str.split("%")
-        coord_list = [str(format2value.get(element, element)) for element in format_elements]
-        coord_str = "".join(coord_list)
-        if "H" in format_elements:  # No negative values when hemispheres are indicated
-            coord_str = coord_str.replace("-", "")
-        return coord_str
+        formatter = compile_output_format(format_str, n_digit_seconds, n_digits_decimal_minutes)
+        return formatter.format(self)
 
     def __cmp__(self, other):
         return cmp(self.decimal_degree, other.decimal_degree)
@@ -224,6 +273,9 @@ class Latitude(GeoCoord):
     Coordinate object specific for latitude coordinates
     """
 
+    __slots__ = ()
+    hemispheres = ("N", "S")  # Identifiers of the positive and negative hemisphere
+
     def __init__(self, degree=0, minute=0, second=0):
         super().__init__(degree, minute, second)
 
@@ -253,6 +305,13 @@ class Latitude(GeoCoord):
         else:
             raise ValueError("Hemisphere identifier for latitudes must be N or S")
 
+    def frozen(self, quantum=None):
+        """
+        Return an immutable and hashable copy of the Latitude object (see FrozenLatitude), optionally
+        with the decimal degree rounded to a multiple of quantum
+        """
+        return FrozenLatitude.from_coord(self, quantum)
+
     def __repr__(self):
         return "Latitude %s" % (self.__str__())
 
@@ -265,13 +324,16 @@ class Longitude(GeoCoord):
     assignment work as expected. To report in the range 0 to 360, use method range360()
     """
 
+    __slots__ = ()
+    hemispheres = ("E", "W")  # Identifiers of the positive and negative hemisphere
+
     def __init__(self, degree=0, minute=0, second=0):
         super().__init__(degree, minute, second)
 
         decimal_degree = self.range180()  # Make sure that longitudes are reported in the range -180 to 180
-        self.degree, self.minute, self.decimal_minute, self.second = self._calc_degreeminutes(
-            decimal_degree)
-        self._update()
+        # Recombine the degree, minute and second of the wrapped value, just like _update does
+        degree, minute, _, second = self._calc_degreeminutes(decimal_degree)
+        self._decimal_degree = self._calc_decimaldegree(degree, minute, second)
 
     def range180(self):
         """
@@ -311,6 +373,13 @@ class Longitude(GeoCoord):
         else:
             raise ValueError
 
+    def frozen(self, quantum=None):
+        """
+        Return an immutable and hashable copy of the Longitude object (see FrozenLongitude), optionally
+        with the decimal degree rounded to a multiple of quantum
+        """
+        return FrozenLongitude.from_coord(self, quantum)
+
     def __repr__(self):
         return "Longitude %s" % (self.__str__())
 
@@ -386,11 +455,51 @@ def string2geocoord(coord_str, coord_class, format_str="D"):
     return new_coord
 
 
+def _solve_inverse(lat1, lon1, lat2, lon2, ellipse, backend):
+    """
+    Solve the inverse geodesic problem between two positions given in decimal degrees. Returns the
+    initial heading and reverse heading in degrees, and the distance in km.
+    """
+    engine = get_engine(ellipse, backend)
+    heading_initial, heading_reverse, distance = engine.inv(lon1, lat1, lon2, lat2)
+    distance = distance / 1000.0
+    if heading_initial == 0.0:  # Reverse heading not well handled for coordinates that are directly south
+        heading_reverse = 180.0
+    return heading_initial, heading_reverse, distance
+
+
+def _cached_inverse(cache, store, lat1, lon1, lat2, lon2, ellipse, backend):
+    """
+    Look up the result of _solve_inverse in the in-memory cache, then in the persistent store, and
+    solve and remember it if neither has it
+    """
+    if backend is None:
+        backend = get_default_backend()  # Keys must not change when the default backend changes
+    if cache is not None:
+        key = cache.key(lat1, lon1, lat2, lon2, ellipse, backend)
+        result = cache.get(key)
+        if result is not None:
+            return result
+    result = None
+    if store is not None:
+        store_key = store.key(lat1, lon1, lat2, lon2, ellipse, backend)
+        result = store.get(store_key)
+    if result is None:
+        result = _solve_inverse(lat1, lon1, lat2, lon2, ellipse, backend)
+        if store is not None and not store.readonly:
+            store.put(store_key, result)
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
 class LatLon:
     """
     Object representing lat/lon pairs
     """
 
+    __slots__ = ("lat", "lon", "name")
+
     def __init__(self, lat, lon, name=None):
         """
         Input:
@@ -438,19 +547,22 @@ class LatLon:
         """
         return self.lat.decimal_degree + 1j * self.lon.decimal_degree
 
-    def _pyproj_inv(self, other, ellipse="WGS84"):
+    def _pyproj_inv(self, other, ellipse="WGS84", backend=None):
         """
-        Perform Pyproj"s inv operation on two LatLon objects
+        Perform the inverse geodesic operation on two LatLon objects using the cached engine
+        of the given ellipse and backend (see *latloncalc.geodesic.get_engine*).
         Returns the initial heading and reverse heading in degrees, and the distance
-        in km.
+        in km. Results are shared through the inverse cache and the persistent store if
+        they are enabled (see *latloncalc.cache*).
         """
         lat1, lon1 = self.lat.decimal_degree, self.lon.decimal_degree
         lat2, lon2 = other.lat.decimal_degree, other.lon.decimal_degree
-        g = pyproj.Geod(ellps=ellipse)
-        heading_initial, heading_reverse, distance = g.inv(lon1, lat1, lon2, lat2, radians=False)
-        distance = distance / 1000.0
-        if heading_initial == 0.0:  # Reverse heading not well handled for coordinates that are directly south
-            heading_reverse = 180.0
+        cache, store = get_inverse_cache(), get_inverse_store()
+        if cache is None and store is None:
+            result = _solve_inverse(lat1, lon1, lat2, lon2, ellipse, backend)
+        else:
+            result = _cached_inverse(cache, store, lat1, lon1, lat2, lon2, ellipse, backend)
+        heading_initial, heading_reverse, distance = result
         return {"heading_initial": heading_initial, "heading_reverse": heading_reverse,
                 "distance": distance}
 
@@ -458,7 +570,8 @@ class LatLon:
         """
         Returns initial bearing between two LatLon objects in degrees using pyproj.
         Assumes the WGS84 ellipsoid by default. Choose ellipse = "sphere"
-        for the FAI ellipsoid.
+        for the FAI ellipsoid. Choose backend = "haversine" or "vincenty" for
+        the pure NumPy implementations.
         """
         return self._pyproj_inv(other, **kwargs)["heading_initial"]
 
@@ -466,7 +579,8 @@ class LatLon:
         """
         Returns reverse bearing between two LatLon objects in degrees using pyproj.
         Assumes the WGS84 ellipsoid by default. Choose ellipse = "sphere"
-        for the FAI ellipsoid.
+        for the FAI ellipsoid. Choose backend = "haversine" or "vincenty" for
+        the pure NumPy implementations.
         """
         return self._pyproj_inv(other, **kwargs)["heading_reverse"]
 
@@ -474,7 +588,8 @@ class LatLon:
         """
         Returns great circle distance between two LatLon objects in km using pyproj.
         Assumes the WGS84 ellipsoid by default. Choose ellipse = "sphere"
-        for the FAI ellipsoid.
+        for the FAI ellipsoid. Choose backend = "haversine" or "vincenty" for
+        the pure NumPy implementations.
 
         Notes
         -----
@@ -489,7 +604,7 @@ class LatLon:
         
         Returns great circle distance between two lat/lon coordinates on a sphere
         using the Haversine formula. The default radius corresponds to the FAI sphere
-        with units in km.
+        with units in km. For a fast spherical distance use distance(other, backend="haversine").
         """
         warnings.warn("Deprecated in v0.70. Use distance(other, ellipse = 'sphere') instead",
                       DeprecationWarning)
@@ -507,15 +622,15 @@ class LatLon:
         arc = math.acos(cos)
         return arc * radius
 
-    def offset(self, heading_initial, distance, ellipse="WGS84"):
+    def offset(self, heading_initial, distance, ellipse="WGS84", backend=None):
         """
         Offset a LatLon object by a heading (in degrees) and distance (in km)
         to return a new LatLon object
         """
         lat1, lon1 = self.lat.decimal_degree, self.lon.decimal_degree
-        g = pyproj.Geod(ellps=ellipse)
+        engine = get_engine(ellipse, backend)
         distance = distance * 1000  # Convert km to meters
-        lon2, lat2, back_bearing = g.fwd(lon1, lat1, heading_initial, distance, radians=False)
+        lon2, lat2, back_bearing = engine.fwd(lon1, lat1, heading_initial, distance)
         return LatLon(Latitude(lat2), Longitude(lon2))
 
     def to_string(self, formatter="D", n_digits_seconds=7, n_digits_decimal_minutes=7):
@@ -528,6 +643,21 @@ class LatLon:
                 self.lon.to_string(formatter, n_digit_seconds=n_digits_seconds,
                                    n_digits_decimal_minutes=n_digits_decimal_minutes))
 
+    def frozen(self, quantum=None):
+        """
+        Return an immutable and hashable copy of the LatLon object (see FrozenLatLon), optionally
+        with the decimal degrees rounded to a multiple of quantum
+        """
+        return FrozenLatLon(self.lat, self.lon, name=self.name, quantum=quantum)
+
+    def geohash(self, precision=9):
+        """
+        Return the geohash of the LatLon object with precision characters (1 to 12).
+        See latloncalc.geohash for vectorized encoding and decoding
+        """
+        from latloncalc.geohash import encode
+        return str(encode(self.lat.decimal_degree, self.lon.decimal_degree, precision))
+
     def _sub_vector(self, other):
         """
         Called when subtracting a GeoVector object from self
@@ -537,23 +667,24 @@ class LatLon:
         new_latlon = LatLon(self.lat, self.lon)  # Copy current position
         return new_latlon.offset(heading, distance)  # Offset position by GeoVector
 
-    def _sub_latlon(self, other):
+    def _sub_latlon(self, other, **kwargs):
         """
         Called when subtracting a LatLon object from self
         """
-        inv = self._pyproj_inv(other)
+        inv = self._pyproj_inv(other, **kwargs)
         heading = inv["heading_reverse"]
         distance = inv["distance"]
         return GeoVector(initial_heading=heading, distance=distance)
 
-    def almost_equal(self, other, e=0.000001):
+    def almost_equal(self, other, e=0.000001, **kwargs):
         """
         Sometimes required for comparing LatLon coordinates if float error has
         occurred. Determine if self and other (another LatLon coordinate) are
         equal to within e km of each other. The default (e = 0.000001) will return
-        True if self and other are less than 1 mm apart in distance.
+        True if self and other are less than 1 mm apart in distance. The ellipse
+        and backend keywords are passed on to the geodesic engine.
         """
-        return (self - other).magnitude < e
+        return self._sub_latlon(other, **kwargs).magnitude < e
 
     def __eq__(self, other):
         # other is a LatLon object
@@ -625,6 +756,8 @@ def string2latlon(lat_str, lon_str, format_str):
     format_str : str
         Format in which the coordinate strings are given (e.g. for the above examples this would be "d% %m% %S% %H").
         See function *string2geocoord* for a detailed explanation on how to specify formats.
+        To convert many strings at once, use *latloncalc.formats.compile_format* or
+        *latloncalc.arrays.LatLonArray.from_strings* instead.
 
     Returns
     -------
@@ -637,6 +770,230 @@ def string2latlon(lat_str, lon_str, format_str):
     return new_latlon
 
 
+class _FrozenGeoCoord(GeoCoord):
+    """
+    Mixin making a GeoCoord immutable and hashable, with equality and ordering based on the decimal
+    degree. Only frozen coordinates of the same kind (latitudes or longitudes) can be compared, as
+    mutable coordinates hash by identity. Compare those through their *frozen* copy.
+    """
+
+    __slots__ = ()
+    _mutable_class = GeoCoord  # The class which calculates the decimal degree on creation
+
+    def __init__(self, degree=0, minute=0, second=0, quantum=None):
+        decimal_degree = self._mutable_class(degree, minute, second).decimal_degree
+        object.__setattr__(self, "_decimal_degree", self._quantize(decimal_degree, quantum))
+        object.__setattr__(self, "_components", None)
+
+    @classmethod
+    def from_coord(cls, coord, quantum=None):
+        """
+        Create an immutable copy of a Latitude or Longitude object with exactly the same decimal
+        degree, optionally rounded to a multiple of quantum degrees
+        """
+        new_coord = cls.__new__(cls)
+        object.__setattr__(new_coord, "_decimal_degree",
+                           new_coord._quantize(float(coord.decimal_degree), quantum))
+        object.__setattr__(new_coord, "_components", None)
+        return new_coord
+
+    def _quantize(self, decimal_degree, quantum):
+        """
+        Round decimal_degree to a multiple of quantum (e.g. 1e-7), so that nearly identical
+        coordinates compare and hash equal
+        """
+        if not quantum:
+            return decimal_degree
+        steps = 1. / quantum  # Number of steps per degree
+        if abs(steps - round(steps)) < 1e-9 * steps:
+            steps = round(steps)  # Dividing by an exact integer gives e.g. 5.8833 for 1e-7
+        decimal_degree = round(decimal_degree * steps) / steps
+        if hasattr(self, "range180"):
+            decimal_degree = ((decimal_degree + 180) % 360) - 180
+        return decimal_degree + 0.  # Turn -0.0 into 0.0
+
+    def __setattr__(self, name, value):
+        if name == "_components":  # Lazily calculated cache, see GeoCoord
+            object.__setattr__(self, name, value)
+        else:
+            raise AttributeError("{} is immutable, can not set {}".format(type(self).__name__,
+                                                                          name))
+
+    def _immutable(self, *args, **kwargs):
+        raise AttributeError("{} is immutable".format(type(self).__name__))
+
+    set_degree = set_minute = set_second = set_hemisphere = _update = _immutable
+
+    def _key(self, other):
+        if isinstance(other, _FrozenGeoCoord) and other.hemispheres == self.hemispheres:
+            return other.decimal_degree
+        return None
+
+    def __eq__(self, other):
+        value = self._key(other)
+        return NotImplemented if value is None else self._decimal_degree == value
+
+    def __ne__(self, other):
+        value = self._key(other)
+        return NotImplemented if value is None else self._decimal_degree != value
+
+    def __lt__(self, other):
+        value = self._key(other)
+        return NotImplemented if value is None else self._decimal_degree < value
+
+    def __le__(self, other):
+        value = self._key(other)
+        return NotImplemented if value is None else self._decimal_degree <= value
+
+    def __gt__(self, other):
+        value = self._key(other)
+        return NotImplemented if value is None else self._decimal_degree > value
+
+    def __ge__(self, other):
+        value = self._key(other)
+        return NotImplemented if value is None else self._decimal_degree >= value
+
+    def __hash__(self):
+        # Hash of a float, which unlike the hash of a str is the same in every process
+        return hash(self._decimal_degree)
+
+    def __reduce__(self):
+        return self.from_coord, (GeoCoord(self._decimal_degree),)
+
+
+class FrozenLatitude(_FrozenGeoCoord, Latitude):
+    """
+    Immutable and hashable latitude coordinate
+
+    Parameters
+    ----------
+    degree, minute, second : scalar
+        See Latitude
+    quantum : float, optional
+        If given, the decimal degree is rounded to a multiple of quantum (e.g. 1e-7), so that
+        nearly identical coordinates compare and hash equal
+    """
+
+    __slots__ = ()
+    _mutable_class = Latitude
+
+    def __repr__(self):
+        return "FrozenLatitude %s" % (self.__str__())
+
+
+class FrozenLongitude(_FrozenGeoCoord, Longitude):
+    """
+    Immutable and hashable longitude coordinate
+
+    Parameters
+    ----------
+    degree, minute, second : scalar
+        See Longitude
+    quantum : float, optional
+        If given, the decimal degree is rounded to a multiple of quantum (e.g. 1e-7), so that
+        nearly identical coordinates compare and hash equal
+    """
+
+    __slots__ = ()
+    _mutable_class = Longitude
+
+    def __repr__(self):
+        return "FrozenLongitude %s" % (self.__str__())
+
+
+class FrozenLatLon(LatLon):
+    """
+    Immutable and hashable lat/lon pair, which can be used as dictionary key or set member
+
+    Parameters
+    ----------
+    lat : Latitude or scalar
+        The latitude. Latitude objects are copied with exactly the same decimal degree.
+    lon : Longitude or scalar
+        The longitude. Longitude objects are copied with exactly the same decimal degree.
+    name : str, optional
+        An identifier. The name is not used for equality and hashing.
+    quantum : float, optional
+        If given, the decimal degrees are rounded to a multiple of quantum (e.g. 1e-7), so that
+        nearly identical positions compare and hash equal
+
+    Notes
+    -----
+    Positions are equal if their decimal degrees are equal, and are ordered by latitude first and
+    longitude second. Arithmetic returns new (mutable) LatLon objects, just like for LatLon.
+
+    Examples
+    --------
+    >>> visited = {FrozenLatLon(5.8833, -162.0833, quantum=1e-7),
+    ...            FrozenLatLon(5.88330001, 197.9167, quantum=1e-7)}
+    >>> visited
+    {FrozenLatLon(5.8833, -162.0833)}
+    """
+
+    __slots__ = ()
+
+    def __init__(self, lat, lon, name=None, quantum=None):
+        """
+        Create the FrozenLatLon object
+        """
+        if isinstance(lat, GeoCoord):
+            lat = FrozenLatitude.from_coord(lat, quantum)
+        else:
+            lat = FrozenLatitude(lat, quantum=quantum)
+        if isinstance(lon, GeoCoord):
+            lon = FrozenLongitude.from_coord(lon, quantum)
+        else:
+            lon = FrozenLongitude(lon, quantum=quantum)
+        object.__setattr__(self, "lat", lat)
+        object.__setattr__(self, "lon", lon)
+        object.__setattr__(self, "name", name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FrozenLatLon is immutable, can not set {}".format(name))
+
+    def _key(self):
+        return self.lat.decimal_degree, self.lon.decimal_degree
+
+    def __eq__(self, other):
+        if not isinstance(other, LatLon):
+            return NotImplemented
+        return self._key() == (other.lat.decimal_degree, other.lon.decimal_degree)
+
+    def __ne__(self, other):
+        if not isinstance(other, LatLon):
+            return NotImplemented
+        return not self.__eq__(other)
+
+    def __lt__(self, other):
+        if not isinstance(other, LatLon):
+            return NotImplemented
+        return self._key() < (other.lat.decimal_degree, other.lon.decimal_degree)
+
+    def __le__(self, other):
+        if not isinstance(other, LatLon):
+            return NotImplemented
+        return self._key() <= (other.lat.decimal_degree, other.lon.decimal_degree)
+
+    def __gt__(self, other):
+        if not isinstance(other, LatLon):
+            return NotImplemented
+        return self._key() > (other.lat.decimal_degree, other.lon.decimal_degree)
+
+    def __ge__(self, other):
+        if not isinstance(other, LatLon):
+            return NotImplemented
+        return self._key() >= (other.lat.decimal_degree, other.lon.decimal_degree)
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __reduce__(self):
+        return FrozenLatLon, (self.lat, self.lon, self.name)
+
+    def __repr__(self):
+        return "FrozenLatLon(%s, %s)" % (self.lat.__str__(), self.lon.__str__())
+
+
 class GeoVector(object):
     """
     Object representing the distance and heading between two lat/lon coordinates
@@ -0,0 +1,93 @@
+"""
+Pairwise distance matrices between two collections of positions.
+
+The matrix is computed in square tiles of at most block_size x block_size elements. Each tile is
+solved with one vectorized call to the geodesic engine and written straight into the output
+array, so the memory needed next to the output is bounded by the tile size. The output can be a
+preallocated array or a memory-mapped array (e.g. created with *numpy.lib.format.open_memmap*),
+which allows matrices larger than the available memory.
+"""
+
+import concurrent.futures
+
+import numpy as np
+
+from latloncalc.arrays import _as_latlonarray
+from latloncalc.geodesic import get_engine
+
+
+def _tiles(n_rows, n_columns, block_size):
+    """
+    Yield the row and column slices of all tiles
+    """
+    for row_start in range(0, n_rows, block_size):
+        rows = slice(row_start, min(row_start + block_size, n_rows))
+        for column_start in range(0, n_columns, block_size):
+            yield rows, slice(column_start, min(column_start + block_size, n_columns))
+
+
+def distance_matrix(a, b=None, ellipse="WGS84", backend=None, block_size=512, out=None,
+                    n_jobs=None):
+    """
+    Calculate the distances in km between all positions of a and all positions of b
+
+    Parameters
+    ----------
+    a : LatLonArray or sequence of LatLon
+        The positions corresponding to the rows of the matrix
+    b : LatLonArray or sequence of LatLon, optional
+        The positions corresponding to the columns of the matrix. Defaults to a.
+    ellipse : str or tuple, optional, default="WGS84"
+        Ellipsoid name or (a, f) tuple passed to the geodesic engine
+    backend : str, optional
+        Geodesic backend, see *latloncalc.geodesic.get_engine*
+    block_size : int, optional, default=512
+        Maximum number of rows and columns of a tile
+    out : numpy.ndarray, optional
+        Array of shape (len(a), len(b)) in which the result is stored, e.g. a numpy.memmap.
+        A new float64 array is created if not given.
+    n_jobs : int, optional
+        Number of threads used to compute tiles in parallel. The geodesic solvers release the GIL,
+        so the tiles are computed on multiple cores without copying the output array.
+
+    Returns
+    -------
+    numpy.ndarray:
+        The distance matrix in km (the out array if given)
+
+    Examples
+    --------
+    >>> from latloncalc.arrays import LatLonArray
+    >>> ports = LatLonArray([5.8833, 21.3], [-162.0833, -157.8167])
+    >>> distance_matrix(ports)
+    array([[   0.        , 1766.69130376],
+           [1766.69130376,    0.        ]])
+    """
+    if block_size < 1:
+        raise ValueError("block_size must be at least 1, got {}".format(block_size))
+    a = _as_latlonarray(a)
+    b = a if b is None else _as_latlonarray(b)
+    shape = (len(a), len(b))
+    if out is None:
+        out = np.empty(shape, dtype=np.float64)
+    elif out.shape != shape:
+        raise ValueError("out must have shape {}, got {}".format(shape, out.shape))
+    engine = get_engine(ellipse, backend)
+
+    def compute_tile(tile):
+        rows, columns = tile
+        lon1, lon2 = np.meshgrid(a.lon[rows], b.lon[columns], indexing="ij")
+        lat1, lat2 = np.meshgrid(a.lat[rows], b.lat[columns], indexing="ij")
+        distance = engine.inv(lon1.ravel(), lat1.ravel(), lon2.ravel(), lat2.ravel())[2]
+        out[rows, columns] = np.reshape(distance, lon1.shape) / 1000.0
+
+    tiles = _tiles(shape[0], shape[1], block_size)
+    if not n_jobs or n_jobs <= 1:
+        for tile in tiles:
+            compute_tile(tile)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            # Consume the results to raise any exception of the workers
+            for _ in executor.map(compute_tile, tiles):
+                pass
+    return out
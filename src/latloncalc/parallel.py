@@ -0,0 +1,284 @@
+"""
+Parallel execution of batch distance, heading and offset calculations.
+
+A *BatchExecutor* splits the coordinate arrays of a batch operation into chunks of chunk_size
+positions and solves the chunks on a pool of threads or processes. The coordinates and the
+results of all chunks live in one float64 buffer with a row per coordinate. Threads write into
+that buffer directly. For a process pool the buffer is a *multiprocessing.shared_memory* block,
+so the workers attach to it by name instead of receiving pickled copies of the arrays. Each chunk
+writes its results into its own columns of the buffer, so the results are in input order without
+any reassembly step.
+
+The time needed to solve each chunk is recorded as a *ChunkTiming* in *BatchExecutor.timings*,
+which helps to choose a chunk size: chunks should be large enough that the time per chunk is well
+above the overhead of dispatching it (tens of microseconds for threads, about a millisecond for
+processes), and small enough to keep all workers busy until the end.
+
+The pyproj solvers release the GIL, so a thread pool already uses multiple cores for the default
+backend. A process pool also parallelizes the pure NumPy backends, but its workers only know the
+built-in backends unless the processes are forked after *register_backend* was called.
+
+Examples
+--------
+>>> from latloncalc.latlon import LatLon
+>>> positions = LatLonArray([5.8833, 21.3], [-162.0833, -157.8167])
+>>> with BatchExecutor(kind="process", n_jobs=2, chunk_size=1) as executor:
+...     executor.distance(positions, LatLon(5.8833, -162.0833))
+array([   0.        , 1766.69130376])
+"""
+
+import collections
+import concurrent.futures
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from latloncalc.arrays import LatLonArray, _as_latlonarray
+from latloncalc.geodesic import get_default_backend, get_engine
+
+ChunkTiming = collections.namedtuple("ChunkTiming", ["index", "start", "stop", "seconds", "worker"])
+ChunkTiming.__doc__ = """\
+Time needed to solve one chunk of a batch operation
+
+Attributes
+----------
+index : int
+    Number of the chunk
+start, stop : int
+    The chunk covers the positions start to stop (exclusive) of the batch
+seconds : float
+    Time spent solving the chunk in the worker, excluding the time waiting in the queue
+worker : str
+    Process id and thread name of the worker which solved the chunk
+"""
+
+# Number of input rows (lon, lat and two more coordinates) and output rows of each operation
+_N_INPUTS = 4
+_N_OUTPUTS = 3
+
+
+def _solve_chunk(operation, ellipse, backend, buffer, index, start, stop):
+    """
+    Solve the columns start to stop of the buffer with the inv or fwd method of the engine and
+    write the results into the output rows of the buffer
+    """
+    begin = time.perf_counter()
+    engine = get_engine(ellipse, backend)
+    solve = engine.inv if operation == "inv" else engine.fwd
+    results = solve(*buffer[:_N_INPUTS, start:stop])
+    for row, result in enumerate(results, _N_INPUTS):
+        buffer[row, start:stop] = result
+    worker = "{}/{}".format(os.getpid(), threading.current_thread().name)
+    return ChunkTiming(index, start, stop, time.perf_counter() - begin, worker)
+
+
+def _solve_shared_chunk(operation, ellipse, backend, name, shape, index, start, stop):
+    """
+    Attach to the shared memory block with the buffer and solve a chunk in a worker process
+    """
+    block = shared_memory.SharedMemory(name=name)
+    buffer = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+    try:
+        return _solve_chunk(operation, ellipse, backend, buffer, index, start, stop)
+    finally:
+        del buffer  # The block can only be closed when no array refers to its memory
+        block.close()
+
+
+class BatchExecutor:
+    """
+    Solves batch geodesic operations in chunks on a pool of threads or processes
+
+    Parameters
+    ----------
+    kind : str, optional, default="thread"
+        Either "thread" or "process"
+    n_jobs : int, optional
+        Number of workers of the pool. Defaults to the number of CPUs.
+    chunk_size : int, optional, default=100000
+        Number of positions solved by a worker at once
+
+    Attributes
+    ----------
+    timings : list of ChunkTiming
+        The timing of each chunk of the last operation, ordered by chunk
+
+    Notes
+    -----
+    The pool is created on first use and shut down by *close*, or when leaving the with-block if
+    the executor is used as a context manager. Batches of at most chunk_size positions are solved
+    in the calling thread.
+    """
+
+    def __init__(self, kind="thread", n_jobs=None, chunk_size=100000):
+        """
+        Create the BatchExecutor object
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError("kind must be 'thread' or 'process', got {}".format(kind))
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1, got {}".format(chunk_size))
+        self.kind = kind
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.chunk_size = int(chunk_size)
+        self.timings = []
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                if self.kind == "thread":
+                    self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.n_jobs)
+                else:
+                    self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.n_jobs)
+            return self._pool
+
+    def close(self):
+        """
+        Shut down the pool of workers
+        """
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _run(self, operation, inputs, ellipse, backend):
+        """
+        Solve the operation ("inv" or "fwd") for the input arrays in chunks and return the output
+        arrays in the order of the input
+        """
+        inputs = np.broadcast_arrays(*[np.asarray(value, dtype=np.float64) for value in inputs])
+        n = inputs[0].size
+        shape = (_N_INPUTS + _N_OUTPUTS, n)
+        chunks = [(index, start, min(start + self.chunk_size, n)) for index, start in
+                  enumerate(range(0, n, self.chunk_size))]
+        if len(chunks) <= 1 or self.kind == "thread":
+            buffer = np.empty(shape)
+            buffer[:_N_INPUTS] = [np.ravel(value) for value in inputs]
+            if len(chunks) <= 1:
+                self.timings = [_solve_chunk(operation, ellipse, backend, buffer, *chunk)
+                                for chunk in chunks]
+            else:
+                futures = [self._get_pool().submit(_solve_chunk, operation, ellipse, backend,
+                                                   buffer, *chunk) for chunk in chunks]
+                self.timings = [future.result() for future in futures]
+            return tuple(buffer[_N_INPUTS:])
+        pool = self._get_pool()
+        if backend is None:
+            backend = get_default_backend()  # The default of the workers may differ
+        block = shared_memory.SharedMemory(create=True, size=8 * shape[0] * n)
+        buffer = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+        try:
+            buffer[:_N_INPUTS] = [np.ravel(value) for value in inputs]
+            futures = [pool.submit(_solve_shared_chunk, operation, ellipse, backend, block.name,
+                                   shape, *chunk) for chunk in chunks]
+            self.timings = [future.result() for future in futures]
+            return tuple(buffer[_N_INPUTS:].copy())
+        finally:
+            del buffer
+            block.close()
+            block.unlink()
+
+    def inverse(self, positions, other, ellipse="WGS84", backend=None):
+        """
+        Solve the inverse geodesic problem between positions and other in parallel
+
+        Parameters
+        ----------
+        positions : LatLonArray or sequence of LatLon
+            The start positions
+        other : LatLon, LatLonArray or sequence of LatLon
+            The end positions, either one position or as many positions as positions
+        ellipse : str or tuple, optional, default="WGS84"
+            Ellipsoid name or (a, f) tuple passed to the geodesic engine
+        backend : str, optional
+            Geodesic backend, see *latloncalc.geodesic.get_engine*
+
+        Returns
+        -------
+        dict:
+            Arrays with the initial heading and reverse heading in degrees, and the distance in
+            km, like *LatLonArray._pyproj_inv*
+        """
+        positions = _as_latlonarray(positions)
+        other = _as_latlonarray(other)
+        if len(other) not in (1, len(positions)):
+            raise ValueError("Arrays must have the same length ({} != {})"
+                             "".format(len(positions), len(other)))
+        heading_initial, heading_reverse, distance = self._run(
+            "inv", (positions.lon, positions.lat, other.lon, other.lat), ellipse, backend)
+        # Reverse heading not well handled for coordinates that are directly south
+        heading_reverse[heading_initial == 0.0] = 180.0
+        return {"heading_initial": heading_initial, "heading_reverse": heading_reverse,
+                "distance": distance / 1000.0}
+
+    def distance(self, positions, other, **kwargs):
+        """
+        Returns the distances in km between positions and other, see *inverse*
+        """
+        return self.inverse(positions, other, **kwargs)["distance"]
+
+    def heading_initial(self, positions, other, **kwargs):
+        """
+        Returns the initial headings in degrees from positions to other, see *inverse*
+        """
+        return self.inverse(positions, other, **kwargs)["heading_initial"]
+
+    def heading_reverse(self, positions, other, **kwargs):
+        """
+        Returns the reverse headings in degrees from positions to other, see *inverse*
+        """
+        return self.inverse(positions, other, **kwargs)["heading_reverse"]
+
+    def offset(self, origins, heading_initial, distance, ellipse="WGS84", backend=None):
+        """
+        Offset origins by headings and distances in parallel
+
+        Parameters
+        ----------
+        origins : LatLon, LatLonArray or sequence of LatLon
+            The start positions
+        heading_initial : scalar or array_like
+            Initial headings in degrees
+        distance : scalar or array_like
+            Distances in km
+        ellipse : str or tuple, optional, default="WGS84"
+            Ellipsoid name or (a, f) tuple passed to the geodesic engine
+        backend : str, optional
+            Geodesic backend, see *latloncalc.geodesic.get_engine*
+
+        Returns
+        -------
+        tuple:
+            A LatLonArray with the destinations and an array with the back bearings in degrees,
+            like *arrays.batch_offset* with the origins, headings and distances broadcast against
+            each other and flattened
+        """
+        origins = _as_latlonarray(origins)
+        lat, lon = origins.lat, origins.lon
+        if len(origins) == 1:
+            lat, lon = lat[0], lon[0]  # Broadcast a single origin against any shape
+        lon2, lat2, back_bearing = self._run(
+            "fwd", (lon, lat, heading_initial, np.asarray(distance) * 1000.), ellipse, backend)
+        return LatLonArray(lat2, lon2), back_bearing
+
+    def __repr__(self):
+        return "BatchExecutor(kind={!r}, n_jobs={}, chunk_size={})".format(
+            self.kind, self.n_jobs, self.chunk_size)
+
+    @staticmethod
+    def type():
+        """
+        Identifies the object type
+        """
+        return "BatchExecutor"
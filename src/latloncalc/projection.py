@@ -0,0 +1,196 @@
+"""
+Projection of whole coordinate arrays with cached pyproj transformers.
+
+A *Projection* converts between geographic coordinates (WGS84 latitudes and longitudes in decimal
+degrees) and the x and y coordinates of a projected coordinate reference system (CRS), given as
+an EPSG code, a CRS string or a *pyproj.CRS* object. The transformers always use the (x, y) =
+(longitude, latitude) axis order, whatever the axis order of the CRS definition.
+
+Creating a *pyproj.Transformer* is expensive, so projections are cached by *get_projection*.
+Transformers are not safe to share between threads, so each thread creates its own on first use.
+Arrays are transformed in place, in chunks, so the memory needed next to the input and output
+arrays is bounded by the chunk size. pyproj is imported on first use.
+
+Examples
+--------
+>>> utm3 = get_projection(32603)  # UTM zone 3 north
+>>> x, y = utm3.forward(LatLonArray([5.8833], [-162.0833]))
+>>> x.astype(int), y.astype(int)
+(array([822995]), array([651147]))
+>>> utm3.inverse(x, y).lat
+array([5.8833])
+"""
+
+import functools
+import threading
+
+import numpy as np
+
+from latloncalc.arrays import LatLonArray
+
+GEOGRAPHIC_CRS = "EPSG:4326"  # WGS84 latitudes and longitudes
+
+
+def _as_crs(crs):
+    """
+    Convert an EPSG code, a CRS string or a pyproj.CRS object into a pyproj.CRS object
+    """
+    import pyproj
+
+    if isinstance(crs, int):
+        crs = "EPSG:{:d}".format(crs)
+    return pyproj.CRS.from_user_input(crs)
+
+
+class Projection:
+    """
+    Forward and inverse projection between lat/lon coordinates and a projected CRS
+
+    Parameters
+    ----------
+    crs : int, str or pyproj.CRS
+        The projected CRS, e.g. 32603 or "EPSG:32603" for UTM zone 3 north
+    chunk_size : int, optional, default=1000000
+        Number of coordinates which are transformed at once
+
+    Notes
+    -----
+    Use *get_projection* to share projections instead of creating a new one for every call.
+    """
+
+    def __init__(self, crs, chunk_size=1000000):
+        """
+        Create the Projection object
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1, got {}".format(chunk_size))
+        self.crs = _as_crs(crs)
+        self.chunk_size = int(chunk_size)
+        self._geographic_crs = _as_crs(GEOGRAPHIC_CRS)
+        self._local = threading.local()
+
+    def _transformers(self):
+        """
+        Return the forward and inverse transformers of the current thread
+        """
+        transformers = getattr(self._local, "transformers", None)
+        if transformers is None:
+            import pyproj
+
+            transformers = (
+                pyproj.Transformer.from_crs(self._geographic_crs, self.crs, always_xy=True),
+                pyproj.Transformer.from_crs(self.crs, self._geographic_crs, always_xy=True))
+            self._local.transformers = transformers
+        return transformers
+
+    def _transform(self, transformer, x, y):
+        """
+        Transform copies of x and y in place, chunk by chunk
+        """
+        x = np.array(x, dtype=np.float64).reshape(-1)
+        y = np.array(y, dtype=np.float64).reshape(-1)
+        if x.shape != y.shape:
+            raise ValueError("Coordinate arrays must have the same length ({} != {})"
+                             "".format(x.size, y.size))
+        for start in range(0, x.size, self.chunk_size):
+            chunk = slice(start, start + self.chunk_size)
+            transformer.transform(x[chunk], y[chunk], inplace=True)
+        return x, y
+
+    def forward(self, positions):
+        """
+        Project positions into the CRS
+
+        Parameters
+        ----------
+        positions : LatLonArray or sequence of LatLon
+            The positions to project
+
+        Returns
+        -------
+        tuple:
+            Arrays with the x and y coordinates (e.g. easting and northing in meters)
+        """
+        try:
+            is_array = positions.type() == "LatLonArray"
+        except AttributeError:
+            is_array = False
+        if not is_array:
+            positions = LatLonArray.from_latlons(positions)
+        return self._transform(self._transformers()[0], positions.lon, positions.lat)
+
+    def inverse(self, x, y):
+        """
+        Convert x and y coordinates of the CRS into positions
+
+        Parameters
+        ----------
+        x, y : array_like
+            Coordinates in the CRS (e.g. easting and northing in meters)
+
+        Returns
+        -------
+        LatLonArray:
+            The positions
+        """
+        lon, lat = self._transform(self._transformers()[1], x, y)
+        return LatLonArray(lat, lon)
+
+    def __call__(self, lon, lat):
+        """
+        Project a single position, so that a Projection can be passed to LatLon.project
+        """
+        return self._transformers()[0].transform(lon, lat)
+
+    def __repr__(self):
+        return "Projection(%r)" % self.crs.to_string()
+
+    @staticmethod
+    def type():
+        """
+        Identifies the object type
+        """
+        return "Projection"
+
+
+@functools.lru_cache(maxsize=32)
+def _get_projection(crs):
+    return Projection(crs)
+
+
+def get_projection(crs):
+    """
+    Return a cached Projection for a CRS
+
+    Parameters
+    ----------
+    crs : int, str or pyproj.CRS
+        The projected CRS, e.g. 32603 or "EPSG:32603" for UTM zone 3 north
+
+    Returns
+    -------
+    Projection:
+        A projection which is created on the first request and shared by later requests
+    """
+    import pyproj
+
+    if isinstance(crs, int):
+        crs = "EPSG:{:d}".format(crs)  # Share the projection of 32603 and "EPSG:32603"
+    elif isinstance(crs, pyproj.CRS):
+        crs = crs.to_wkt()  # pyproj.CRS objects are not reliably hashable, their WKT is
+    return _get_projection(crs)
+
+
+def project(positions, crs):
+    """
+    Project positions (a LatLonArray or a sequence of LatLon) into a CRS with a cached
+    Projection. Returns arrays with the x and y coordinates.
+    """
+    return get_projection(crs).forward(positions)
+
+
+def unproject(x, y, crs):
+    """
+    Convert x and y coordinates of a CRS into a LatLonArray with a cached Projection
+    """
+    return get_projection(crs).inverse(x, y)
@@ -0,0 +1,284 @@
+"""
+Simplification of tracks with the Douglas-Peucker and Visvalingam-Whyatt algorithms.
+
+Both algorithms work on arrays of latitudes and longitudes and return the indices of the positions
+to keep. The tolerance of Douglas-Peucker is a geodesic cross-track distance in km: the distance
+to the nearest point of the geodesic between the end points of a leg, which is the nearest end
+point if the position lies beyond the leg.
+
+Cross-track distances are first computed from 3D unit vectors on a sphere with the mean radius
+(2a + b) / 3 of the ellipsoid. They deviate from the geodesic cross-track distances by about 0.6%
+of the distance plus the separation of the great circle and the geodesic between the end points,
+which grows with the square of the leg length (about 60 m for a leg of 1000 km). Only positions
+of which the spherical distance is within a bound f * L ** 2 / a + 1% of the tolerance (with L
+the leg length) are measured again with the geodesic engine, so whether a position is within the
+tolerance is decided by its geodesic distance. The position at which a leg is split is the
+position with the largest spherical distance.
+
+Visvalingam-Whyatt uses the areas of spherical triangles on the sphere with the mean radius.
+
+Douglas-Peucker is implemented iteratively and splits all legs of a pass at once, so the number of
+vectorized passes is the depth of the split tree rather than the number of kept positions.
+Visvalingam-Whyatt removes positions one by one with a heap of effective areas. It is inherently
+sequential and therefore much slower than Douglas-Peucker for tracks of millions of positions.
+"""
+
+import heapq
+import math
+
+import numpy as np
+
+from latloncalc.geodesic import _ellipsoid_parameters, get_engine
+from latloncalc.spatial import _unit_vectors
+
+
+def _mean_radius(ellipse):
+    """
+    Return the mean radius (2a + b) / 3 of an ellipsoid in km
+    """
+    a, f = _ellipsoid_parameters(ellipse)
+    return a * (1. - f / 3.) / 1000.0
+
+
+def _cross(u, v):
+    """
+    Cross products of the columns (x, y, z) of the vectors u and v
+    """
+    return (u[1] * v[2] - u[2] * v[1], u[2] * v[0] - u[0] * v[2], u[0] * v[1] - u[1] * v[0])
+
+
+def _dot(u, v):
+    return u[0] * v[0] + u[1] * v[1] + u[2] * v[2]
+
+
+def _leg_planes(start, end):
+    """
+    Return the unit normals of the great circles of legs, the normals of the planes through the
+    end points which bound the legs, and a mask of degenerate legs (coinciding or antipodal end
+    points)
+    """
+    normal = _cross(start, end)
+    norm = np.sqrt(_dot(normal, normal))
+    degenerate = norm < 1e-15
+    norm[degenerate] = 1.
+    normal = tuple(component / norm for component in normal)
+    return normal, _cross(normal, start), _cross(end, normal), degenerate
+
+
+def _point_angle(p, q):
+    """
+    Angle in radians between the unit vectors p and q (chord based, accurate for small angles)
+    """
+    chord = np.sqrt(sum((p_i - q_i) ** 2 for p_i, q_i in zip(p, q)))
+    return 2. * np.arcsin(np.minimum(chord / 2., 1.))
+
+
+def _segment_angle(p, start, end, leg):
+    """
+    Angle in radians between the points p and the great circle arcs from start to end of the legs
+    with index leg
+
+    A point whose projection on the plane of the great circle lies between the end points of its
+    leg is at its cross-track angle from the leg, any other point is at the angle to the nearest
+    end point.
+    """
+    normal, start_plane, end_plane, degenerate = _leg_planes(start, end)
+
+    def of_leg(vector, selection=leg):
+        return tuple(component[selection] for component in vector)
+
+    cross_track = np.abs(np.arcsin(np.clip(_dot(p, of_leg(normal)), -1., 1.)))
+    outside = ((_dot(p, of_leg(start_plane)) < 0) | (_dot(p, of_leg(end_plane)) < 0) |
+               degenerate[leg])
+    if outside.any():
+        p_outside = tuple(component[outside] for component in p)
+        cross_track[outside] = np.minimum(_point_angle(p_outside, of_leg(start, leg[outside])),
+                                          _point_angle(p_outside, of_leg(end, leg[outside])))
+    return cross_track
+
+
+def _cross_track(engine, lat, lon, lat1, lon1, azimuth, length, max_iterations=10):
+    """
+    Geodesic distance in m of the positions (lat, lon) to the legs which start at (lat1, lon1)
+    with the given azimuth and length in m
+
+    Starting at the start of the leg, the foot point is moved along the leg by the along-track
+    distance of the position on a sphere touching the ellipsoid at the foot point, until it moves
+    less than 0.1 mm. The foot point stays within the leg, so for positions beyond the leg the
+    distance to the nearest end point is returned.
+    """
+    along = np.zeros(lat.size)
+    for _ in range(max_iterations):
+        foot_lon, foot_lat, back_azimuth = engine.fwd(lon1, lat1, azimuth, along)
+        foot_azimuth, _, distance = engine.inv(foot_lon, foot_lat, lon, lat)
+        angle = np.radians(np.asarray(foot_azimuth) - np.asarray(back_azimuth) - 180.)
+        arc = np.asarray(distance) / engine.a
+        step = engine.a * np.arctan2(np.sin(arc) * np.cos(angle), np.cos(arc))
+        new_along = np.clip(along + step, 0., length)
+        converged = np.abs(new_along - along).max() < 1e-4
+        along = new_along
+        if converged:
+            break
+    return np.asarray(distance, dtype=np.float64)
+
+
+def _check_coordinates(lat, lon):
+    lat = np.ascontiguousarray(lat, dtype=np.float64).reshape(-1)
+    lon = np.ascontiguousarray(lon, dtype=np.float64).reshape(-1)
+    if lat.shape != lon.shape:
+        raise ValueError("lat and lon must have the same length ({} != {})"
+                         "".format(lat.size, lon.size))
+    return lat, lon
+
+
+def douglas_peucker(lat, lon, tolerance, ellipse="WGS84", backend=None):
+    """
+    Simplify a track with the Douglas-Peucker algorithm
+
+    Parameters
+    ----------
+    lat : array_like
+        Latitudes of the positions of the track in decimal degrees
+    lon : array_like
+        Longitudes of the positions of the track in decimal degrees
+    tolerance : float
+        Maximum geodesic cross-track distance in km of the removed positions to the simplified
+        track
+    ellipse : str or tuple, optional, default="WGS84"
+        Ellipsoid name or (a, f) tuple passed to the geodesic engine
+    backend : str, optional
+        Geodesic backend used for positions close to the tolerance, see
+        *latloncalc.geodesic.get_engine*
+
+    Returns
+    -------
+    numpy.ndarray:
+        The sorted indices of the positions to keep, always including the first and last position
+
+    Examples
+    --------
+    >>> douglas_peucker([0., 0.001, 0., 0.5, 0.], [0., 1., 2., 3., 4.], tolerance=1.)
+    array([0, 2, 3, 4])
+    """
+    lat, lon = _check_coordinates(lat, lon)
+    n = lat.size
+    if n < 3:
+        return np.arange(n)
+    radius = _mean_radius(ellipse) * 1000.0
+    tolerance = tolerance * 1000.0
+    engine = get_engine(ellipse, backend)
+    vectors = tuple(np.ascontiguousarray(c) for c in _unit_vectors(lat, lon).T)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    # Positions which still may be kept, i.e. are not within tolerance of their leg
+    candidates = np.arange(1, n - 1)
+    while candidates.size:
+        kept = np.flatnonzero(keep)
+        start = tuple(c[kept[:-1]] for c in vectors)
+        end = tuple(c[kept[1:]] for c in vectors)
+        leg = np.searchsorted(kept, candidates, side="right") - 1
+        distance = _segment_angle(tuple(c[candidates] for c in vectors), start, end, leg) * radius
+        # The candidates are sorted, so the candidates of each leg are contiguous
+        starts = np.flatnonzero(np.r_[True, leg[1:] != leg[:-1]])
+        group = np.repeat(np.arange(starts.size), np.diff(np.r_[starts, leg.size]))
+        maximum = np.maximum.reduceat(distance, starts)
+        # Bound of the difference between the spherical and geodesic cross-track distance
+        length = _point_angle(start, end)[leg] * radius
+        bound = 0.01 * distance + max(engine.f, 0.) * length ** 2 / engine.a + 1e-3
+        split = np.zeros(starts.size, dtype=bool)
+        split[group[distance - bound > tolerance]] = True
+        uncertain = np.flatnonzero((distance + bound > tolerance) & ~split[group])
+        if uncertain.size:
+            leg_start, leg_end = kept[leg[uncertain]], kept[leg[uncertain] + 1]
+            azimuth, _, leg_length = engine.inv(lon[leg_start], lat[leg_start], lon[leg_end],
+                                                lat[leg_end])
+            geodesic = _cross_track(engine, lat[candidates[uncertain]], lon[candidates[uncertain]],
+                                    lat[leg_start], lon[leg_start], np.asarray(azimuth),
+                                    np.asarray(leg_length))
+            split[group[uncertain[geodesic > tolerance]]] = True
+        if not split.any():
+            break
+        is_maximum = distance == maximum[group]
+        # Split each leg at its first position with the maximum distance
+        _, first = np.unique(group[is_maximum], return_index=True)
+        farthest = np.flatnonzero(is_maximum)[first]
+        keep[candidates[farthest[split]]] = True
+        # Positions of legs which are within tolerance are never kept
+        remaining = split[group]
+        remaining[farthest] = False
+        candidates = candidates[remaining]
+    return np.flatnonzero(keep)
+
+
+def _triangle_area(a, b, c):
+    """
+    Area of the spherical triangle between the unit vectors a, b and c on the unit sphere
+    """
+    cross_x = b[1] * c[2] - b[2] * c[1]
+    cross_y = b[2] * c[0] - b[0] * c[2]
+    cross_z = b[0] * c[1] - b[1] * c[0]
+    triple = a[0] * cross_x + a[1] * cross_y + a[2] * cross_z
+    denominator = (1. + a[0] * b[0] + a[1] * b[1] + a[2] * b[2] + b[0] * c[0] + b[1] * c[1] +
+                   b[2] * c[2] + c[0] * a[0] + c[1] * a[1] + c[2] * a[2])
+    return 2. * math.atan2(abs(triple), denominator)
+
+
+def _triangle_areas(a, b, c):
+    """
+    Vectorized version of _triangle_area for the columns (x, y, z) of unit vectors
+    """
+    triple = _dot(a, _cross(b, c))
+    return 2. * np.arctan2(np.abs(triple), 1. + _dot(a, b) + _dot(b, c) + _dot(c, a))
+
+
+def visvalingam(lat, lon, min_area, ellipse="WGS84"):
+    """
+    Simplify a track with the Visvalingam-Whyatt algorithm
+
+    Parameters
+    ----------
+    lat : array_like
+        Latitudes of the positions of the track in decimal degrees
+    lon : array_like
+        Longitudes of the positions of the track in decimal degrees
+    min_area : float
+        Positions of which the effective area (the area of the triangle with their neighbours) is
+        smaller than min_area in km2 are removed
+    ellipse : str or tuple, optional, default="WGS84"
+        Ellipsoid name or (a, f) tuple of which the mean radius is used
+
+    Returns
+    -------
+    numpy.ndarray:
+        The sorted indices of the positions to keep, always including the first and last position
+    """
+    lat, lon = _check_coordinates(lat, lon)
+    n = lat.size
+    if n < 3:
+        return np.arange(n)
+    min_area = min_area / _mean_radius(ellipse) ** 2
+    vectors = _unit_vectors(lat, lon)
+    initial_area = np.full(n, np.inf)
+    initial_area[1:-1] = _triangle_areas(vectors[:-2].T, vectors[1:-1].T, vectors[2:].T)
+    vectors = vectors.tolist()
+    area = initial_area.tolist()
+    previous = list(range(-1, n - 1))
+    following = list(range(1, n + 1))
+    # Only positions with an effective area below min_area can ever be removed
+    heap = [(area[i], i) for i in np.flatnonzero(initial_area < min_area).tolist()]
+    heapq.heapify(heap)
+    while heap:
+        effective_area, i = heapq.heappop(heap)
+        if effective_area != area[i]:
+            continue  # Outdated heap entry or removed position
+        area[i] = None
+        before, after = previous[i], following[i]
+        following[before], previous[after] = after, before
+        for j in (before, after):
+            if 0 < j < n - 1:
+                # The effective area never decreases, so positions are removed in order of area
+                area[j] = max(effective_area, _triangle_area(
+                    vectors[previous[j]], vectors[j], vectors[following[j]]))
+                if area[j] < min_area:
+                    heapq.heappush(heap, (area[j], j))
+    return np.flatnonzero(np.not_equal(area, None))
@@ -0,0 +1,551 @@
+"""
+Spatial index for nearest neighbour and range queries on collections of positions.
+
+The positions are converted to 3D unit vectors (x, y, z) and stored in a k-d tree. The tree gives
+the candidates closest to a query point along straight lines through the sphere (chord
+distances), which are then refined with exact distances from the geodesic engine.
+
+On an ellipsoid the order of the chord distances is not exactly the order of the geodesic
+distances. The angle between the surface normals of two positions (the angle between the unit
+vectors) is at most the geodesic distance divided by the smallest radius of curvature of the
+ellipsoid, a * (1 - f) ** 2. After finding k candidates, all positions within the resulting
+bound are refined as well, so the returned neighbours are exact.
+
+Range queries prune the tree with cheap bounds first: a radius query only visits nodes within
+the chord distance corresponding to the radius, a bounding box query only visits nodes which
+overlap the latitude band and the longitude wedge of the box. Both work across the antimeridian
+because the tree is built on 3D unit vectors.
+"""
+
+import heapq
+
+import numpy as np
+
+from latloncalc.arrays import LatLonArray
+from latloncalc.geodesic import get_default_backend, get_engine
+
+
+def _unit_vectors(lat, lon):
+    """
+    Convert latitudes and longitudes in decimal degrees into 3D unit vectors
+    """
+    phi = np.radians(lat)
+    lam = np.radians(lon)
+    cos_phi = np.cos(phi)
+    return np.column_stack((cos_phi * np.cos(lam), cos_phi * np.sin(lam), np.sin(phi)))
+
+
+def _longitude_offset(lon, west):
+    """
+    Return how far east of west the longitudes lon are, in the range 0 to 360 (like
+    Longitude.range360 of the difference)
+    """
+    return (np.asarray(lon) - west + 360) % 360
+
+
+def _meridian_normal(lon):
+    """
+    Normal vector of the plane through a meridian, pointing to the east of that meridian
+    """
+    lam = np.radians(lon)
+    return np.array([-np.sin(lam), np.cos(lam), 0.])
+
+
+def _chord(angle):
+    """
+    Convert an angle in radians between two unit vectors into a chord length
+    """
+    return 2. * np.sin(np.minimum(angle, np.pi) / 2.)
+
+
+class SpatialIndex:
+    """
+    Build-once index over a collection of positions for nearest neighbour queries
+
+    Parameters
+    ----------
+    positions : LatLonArray or sequence of LatLon
+        The positions to index
+    ellipse : str or tuple, optional, default="WGS84"
+        Ellipsoid name or (a, f) tuple used for the exact distances
+    backend : str, optional
+        Geodesic backend used for the exact distances, see *latloncalc.geodesic.get_engine*
+    leaf_size : int, optional, default=32
+        Maximum number of positions in a leaf of the tree
+
+    Notes
+    -----
+    The index is immutable. Use *save* and *load* to build it once and reuse it later.
+
+    Examples
+    --------
+    >>> from latloncalc.latlon import LatLon
+    >>> ports = LatLonArray([5.8833, 21.3, 38.9], [-162.0833, -157.8167, -77.0333])
+    >>> index = SpatialIndex(ports)
+    >>> index.nearest(LatLon(20, -155), k=2)
+    (array([ 326.90613995, 1739.68223614]), array([1, 0]))
+    """
+
+    def __init__(self, positions, ellipse="WGS84", backend=None, leaf_size=32):
+        """
+        Build the SpatialIndex object
+        """
+        if leaf_size < 1:
+            raise ValueError("leaf_size must be at least 1, got {}".format(leaf_size))
+        try:
+            is_array = positions.type() == "LatLonArray"
+        except AttributeError:
+            is_array = False
+        if not is_array:
+            positions = LatLonArray.from_latlons(positions)
+        self.positions = positions
+        self.ellipse = ellipse
+        self.backend = get_default_backend() if backend is None else backend
+        self.leaf_size = int(leaf_size)
+        self._build()
+
+    def _build(self):
+        """
+        Build the k-d tree. The positions are reordered so that each node covers a contiguous
+        range [start, end) of self._points
+        """
+        points = _unit_vectors(self.positions.lat, self.positions.lon)
+        n_points = len(points)
+        order = np.arange(n_points)
+        starts, ends, lefts, rights = [0], [n_points], [-1], [-1]
+        stack = [0] if n_points > self.leaf_size else []
+        while stack:
+            node = stack.pop()
+            start, end = starts[node], ends[node]
+            node_points = points[order[start:end]]
+            spread = node_points.max(axis=0) - node_points.min(axis=0)
+            dim = int(np.argmax(spread))
+            mid = (start + end) // 2
+            split = np.argpartition(node_points[:, dim], mid - start)
+            order[start:end] = order[start:end][split]
+            for child_start, child_end in ((start, mid), (mid, end)):
+                starts.append(child_start)
+                ends.append(child_end)
+                lefts.append(-1)
+                rights.append(-1)
+                if child_end - child_start > self.leaf_size:
+                    stack.append(len(starts) - 1)
+            lefts[node], rights[node] = len(starts) - 2, len(starts) - 1
+
+        self._order = order
+        self._points = np.ascontiguousarray(points[order])
+        self._start = np.array(starts, dtype=np.int64)
+        self._end = np.array(ends, dtype=np.int64)
+        self._left = np.array(lefts, dtype=np.int64)
+        self._right = np.array(rights, dtype=np.int64)
+        self._compute_bounds()
+
+    def _compute_bounds(self):
+        """
+        Compute the bounding box of the unit vectors of each node
+        """
+        n_nodes = len(self._start)
+        self._lower = np.empty((n_nodes, 3))
+        self._upper = np.empty((n_nodes, 3))
+        for node in range(n_nodes):
+            node_points = self._points[self._start[node]:self._end[node]]
+            if len(node_points):
+                self._lower[node] = node_points.min(axis=0)
+                self._upper[node] = node_points.max(axis=0)
+            else:
+                self._lower[node] = np.inf
+                self._upper[node] = -np.inf
+        # Plain lists are faster than array indexing during the tree traversal
+        self._node_lists = (self._start.tolist(), self._end.tolist(), self._left.tolist(),
+                            self._right.tolist())
+
+    def _box_distance2(self, nodes, point):
+        """
+        Squared distance between a point and the bounding boxes of the nodes
+        """
+        gap = np.maximum(np.maximum(self._lower[nodes] - point, point - self._upper[nodes]), 0.)
+        return (gap * gap).sum(axis=1)
+
+    def _chord_nearest(self, point, k):
+        """
+        Return the indices (in tree order) of the k positions with the smallest chord distance
+        """
+        starts, ends, lefts, rights = self._node_lists
+        best_d2 = np.empty(0)
+        best_index = np.empty(0, dtype=np.int64)
+        heap = [(0., 0)]
+        while heap:
+            bound, node = heapq.heappop(heap)
+            if len(best_d2) == k and bound > best_d2.max():
+                break
+            left = lefts[node]
+            if left < 0:
+                start, end = starts[node], ends[node]
+                diff = self._points[start:end] - point
+                d2 = np.einsum("ij,ij->i", diff, diff)
+                best_d2 = np.concatenate((best_d2, d2))
+                best_index = np.concatenate((best_index, np.arange(start, end)))
+                if len(best_d2) > k:
+                    keep = np.argpartition(best_d2, k - 1)[:k]
+                    best_d2, best_index = best_d2[keep], best_index[keep]
+            else:
+                children = [left, rights[node]]
+                for child, child_bound in zip(children, self._box_distance2(children, point)):
+                    heapq.heappush(heap, (float(child_bound), child))
+        return best_index
+
+    def _chord_within(self, point, chord):
+        """
+        Return the indices (in tree order) of all positions within a chord distance
+        """
+        starts, ends, lefts, rights = self._node_lists
+        chord2 = chord * chord
+        found = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            left = lefts[node]
+            start, end = starts[node], ends[node]
+            if left < 0:
+                diff = self._points[start:end] - point
+                d2 = np.einsum("ij,ij->i", diff, diff)
+                found.append(start + np.flatnonzero(d2 <= chord2))
+            else:
+                children = [left, rights[node]]
+                for child, child_bound in zip(children, self._box_distance2(children, point)):
+                    if child_bound <= chord2:
+                        stack.append(child)
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(found)
+
+    def _distances(self, lat, lon, tree_index):
+        """
+        Exact distances in km from (lat, lon) to the positions with the given tree indices
+        """
+        index = self._order[tree_index]
+        engine = get_engine(self.ellipse, self.backend)
+        distance = engine.inv(np.broadcast_to(lon, index.shape), np.broadcast_to(lat, index.shape),
+                              self.positions.lon[index], self.positions.lat[index])[2]
+        return np.asarray(distance, dtype=np.float64) / 1000.0
+
+    def _distances_many(self, lat, lon, tree_indices):
+        """
+        Exact distances in km from each (lat, lon) to the positions with the tree indices of the
+        same row, solved with one call to the geodesic engine
+        """
+        sizes = [len(tree_index) for tree_index in tree_indices]
+        if not sizes:
+            return []
+        distance = self._distances(np.repeat(lat, sizes), np.repeat(lon, sizes),
+                                   np.concatenate(tree_indices).astype(np.int64))
+        return np.split(distance, np.cumsum(sizes)[:-1])
+
+    def _angle_bound(self, distance):
+        """
+        Largest angle between the unit vectors of two positions at a geodesic distance in km
+        """
+        engine = get_engine(self.ellipse, self.backend)
+        smallest_radius = engine.a * (1. - max(engine.f, 0.)) ** 2 / 1000.0
+        # A small relative margin covers the rounding errors of the distance calculations
+        return distance / smallest_radius * (1. + 1e-9)
+
+    def _query_candidates(self, point_lat, point_lon, k):
+        """
+        Return the tree indices of the candidates for the k nearest positions of a point
+        """
+        point = _unit_vectors(point_lat, point_lon)[0]
+        nearest = self._chord_nearest(point, k)
+        distance = self._distances(point_lat, point_lon, nearest)
+        chord = _chord(self._angle_bound(distance.max()))
+        return point, self._chord_within(point, chord)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _coordinates(self, point):
+        """
+        Return the latitude and longitude in decimal degrees of a LatLon object
+        """
+        return float(point.lat.decimal_degree), float(point.lon.decimal_degree)
+
+    def nearest(self, point, k=1):
+        """
+        Find the k nearest positions of a point
+
+        Parameters
+        ----------
+        point : LatLon
+            The query position
+        k : int, optional, default=1
+            The number of neighbours
+
+        Returns
+        -------
+        tuple:
+            An array with the distances in km and an array with the indices of the neighbours in
+            the indexed collection, both sorted by distance
+        """
+        lat, lon = self._coordinates(point)
+        return self._nearest(lat, lon, k)
+
+    def _nearest(self, lat, lon, k):
+        k = min(int(k), len(self))
+        if k < 1:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        _, candidates = self._query_candidates(lat, lon, k)
+        distance = self._distances(lat, lon, candidates)
+        best = np.argsort(distance, kind="stable")[:k]
+        return distance[best], self._order[candidates[best]]
+
+    def nearest_many(self, points, k=1):
+        """
+        Find the k nearest positions of each of many points
+
+        The tree is searched point by point in Python. Only the exact distances of the candidates
+        of all points are computed with one call to the geodesic engine, which makes this about
+        15% faster than calling *nearest* for each point, not faster by orders of magnitude.
+
+        Parameters
+        ----------
+        points : LatLonArray or sequence of LatLon
+            The query positions
+        k : int, optional, default=1
+            The number of neighbours
+
+        Returns
+        -------
+        tuple:
+            An array of shape (len(points), k) with the distances in km and an array of the same
+            shape with the indices of the neighbours in the indexed collection, sorted by
+            distance in each row
+        """
+        try:
+            is_array = points.type() == "LatLonArray"
+        except AttributeError:
+            is_array = False
+        if not is_array:
+            points = LatLonArray.from_latlons(points)
+        k = min(int(k), len(self))
+        distances = np.empty((len(points), k))
+        indices = np.empty((len(points), k), dtype=np.int64)
+        if k < 1 or len(points) == 0:
+            return distances, indices
+        lat, lon = points.lat, points.lon
+        unit_points = _unit_vectors(lat, lon)
+        nearest = [self._chord_nearest(point, k) for point in unit_points]
+        bounds = [_chord(self._angle_bound(distance.max()))
+                  for distance in self._distances_many(lat, lon, nearest)]
+        candidates = [self._chord_within(point, bound) for point, bound in zip(unit_points, bounds)]
+        for row, (tree_index, distance) in enumerate(
+                zip(candidates, self._distances_many(lat, lon, candidates))):
+            best = np.argsort(distance, kind="stable")[:k]
+            distances[row], indices[row] = distance[best], self._order[tree_index[best]]
+        return distances, indices
+
+    def within_distance(self, point, radius):
+        """
+        Find all positions within a distance of a point
+
+        Parameters
+        ----------
+        point : LatLon
+            The query position
+        radius : float
+            The search radius in km
+
+        Returns
+        -------
+        tuple:
+            An array with the distances in km and an array with the indices of the positions in
+            the indexed collection, both sorted by distance
+        """
+        lat, lon = self._coordinates(point)
+        unit_point = _unit_vectors(lat, lon)[0]
+        candidates = self._chord_within(unit_point, _chord(self._angle_bound(radius)))
+        distance = self._distances(lat, lon, candidates)
+        inside = np.flatnonzero(distance <= radius)
+        order = inside[np.argsort(distance[inside], kind="stable")]
+        return distance[order], self._order[candidates[order]]
+
+    def within_distance_many(self, points, radius):
+        """
+        Find all positions within a distance of each of many points
+
+        Like *nearest_many*, the tree is searched point by point in Python and only the exact
+        distances of all candidates are computed with one call to the geodesic engine, so this is
+        only somewhat faster than calling *within_distance* for each point.
+
+        Parameters
+        ----------
+        points : LatLonArray or sequence of LatLon
+            The query positions
+        radius : float or array_like
+            The search radius in km, either one for all points or one per point
+
+        Returns
+        -------
+        list of tuple:
+            For each point the distances and indices as returned by *within_distance*
+        """
+        try:
+            is_array = points.type() == "LatLonArray"
+        except AttributeError:
+            is_array = False
+        if not is_array:
+            points = LatLonArray.from_latlons(points)
+        radius = np.broadcast_to(np.asarray(radius, dtype=np.float64), (len(points),))
+        lat, lon = points.lat, points.lon
+        candidates = [self._chord_within(point, _chord(self._angle_bound(point_radius)))
+                      for point, point_radius in zip(_unit_vectors(lat, lon), radius.tolist())]
+        results = []
+        for tree_index, distance, point_radius in zip(
+                candidates, self._distances_many(lat, lon, candidates), radius.tolist()):
+            inside = np.flatnonzero(distance <= point_radius)
+            order = inside[np.argsort(distance[inside], kind="stable")]
+            results.append((distance[order], self._order[tree_index[order]]))
+        return results
+
+    def _box_outside_halfspace(self, nodes, normal):
+        """
+        Return True for the nodes of which the bounding box is entirely on the negative side of
+        the plane through the origin with the given normal
+        """
+        highest = np.maximum(self._lower[nodes] * normal, self._upper[nodes] * normal).sum(axis=1)
+        return highest < -1e-12
+
+    def _box_inside_halfspace(self, nodes, normal):
+        """
+        Return True for the nodes of which the bounding box is entirely on the positive side of
+        the plane through the origin with the given normal
+        """
+        lowest = np.minimum(self._lower[nodes] * normal, self._upper[nodes] * normal).sum(axis=1)
+        return lowest > 1e-12
+
+    def within_box(self, south, west, north, east):
+        """
+        Find all positions inside a latitude/longitude bounding box
+
+        Parameters
+        ----------
+        south : float
+            Southern boundary in decimal degrees
+        west : float
+            Western boundary in decimal degrees
+        north : float
+            Northern boundary in decimal degrees
+        east : float
+            Eastern boundary in decimal degrees. If east is smaller than west, the box crosses
+            the antimeridian, e.g. west=170 and east=-170 gives a box 20 degrees wide. Use
+            west=-180 and east=180 for all longitudes.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The sorted indices of the positions in the indexed collection which are inside the
+            box, boundaries included
+        """
+        if south > north:
+            raise ValueError("south ({}) must not be larger than north ({})".format(south, north))
+        width = east - west
+        if width < 0:
+            width += 360.
+        all_longitudes = width >= 360.
+        z_lower, z_upper = np.sin(np.radians(south)), np.sin(np.radians(north))
+        west_normal, east_normal = _meridian_normal(west), -_meridian_normal(east)
+        starts, ends, lefts, rights = self._node_lists
+        found = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            left = lefts[node]
+            if left < 0:
+                index = self._order[starts[node]:ends[node]]
+                lat, lon = self.positions.lat[index], self.positions.lon[index]
+                inside = (lat >= south) & (lat <= north)
+                if not all_longitudes:
+                    inside &= _longitude_offset(lon, west) <= width
+                found.append(index[inside])
+                continue
+            children = np.array([left, rights[node]])
+            # Prune on the latitude band, which is a band of z values
+            keep = ((self._upper[children, 2] >= z_lower - 1e-12) &
+                    (self._lower[children, 2] <= z_upper + 1e-12))
+            if all_longitudes:
+                stack.extend(children[keep].tolist())
+                continue
+            if width <= 180.:
+                # The longitudes form a wedge: east of the west meridian and west of the east one
+                keep &= ~self._box_outside_halfspace(children, west_normal)
+                keep &= ~self._box_outside_halfspace(children, east_normal)
+            else:
+                # The complement of the longitudes is a wedge smaller than 180 degrees
+                keep &= ~(self._box_inside_halfspace(children, -east_normal) &
+                          self._box_inside_halfspace(children, -west_normal))
+            stack.extend(children[keep].tolist())
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(found))
+
+    def save(self, file):
+        """
+        Store the index in a .npz file
+
+        Parameters
+        ----------
+        file : str or file object
+            The file in which the index is stored
+        """
+        if isinstance(self.ellipse, str):
+            ellipse = np.array(self.ellipse)
+        else:
+            ellipse = np.asarray(self.ellipse, dtype=np.float64)
+        np.savez(file, lat=self.positions.lat, lon=self.positions.lon, order=self._order,
+                 points=self._points, start=self._start, end=self._end, left=self._left,
+                 right=self._right, lower=self._lower, upper=self._upper,
+                 ellipse=ellipse, backend=np.array(self.backend),
+                 leaf_size=np.array(self.leaf_size))
+
+    @classmethod
+    def load(cls, file):
+        """
+        Load an index stored with *save* without rebuilding the tree
+
+        Parameters
+        ----------
+        file : str or file object
+            The file in which the index is stored
+
+        Returns
+        -------
+        SpatialIndex:
+            The stored index
+        """
+        with np.load(file, allow_pickle=False) as data:
+            index = cls.__new__(cls)
+            index.positions = LatLonArray(data["lat"], data["lon"])
+            ellipse = data["ellipse"]
+            index.ellipse = str(ellipse) if ellipse.dtype.kind == "U" else tuple(ellipse.tolist())
+            index.backend = str(data["backend"])
+            index.leaf_size = int(data["leaf_size"])
+            index._order = data["order"]
+            index._points = data["points"]
+            index._start = data["start"]
+            index._end = data["end"]
+            index._left = data["left"]
+            index._right = data["right"]
+            index._lower = data["lower"]
+            index._upper = data["upper"]
+        index._node_lists = (index._start.tolist(), index._end.tolist(), index._left.tolist(),
+                             index._right.tolist())
+        return index
+
+    def __repr__(self):
+        return "SpatialIndex(n=%d, ellipse=%s)" % (len(self), self.ellipse)
+
+    @staticmethod
+    def type():
+        """
+        Identifies the object type
+        """
+        return "SpatialIndex"
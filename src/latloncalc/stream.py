@@ -0,0 +1,224 @@
+"""
+Asyncio pipeline for live position feeds.
+
+A *FeedTracker* consumes an async iterator of (object_id, LatLon) messages and yields a
+*TrackUpdate* per message with the distance and heading of the leg from the previous position of
+the same object, and the cumulative distance of the object. Messages are collected in micro
+batches: a batch is closed when window seconds have passed since its first message, when it holds
+max_batch messages or when the feed ends. All legs of a batch are solved with one vectorized call
+to the geodesic engine, which runs in an executor so the event loop is not blocked.
+
+Examples
+--------
+>>> from latloncalc.latlon import LatLon
+>>> async def feed():
+...     for lat in (0., 0.1, 0.2):
+...         yield "ship", LatLon(lat, 5.)
+>>> async def main():
+...     return [round(update.cumulative_distance, 3) async for update in track_feed(feed())]
+>>> asyncio.run(main())
+[0.0, 11.057, 22.115]
+"""
+
+import asyncio
+import collections
+
+import numpy as np
+
+from latloncalc.geodesic import get_engine
+
+TrackUpdate = collections.namedtuple("TrackUpdate", ["object_id", "position", "leg_distance",
+                                                     "heading_initial", "cumulative_distance",
+                                                     "n_fixes"])
+TrackUpdate.__doc__ = """\
+Result of one message of a position feed
+
+Attributes
+----------
+object_id : hashable
+    Identifier of the object as given in the feed
+position : LatLon
+    The position as given in the feed
+leg_distance : float
+    Distance in km from the previous position of the object, 0 for its first position
+heading_initial : float
+    Initial heading in degrees from the previous position of the object, NaN for its first
+    position and for legs of zero length
+cumulative_distance : float
+    Sum of the leg distances of the object in km
+n_fixes : int
+    Number of positions of the object received so far, including this one
+"""
+
+
+class FeedTracker:
+    """
+    Object keeping the last position and cumulative distance of every object of a position feed
+
+    Parameters
+    ----------
+    window : float, optional, default=0.05
+        Maximum time in seconds between the first message of a micro batch and its processing
+    max_batch : int, optional, default=10000
+        Maximum number of messages of a micro batch. The feed is not read further while a full
+        batch is waiting to be processed.
+    ellipse : str or tuple, optional, default="WGS84"
+        Ellipsoid name or (a, f) tuple passed to the geodesic engine
+    backend : str, optional
+        Geodesic backend, see *latloncalc.geodesic.get_engine*
+    executor : concurrent.futures.Executor, optional
+        Executor in which batches are solved. Defaults to the default executor of the event loop.
+
+    Notes
+    -----
+    The state of a tracker must only be updated by one feed at a time.
+    """
+
+    def __init__(self, window=0.05, max_batch=10000, ellipse="WGS84", backend=None,
+                 executor=None):
+        """
+        Create the FeedTracker object
+        """
+        if window < 0:
+            raise ValueError("window must not be negative, got {}".format(window))
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1, got {}".format(max_batch))
+        self.window = window
+        self.max_batch = int(max_batch)
+        self.ellipse = ellipse
+        self.backend = backend
+        self.executor = executor
+        self._last = {}  # object_id -> (lat, lon, cumulative_distance, n_fixes)
+
+    def reset(self):
+        """
+        Forget the positions and distances of all objects
+        """
+        self._last.clear()
+
+    def update(self, messages):
+        """
+        Process a batch of messages synchronously
+
+        Parameters
+        ----------
+        messages : sequence of tuple
+            Messages (object_id, LatLon) in the order in which they were received. An object may
+            occur more than once.
+
+        Returns
+        -------
+        list of TrackUpdate:
+            One update per message, in the order of the messages
+        """
+        lat = [position.lat.decimal_degree for _, position in messages]
+        lon = [position.lon.decimal_degree for _, position in messages]
+        # The start of each leg is the previous position of the object, in this batch or before
+        previous = {}
+        legs, start_lat, start_lon = [], [], []
+        for i, (object_id, _) in enumerate(messages):
+            start = previous.get(object_id) or self._last.get(object_id)
+            if start is not None:
+                legs.append(i)
+                start_lat.append(start[0])
+                start_lon.append(start[1])
+            previous[object_id] = (lat[i], lon[i])
+        leg_distance = np.zeros(len(messages))
+        heading_initial = np.full(len(messages), np.nan)
+        if legs:
+            engine = get_engine(self.ellipse, self.backend)
+            heading, _, distance = engine.inv(np.array(start_lon), np.array(start_lat),
+                                              np.take(lon, legs), np.take(lat, legs))
+            distance = np.asarray(distance) / 1000.0
+            leg_distance[legs] = distance
+            heading_initial[legs] = np.where(distance > 0, heading, np.nan)
+
+        updates = []
+        for i, (object_id, position), leg, heading in zip(
+                range(len(messages)), messages, leg_distance.tolist(), heading_initial.tolist()):
+            _, _, cumulative_distance, n_fixes = self._last.get(object_id, (0., 0., 0., 0))
+            cumulative_distance += leg
+            self._last[object_id] = (lat[i], lon[i], cumulative_distance, n_fixes + 1)
+            updates.append(TrackUpdate(object_id, position, leg, heading, cumulative_distance,
+                                       n_fixes + 1))
+        return updates
+
+    async def stream(self, feed):
+        """
+        Process a live feed in micro batches
+
+        Parameters
+        ----------
+        feed : async iterable
+            Yields messages (object_id, LatLon)
+
+        Yields
+        ------
+        TrackUpdate:
+            One update per message, in the order of the messages
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.max_batch)
+        end_of_feed = object()
+
+        async def read_feed():
+            try:
+                async for message in feed:
+                    await queue.put(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await queue.put(end_of_feed)
+                raise
+            await queue.put(end_of_feed)
+
+        reader = asyncio.ensure_future(read_feed())
+        try:
+            finished = False
+            while not finished:
+                message = await queue.get()
+                if message is end_of_feed:
+                    break
+                batch = [message]
+                deadline = loop.time() + self.window
+                while len(batch) < self.max_batch:
+                    if queue.empty():
+                        timeout = deadline - loop.time()
+                        if timeout <= 0:
+                            break
+                        try:
+                            message = await asyncio.wait_for(queue.get(), timeout)
+                        except asyncio.TimeoutError:
+                            break
+                    else:
+                        message = queue.get_nowait()
+                    if message is end_of_feed:
+                        finished = True
+                        break
+                    batch.append(message)
+                for update in await loop.run_in_executor(self.executor, self.update, batch):
+                    yield update
+            await reader  # Raise the exception of the feed, if any
+        finally:
+            reader.cancel()
+
+    def __repr__(self):
+        return "FeedTracker(window={}, max_batch={}, ellipse={!r}, backend={!r})".format(
+            self.window, self.max_batch, self.ellipse, self.backend)
+
+    @staticmethod
+    def type():
+        """
+        Identifies the object type
+        """
+        return "FeedTracker"
+
+
+async def track_feed(feed, **kwargs):
+    """
+    Process a live feed of messages (object_id, LatLon) with a new FeedTracker
+
+    The keyword arguments are passed to FeedTracker. Yields a TrackUpdate per message.
+    """
+    async for update in FeedTracker(**kwargs).stream(feed):
+        yield update
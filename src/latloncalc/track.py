@@ -0,0 +1,227 @@
+"""
+Tracks (polylines) of lat/lon positions.
+
+A *Track* holds the positions of a track in a *LatLonArray*. The distances and headings of all
+legs are computed with one vectorized inverse geodesic call and cached, and positions along the
+track are computed with one vectorized forward geodesic call, so tracks of millions of points can
+be measured and resampled without creating a *LatLon* or *GeoVector* per leg.
+"""
+
+import numpy as np
+
+from latloncalc.arrays import LatLonArray
+from latloncalc.geodesic import get_engine
+from latloncalc.simplify import douglas_peucker
+
+
+class Track:
+    """
+    Object representing a track through a sequence of lat/lon positions
+
+    Parameters
+    ----------
+    lat : array_like
+        Latitudes of the positions in decimal degrees
+    lon : array_like
+        Longitudes of the positions in decimal degrees
+    ellipse : str or tuple, optional, default="WGS84"
+        Ellipsoid name or (a, f) tuple passed to the geodesic engine
+    backend : str, optional
+        Geodesic backend, see *latloncalc.geodesic.get_engine*
+    name : str, optional
+        Name of the track
+
+    Notes
+    -----
+    The legs of the track follow the geodesics between consecutive positions. All distances are
+    in km and all headings in degrees.
+
+    Examples
+    --------
+    >>> track = Track([5.8833, 21.3, 21.3], [-162.0833, -157.8167, -156.0])
+    >>> track.leg_distances()
+    array([1766.69130376,  188.50198638])
+    >>> track.length
+    1955.1932901325563
+    """
+
+    def __init__(self, lat, lon, ellipse="WGS84", backend=None, name=None):
+        """
+        Create a Track object
+        """
+        self.positions = LatLonArray(lat, lon)
+        self.ellipse = ellipse
+        self.backend = backend
+        self.name = name
+        self._legs = None
+        self._cumulative_distance = None
+
+    @classmethod
+    def from_latlons(cls, latlons, **kwargs):
+        """
+        Create a Track from a sequence of LatLon objects (or a LatLonArray). Keyword arguments are
+        passed to the Track constructor.
+        """
+        if isinstance(latlons, LatLonArray):
+            return cls(latlons.lat, latlons.lon, **kwargs)
+        positions = LatLonArray.from_latlons(latlons)
+        return cls(positions.lat, positions.lon, **kwargs)
+
+    @property
+    def lat(self):
+        return self.positions.lat
+
+    @property
+    def lon(self):
+        return self.positions.lon
+
+    def _engine(self):
+        return get_engine(self.ellipse, self.backend)
+
+    def _get_legs(self):
+        """
+        Solve the inverse geodesic problem for all legs at once and cache the result
+        """
+        if self._legs is None:
+            lat, lon = self.positions.lat, self.positions.lon
+            heading, _, distance = self._engine().inv(lon[:-1], lat[:-1], lon[1:], lat[1:])
+            self._legs = (np.asarray(heading, dtype=np.float64).reshape(-1),
+                          np.asarray(distance, dtype=np.float64).reshape(-1) / 1000.0)
+        return self._legs
+
+    def leg_headings(self):
+        """
+        Returns the initial headings of all legs in degrees as an array of length len(self) - 1
+        """
+        return self._get_legs()[0]
+
+    def leg_distances(self):
+        """
+        Returns the distances of all legs in km as an array of length len(self) - 1
+        """
+        return self._get_legs()[1]
+
+    def cumulative_distance(self):
+        """
+        Returns the distance in km along the track from the first position to each position, as
+        an array of length len(self) starting with 0
+        """
+        if self._cumulative_distance is None:
+            cumulative_distance = np.zeros(len(self), dtype=np.float64)
+            np.cumsum(self.leg_distances(), out=cumulative_distance[1:])
+            self._cumulative_distance = cumulative_distance
+        return self._cumulative_distance
+
+    @property
+    def length(self):
+        """
+        Total length of the track in km
+        """
+        if len(self) < 2:
+            return 0.0
+        return float(self.cumulative_distance()[-1])
+
+    def positions_at(self, distance):
+        """
+        Return the positions at the given distances along the track
+
+        Parameters
+        ----------
+        distance : array_like
+            Distances in km from the first position along the track. Distances are clipped to
+            the range 0 to the length of the track.
+
+        Returns
+        -------
+        LatLonArray:
+            The positions, computed with one vectorized forward geodesic call
+        """
+        if len(self) == 0:
+            raise ValueError("Can not compute positions along an empty track")
+        distance = np.clip(np.asarray(distance, dtype=np.float64).reshape(-1), 0, self.length)
+        if len(self) == 1:
+            return LatLonArray(np.full(distance.shape, self.lat[0]),
+                               np.full(distance.shape, self.lon[0]))
+        cumulative_distance = self.cumulative_distance()
+        leg = np.searchsorted(cumulative_distance, distance, side="right") - 1
+        leg = np.clip(leg, 0, len(self) - 2)
+        remaining = (distance - cumulative_distance[leg]) * 1000  # Convert km to meters
+        lon, lat, _ = self._engine().fwd(self.lon[leg], self.lat[leg],
+                                         self.leg_headings()[leg], remaining)
+        lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+        # Positions at the end of the track are exact, not the result of a forward solve
+        at_end = distance >= self.length
+        lat[at_end], lon[at_end] = self.lat[-1], self.lon[-1]
+        return LatLonArray(lat, lon)
+
+    def resample(self, spacing):
+        """
+        Resample the track at a fixed distance spacing
+
+        Parameters
+        ----------
+        spacing : float
+            Distance in km between consecutive positions along the track
+
+        Returns
+        -------
+        Track:
+            A new track with positions at 0, spacing, 2 * spacing, ... along the track, followed by
+            the last position of the track
+        """
+        if spacing <= 0:
+            raise ValueError("spacing must be positive, got {}".format(spacing))
+        distance = np.arange(0.0, self.length, spacing)
+        if len(self) > 1:
+            distance = np.append(distance, self.length)
+        positions = self.positions_at(distance)
+        return Track(positions.lat, positions.lon, ellipse=self.ellipse, backend=self.backend,
+                     name=self.name)
+
+    def simplify(self, tolerance):
+        """
+        Simplify the track with the Douglas-Peucker algorithm
+
+        Parameters
+        ----------
+        tolerance : float
+            Maximum geodesic cross-track distance in km of the removed positions to the
+            simplified track
+
+        Returns
+        -------
+        Track:
+            A new track with the kept positions. See *latloncalc.simplify* for details and for the
+            Visvalingam-Whyatt algorithm.
+        """
+        return self[douglas_peucker(self.lat, self.lon, tolerance, ellipse=self.ellipse,
+                                    backend=self.backend)]
+
+    def to_latlons(self):
+        """
+        Convert to a list of LatLon objects
+        """
+        return self.positions.to_latlons()
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return self.positions[item]
+        positions = self.positions[item]
+        return Track(positions.lat, positions.lon, ellipse=self.ellipse, backend=self.backend,
+                     name=self.name)
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __repr__(self):
+        return "Track(n=%d, length=%.3f km)" % (len(self), self.length)
+
+    @staticmethod
+    def type():
+        """
+        Identifies the object type
+        """
+        return "Track"
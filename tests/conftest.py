@@ -1,10 +1,30 @@
 """
-    Dummy conftest.py for latlon3.
+    Fixtures shared by the tests of latloncalc.
 
-    If you don't know what this is for, just leave it empty.
     Read more about conftest.py under:
     - https://docs.pytest.org/en/stable/fixture.html
     - https://docs.pytest.org/en/stable/writing_plugins.html
 """
 
-# import pytest
+import numpy as np
+import pytest
+
+from latloncalc.arrays import LatLonArray
+
+
+@pytest.fixture
+def random_positions():
+    """
+    Factory of reproducible random positions
+
+    random_positions(n, seed) returns a LatLonArray with n positions between the latitudes -80 and
+    80. With sphere=True the positions are spread uniformly over the whole sphere.
+    """
+    def make(n, seed, sphere=False):
+        rng = np.random.default_rng(seed)
+        if sphere:
+            lat = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))
+        else:
+            lat = rng.uniform(-80, 80, n)
+        return LatLonArray(lat, rng.uniform(-180, 180, n))
+    return make
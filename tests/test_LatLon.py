@@ -9,11 +9,15 @@ Created on Sep 2, 2014
 update to Python 3.9: E. van Vliet (July, 2022)
 """
 
+import pickle
+
 import pyproj
+import pytest
 from numpy import (exp, angle, deg2rad, rad2deg)
 from numpy.testing import (assert_almost_equal, assert_equal)
 
-from latloncalc.latlon import (LatLon, string2latlon, Latitude, Longitude)
+from latloncalc.latlon import (LatLon, string2latlon, Latitude, Longitude, FrozenLatLon,
+                               FrozenLatitude, FrozenLongitude)
 
 
 def test_latlon_tostring():
@@ -166,6 +170,66 @@ def test_latlon_project():
         y) == utm_y  # Error in computing projected coordinates for Palmyra Atoll'
 
 
+def test_latlon_slots():
+    """
+    Test the compact representation of coordinates with lazily calculated components
+    """
+    palmyra = LatLon(5.8833, -162.0833)
+    assert not hasattr(palmyra, "__dict__") and not hasattr(palmyra.lat, "__dict__")
+    assert palmyra.lat._components is None  # Nothing calculated before first access
+    assert_equal((palmyra.lat.degree, palmyra.lat.minute), (5., 52.))
+    assert_almost_equal(palmyra.lat.second, 59.88)
+    assert_equal((palmyra.lon.degree, palmyra.lon.minute), (-162., -4.))
+    longitude = Longitude(200, 30)  # Longitudes are reported in the range -180 to 180
+    assert_equal((longitude.decimal_degree, longitude.degree, longitude.minute),
+                 (-159.5, -159., -30.))
+    latitude = Latitude(5, 30)
+    latitude.set_degree(6)  # Components are only made consistent by _update
+    assert_equal((latitude.decimal_degree, latitude.degree), (5.5, 6.))
+    latitude._update()
+    assert_equal((latitude.decimal_degree, latitude.minute, latitude.decimal_minute),
+                 (6.5, 30., 30.))
+    latitude.set_hemisphere("S")
+    assert_equal((latitude.decimal_degree, latitude.degree, latitude.minute), (-6.5, -6., -30.))
+
+
+def test_latlon_frozen():
+    """
+    Test immutable and hashable positions
+    """
+    palmyra = LatLon(5.8833, -162.0833)
+    frozen = palmyra.frozen()
+    assert frozen == palmyra and palmyra == frozen
+    assert frozen.to_string('d% %m% %S% %H') == palmyra.to_string('d% %m% %S% %H')
+    assert frozen.distance(LatLon(21.3, -157.8167)) == palmyra.distance(LatLon(21.3, -157.8167))
+    assert {frozen: "palmyra"}[FrozenLatLon(5.8833, 197.9167)] == "palmyra"
+    assert pickle.loads(pickle.dumps(frozen)) == frozen
+    for change in (lambda: setattr(frozen, "lat", 0.), lambda: setattr(frozen.lat, "degree", 0.),
+                   lambda: frozen.lat.set_hemisphere("S")):
+        with pytest.raises(AttributeError):
+            change()
+
+    # Rich comparisons between coordinates of the same kind only
+    assert FrozenLatitude(1) < Latitude(2).frozen() and FrozenLatitude(2) >= FrozenLatitude(2)
+    # Mutable coordinates hash by identity, so they only compare equal through their frozen copy
+    assert FrozenLatitude(1) != Latitude(1) and FrozenLatitude(1) == Latitude(1).frozen()
+    assert len({FrozenLatitude(1), Latitude(1).frozen(), Longitude(1).frozen()}) == 2
+    with pytest.raises(TypeError):
+        FrozenLatitude(1) < Latitude(2)
+    assert FrozenLatitude(1) != FrozenLongitude(1)
+    with pytest.raises(TypeError):
+        FrozenLatitude(1) < FrozenLongitude(2)
+    assert sorted([FrozenLatLon(2, 1), FrozenLatLon(1, 3), FrozenLatLon(1, 2)]) == [
+        FrozenLatLon(1, 2), FrozenLatLon(1, 3), FrozenLatLon(2, 1)]
+
+    # Quantization lets nearly identical positions collide on purpose
+    assert FrozenLatLon(5.88330001, -162.0833) != frozen
+    quantized = FrozenLatLon(5.88330001, -162.08330004, quantum=1e-7)
+    assert quantized == palmyra.frozen(quantum=1e-7) == palmyra
+    assert len({quantized, palmyra.frozen(quantum=1e-7)}) == 1
+    assert FrozenLongitude(179.99999999, quantum=1e-7).decimal_degree == -180.
+
+
 def main():
     test_latlon_tostring()
     test_latlon_fromstring()
@@ -174,6 +238,8 @@ def main():
     test_latlon_distance()
     test_latlon_offset()
     test_latlon_project()
+    test_latlon_slots()
+    test_latlon_frozen()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+"""
+Test routines for the track accumulators in package latloncalc
+Designed for use with pytest
+"""
+
+import math
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+from latloncalc.accumulator import FleetAccumulator, TrackAccumulator
+from latloncalc.latlon import LatLon
+
+
+def test_track_accumulator():
+    """
+    Test the statistics of fixes and dead reckoning steps against LatLon arithmetic
+    """
+    ship = TrackAccumulator(name="ship")
+    assert math.isnan(ship.mean_speed)
+    with pytest.raises(ValueError):
+        ship.add_step(90., 1.)
+    start, end = LatLon(5.8833, -162.0833), LatLon(21.3, -157.8167)
+    ship.add_latlon(start, time=0.)
+    ship.add_latlon(start, time=60.)  # Zero length legs keep the last heading
+    assert ship.total_distance == 0. and math.isnan(ship.last_heading)
+    ship.add_fix(21.3, -157.8167, time=3600.)
+    assert_allclose(ship.total_distance, start.distance(end))
+    assert_allclose(ship.last_heading, start.heading_initial(end))
+    ship.add_step(180., 100., time=7200.)
+    assert_allclose(ship.total_distance, start.distance(end) + 100.)
+    assert ship.to_latlon().almost_equal(end.offset(180., 100.))
+    assert ship.last_heading == 180. and ship.n_fixes == 4
+    assert_allclose(ship.mean_speed, ship.total_distance / 2.)
+    assert_allclose(ship.bounding_box, (5.8833, -162.0833, 21.3, -157.8167))
+    ship.reset()
+    assert ship.n_fixes == 0 and ship.total_distance == 0.
+
+
+def test_fleet_accumulator():
+    """
+    Test the fleet accumulator against a TrackAccumulator per object, with repeated objects
+    """
+    rng = np.random.default_rng(3)
+    n_objects, n_updates = 5, 40
+    fleet = FleetAccumulator(n_objects)
+    ships = [TrackAccumulator() for _ in range(n_objects)]
+    index = np.arange(n_objects)
+    lat, lon = rng.uniform(-60, 60, n_objects), rng.uniform(-180, 180, n_objects)
+    fleet.add_fixes(index, lat, lon, time=0.)
+    for i in index:
+        ships[i].add_fix(lat[i], lon[i], time=0.)
+    index = rng.integers(0, n_objects, n_updates)
+    heading, distance = rng.uniform(0, 360, n_updates), rng.uniform(0, 50, n_updates)
+    time = np.arange(1., n_updates + 1) * 60
+    fleet.add_steps(index[:20], heading[:20], distance[:20], time=time[:20])
+    fleet.add_fixes(index[20:], lat[index[20:]], lon[index[20:]], time=time[20:])
+    for i, h, d, t in zip(index[:20], heading[:20], distance[:20], time[:20]):
+        ships[i].add_step(h, d, time=t)
+    for i, t in zip(index[20:], time[20:]):
+        ships[i].add_fix(lat[i], lon[i], time=t)
+    for name in ("lat", "lon", "total_distance", "last_heading", "n_fixes", "mean_speed"):
+        assert_allclose(getattr(fleet, name), [getattr(ship, name) for ship in ships],
+                        err_msg=name)
+    assert_allclose(np.transpose(fleet.bounding_box), [ship.bounding_box for ship in ships])
+    assert len(fleet.to_latlonarray()) == n_objects
+    with pytest.raises(ValueError):
+        FleetAccumulator(2).add_steps(0, 90., 1.)
+
+
+def test_zero_and_negative_steps():
+    """
+    Test that zero and negative steps count like the same movements reported as fixes
+    """
+    heading, distance = [90., 45., 180., 270.], [10., 0., -5., 2.5]
+    fleet = FleetAccumulator(1)
+    ship, reported = TrackAccumulator(), TrackAccumulator()
+    fleet.add_fixes(0, 5.8833, -162.0833)
+    ship.add_fix(5.8833, -162.0833)
+    reported.add_fix(5.8833, -162.0833)
+    fleet.add_steps([0] * 4, heading, distance)
+    for h, d in zip(heading, distance):
+        ship.add_step(h, d)
+        reported.add_fix(ship.lat, ship.lon)
+        if d < 0:
+            assert ship.last_heading == 0.
+    assert_allclose(fleet.total_distance, [ship.total_distance])
+    assert_allclose(ship.total_distance, 17.5)
+    assert_allclose(reported.total_distance, ship.total_distance)
+    assert_allclose(fleet.last_heading, [ship.last_heading])
+    assert_allclose([fleet.lat[0], fleet.lon[0]], [ship.lat, ship.lon])
@@ -0,0 +1,130 @@
+"""
+Test routines for class LatLonArray in package latloncalc
+Designed for use with pytest
+"""
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+
+import pytest
+
+from latloncalc.arrays import GeoVectorArray, LatLonArray, batch_offset
+from latloncalc.latlon import GeoVector, LatLon
+
+
+def _ports():
+    # locations: Palmyra Atoll, Honolulu, Washington DC and Lima
+    return [LatLon(5.8833, -162.0833), LatLon(21.3, -157.8167), LatLon(38.9, -77.0333),
+            LatLon(-12.05, -77.0333)]
+
+
+def test_latlonarray_roundtrip():
+    """
+    Test conversion of LatLonArray from and to lists of LatLon objects
+    """
+    ports = _ports()
+    array = LatLonArray.from_latlons(ports)
+    assert len(array) == 4
+    assert array.lat.dtype == np.float64 and array.lat.flags["C_CONTIGUOUS"]
+    assert_equal([str(p) for p in array.to_latlons()], [str(p) for p in ports])
+    assert str(array[1]) == str(ports[1])
+    assert len(array[1:3]) == 2
+    assert array == LatLonArray.from_latlons(ports) and array != array[:3]
+    assert array != None and not array == "ports"  # noqa: E711
+    assert array[:1] != ports[1] and not array[:1] == ports[1]
+    # Longitudes in the range 0 to 360 are reported in the range -180 to 180
+    assert_allclose(LatLonArray([0], [197.9167]).lon, [-162.0833])
+
+
+def test_latlonarray_distance_heading():
+    """
+    Test LatLonArray methods distance, heading_initial and heading_reverse against LatLon
+    """
+    ports = _ports()
+    origin = ports[::-1]
+    array, other = LatLonArray.from_latlons(ports), LatLonArray.from_latlons(origin)
+    assert_allclose(array.distance(other), [p.distance(o) for p, o in zip(ports, origin)])
+    assert_allclose(array.heading_initial(other),
+                    [p.heading_initial(o) for p, o in zip(ports, origin)])
+    assert_allclose(array.heading_reverse(other),
+                    [p.heading_reverse(o) for p, o in zip(ports, origin)])
+    # A single LatLon is broadcast against the whole array
+    palmyra = ports[0]
+    assert_allclose(array.distance(palmyra, ellipse="sphere"),
+                    [p.distance(palmyra, ellipse="sphere") for p in ports])
+
+
+def test_latlonarray_sub():
+    """
+    Test LatLonArray subtraction returning a GeoVectorArray
+    """
+    ports = _ports()
+    array = LatLonArray.from_latlons(ports)
+    vectors = array - ports[0]
+    assert isinstance(vectors, GeoVectorArray)
+    for vector, port in zip(vectors.to_geovectors(), ports):
+        assert vector.almost_equals(port - ports[0])
+
+
+def test_geovectorarray():
+    """
+    Test vectorized GeoVectorArray arithmetic against GeoVector
+    """
+    rng = np.random.default_rng(4)
+    dx, dy = rng.normal(0, 10, (2, 100))
+    dx[:3], dy[3:6], dx[6], dy[6] = 0., 0., 0., 0.  # Vectors along the axes and without length
+    vectors = GeoVectorArray(dx, dy)
+    scalar_vectors = [GeoVector(x, y) for x, y in zip(dx.tolist(), dy.tolist())]
+    for vector, scalar_vector in zip(vectors, scalar_vectors):
+        assert vector.almost_equals(scalar_vector)
+    assert (vectors.magnitude >= 0).all()
+    assert vectors[6].heading == 0. and vectors[6].magnitude == 0.
+    assert vectors.sum().almost_equals(GeoVector(dx.sum(), dy.sum()))
+    assert_allclose(vectors.cumsum().dx, np.cumsum(dx))
+    assert vectors.almost_equals(GeoVectorArray.from_geovectors(scalar_vectors)).all()
+    assert (vectors + vectors).almost_equals(vectors * 2).all()
+    assert (vectors - vectors).almost_equals(GeoVector(0, 0)).all()
+    assert (-vectors + vectors[0]).almost_equals(GeoVectorArray(dx[0] - dx, dy[0] - dy)).all()
+    assert_allclose((vectors / 4).magnitude, vectors.magnitude / 4)
+    assert_equal((vectors * np.arange(100)).heading, vectors.heading)
+
+
+def test_latlonarray_offset():
+    """
+    Test offsetting all positions of a LatLonArray at once
+    """
+    ports = _ports()
+    array = LatLonArray.from_latlons(ports)
+    moved = array.offset([0., 90., 180., 270.], 100.)
+    for port, position, heading in zip(ports, moved, [0., 90., 180., 270.]):
+        assert position.almost_equal(port.offset(heading, 100.))
+    # Adding the vectors between the positions reconstructs the positions
+    origins = LatLonArray.from_latlons([ports[0]] * 4)
+    for port, position in zip(ports, origins + (array - origins)):
+        assert position.almost_equal(port)
+    for port, position in zip(ports, array + GeoVector(initial_heading=45., distance=10.)):
+        assert position.almost_equal(port + GeoVector(initial_heading=45., distance=10.))
+
+
+def test_batch_offset():
+    """
+    Test offsetting one or many origins by many headings and distances at once
+    """
+    ports = _ports()
+    headings, distances = np.meshgrid(np.arange(0., 360., 45.), [10., 500.])
+    rings, back_bearings = batch_offset(ports[0], headings, distances)
+    assert len(rings) == 16 and back_bearings.shape == (2, 8)
+    for position, heading, distance, back_bearing in zip(rings, headings.ravel(),
+                                                         distances.ravel(), back_bearings.ravel()):
+        assert position.almost_equal(ports[0].offset(heading, distance))
+        assert back_bearing == pytest.approx(ports[0].heading_reverse(position), abs=1e-6)
+
+    fans, back_bearings = batch_offset(ports, [0., 90., 180.], 100., outer=True)
+    assert len(fans) == 12 and back_bearings.shape == (4, 3)
+    assert fans[5].almost_equal(ports[1].offset(180., 100.))
+
+    moved, back_bearings = batch_offset(LatLonArray.from_latlons(ports), [0., 90., 180., 270.],
+                                        [1., 2., 3., 4.], ellipse="sphere")
+    assert moved[3].almost_equal(ports[3].offset(270., 4., ellipse="sphere"))
+    with pytest.raises(ValueError):
+        batch_offset(ports, [0., 90.], 1.)
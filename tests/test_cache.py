@@ -0,0 +1,144 @@
+"""
+Test routines for the inverse geodesic cache in package latloncalc
+Designed for use with pytest
+"""
+
+import concurrent.futures
+
+import numpy as np
+import pytest
+
+from latloncalc.cache import (InverseStore, clear_inverse_cache, disable_inverse_cache,
+                              disable_inverse_store, enable_inverse_cache, enable_inverse_store,
+                              get_inverse_cache, inverse_cache_info)
+from latloncalc.instrument import instrumented, snapshot
+from latloncalc.latlon import LatLon
+from latloncalc.matrix import distance_matrix
+
+PORTS = [LatLon(5.8833, -162.0833), LatLon(21.3, -157.8167), LatLon(-12.05, -77.0333)]
+
+
+@pytest.fixture
+def inverse_cache():
+    enable_inverse_cache(maxsize=2)
+    yield get_inverse_cache()
+    disable_inverse_cache()
+
+
+def test_inverse_cache(inverse_cache):
+    """
+    Test that distance and both headings share one cached inverse solve
+    """
+    palmyra, honolulu = LatLon(5.8833, -162.0833), LatLon(21.3, -157.8167)
+    disable_inverse_cache()
+    expected = palmyra._pyproj_inv(honolulu)
+    enable_inverse_cache(maxsize=2)
+    assert inverse_cache_info().currsize == 0
+    assert palmyra.distance(honolulu) == expected["distance"]
+    assert palmyra.heading_initial(honolulu) == expected["heading_initial"]
+    assert palmyra.heading_reverse(honolulu) == expected["heading_reverse"]
+    assert inverse_cache_info()[:3] == (2, 1, 0)
+    # Positions which only differ by floating point noise share their results
+    assert LatLon(5.8833 + 1e-12, -162.0833).distance(honolulu) == expected["distance"]
+    assert inverse_cache_info().hits == 3
+    # The ellipsoid is part of the key
+    assert palmyra.distance(honolulu, ellipse="sphere") != expected["distance"]
+    assert inverse_cache_info()[:3] == (3, 2, 0)
+
+
+def test_inverse_cache_eviction(inverse_cache):
+    """
+    Test that the least recently used results are evicted
+    """
+    palmyra, honolulu, lima = LatLon(5.8833, -162.0833), LatLon(21.3, -157.8167), LatLon(-12, -77)
+    palmyra.distance(honolulu)
+    palmyra.distance(lima)
+    palmyra.distance(honolulu)  # Now lima is the least recently used
+    honolulu.distance(lima)
+    assert inverse_cache_info() == (1, 3, 1, 2, 2)
+    palmyra.distance(honolulu)
+    palmyra.distance(lima)
+    assert inverse_cache_info()[:3] == (2, 4, 2)
+    clear_inverse_cache()
+    assert inverse_cache_info() == (0, 0, 0, 2, 0)
+    disable_inverse_cache()
+    assert inverse_cache_info() is None
+    with pytest.raises(ValueError):
+        enable_inverse_cache(maxsize=0)
+
+
+def _stored_distance(path, i, j):
+    """
+    Look up a distance in a read-only store, as done by a worker process
+    """
+    store = enable_inverse_store(path, readonly=True)
+    distance = PORTS[i].distance(PORTS[j])
+    disable_inverse_store()
+    return distance, store.info().hits
+
+
+def test_inverse_store(tmp_path):
+    """
+    Test warming a persistent store and reading it from other processes
+    """
+    path = tmp_path / "inverse.sqlite"
+    expected = {(i, j): p._pyproj_inv(q) for i, p in enumerate(PORTS) for j, q in enumerate(PORTS)}
+    store = InverseStore(path)
+    assert store.warm(PORTS, block_size=2) == 9 and len(store) == 9
+    store.close()
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+        for distance, hits in executor.map(_stored_distance, [path] * 2, [0, 1], [1, 2]):
+            assert hits == 1
+    assert distance == expected[1, 2]["distance"]
+
+    store = enable_inverse_store(path)
+    try:
+        enable_inverse_cache()
+        for (i, j), result in expected.items():
+            assert PORTS[i]._pyproj_inv(PORTS[j]) == result
+        assert store.info()[:2] == (9, 0)
+        assert PORTS[0].distance(PORTS[1], ellipse="sphere") != expected[0, 1]["distance"]
+        assert store.info()[:2] == (9, 1) and len(store) == 10
+        # Results of the in-memory cache are used before the store is consulted
+        assert PORTS[0].distance(PORTS[1]) == expected[0, 1]["distance"]
+        assert store.info()[:2] == (9, 1)
+        store.invalidate(ellipse="sphere")
+        assert len(store) == 9
+        store.invalidate(ellipse=(6378137.0, 1 / 298.257223563))  # WGS84
+        assert len(store) == 0
+    finally:
+        disable_inverse_cache()
+        disable_inverse_store()
+    with pytest.raises(ValueError):
+        InverseStore(path, quantum=1e-7)
+
+
+def test_inverse_store_from_matrix(tmp_path):
+    """
+    Test warming a persistent store from a precomputed distance matrix
+    """
+    expected = {(i, j): p._pyproj_inv(q) for i, p in enumerate(PORTS) for j, q in enumerate(PORTS)}
+    distances = distance_matrix(PORTS)
+    store = enable_inverse_store(tmp_path / "inverse.sqlite")
+    try:
+        # Without headings, only the headings are solved
+        assert store.warm_from_matrix(PORTS, None, distances, block_size=2) == 9
+        with instrumented():
+            for (i, j), result in expected.items():
+                assert PORTS[i].distance(PORTS[j]) == distances[i, j]
+                assert PORTS[i].heading_initial(PORTS[j]) == result["heading_initial"]
+                assert PORTS[i].heading_reverse(PORTS[j]) == result["heading_reverse"]
+        assert "_solve_inverse" not in snapshot() and store.info()[:2] == (27, 0)
+        # Given headings are stored, missing ones are solved
+        heading_initial, heading_reverse = np.full((3, 2), 1.), np.full((3, 2), 2.)
+        heading_initial[2, 1] = np.nan
+        store.warm_from_matrix(PORTS, PORTS[:2], distances[:, :2] + 1.,
+                               headings=(heading_initial, heading_reverse))
+        assert PORTS[0].distance(PORTS[1]) == distances[0, 1] + 1.
+        assert PORTS[0].heading_initial(PORTS[1]) == 1.
+        assert PORTS[2].heading_initial(PORTS[1]) == expected[2, 1]["heading_initial"]
+        with pytest.raises(ValueError):
+            store.warm_from_matrix(PORTS, PORTS[:2], distances)
+    finally:
+        disable_inverse_store()
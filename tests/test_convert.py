@@ -0,0 +1,77 @@
+"""
+Test routines for the streaming file converter in package latloncalc
+Designed for use with pytest
+"""
+
+import io
+
+import pytest
+
+from latloncalc.__main__ import main
+from latloncalc.convert import convert_file
+from latloncalc.latlon import string2latlon
+
+INPUT = ("name\tlat\tlon\n"
+         "palmyra\t5 52 59.88 N\t162 4 59.88 W\n"
+         "honolulu\t21 18 0 N\t157 49 0.12 W\n"
+         "lima\t12 3 0 S\t77 2 0 W\n")
+
+
+def _expected(output_format):
+    lines = ["name\tlat\tlon"]
+    for line in INPUT.splitlines()[1:]:
+        name, lat_str, lon_str = line.split("\t")
+        position = string2latlon(lat_str, lon_str, "d% %m% %S% %H")
+        lines.append("\t".join((name,) + position.to_string(output_format)))
+    return "\n".join(lines) + "\n"
+
+
+def test_convert_file():
+    """
+    Test converting the coordinate columns of a tab separated file in chunks
+    """
+    for chunk_size in (1, 2, 100):
+        output = io.StringIO()
+        n_rows = convert_file(io.StringIO(INPUT), output, "lat", "lon",
+                              input_format="d% %m% %S% %H", output_format="D", delimiter="\t",
+                              chunk_size=chunk_size)
+        assert n_rows == 3
+        assert output.getvalue() == _expected("D")
+
+
+def test_convert_file_workers():
+    """
+    Test that converting chunks in a process pool keeps the order of the rows
+    """
+    output = io.StringIO()
+    convert_file(io.StringIO(INPUT), output, 1, 2, input_format="d% %m% %S% %H",
+                 output_format="d%_%M", delimiter="\t", chunk_size=1, n_workers=2)
+    assert output.getvalue() == _expected("d%_%M")
+
+
+def test_convert_file_errors():
+    """
+    Test handling of rows which can not be parsed
+    """
+    data = INPUT + "unknown\t-\t-\n"
+    with pytest.raises(ValueError, match="line 5"):
+        convert_file(io.StringIO(data), io.StringIO(), "lat", "lon",
+                     input_format="d% %m% %S% %H", delimiter="\t")
+    output = io.StringIO()
+    convert_file(io.StringIO(data), output, "lat", "lon", input_format="d% %m% %S% %H",
+                 delimiter="\t", errors="keep")
+    assert output.getvalue() == _expected("D") + "unknown\t-\t-\n"
+
+
+def test_main(tmp_path):
+    """
+    Test the convert command of the command line interface
+    """
+    input_file, output_file = tmp_path / "in.tsv", tmp_path / "out.tsv"
+    input_file.write_text(INPUT)
+    assert main(["convert", str(input_file), str(output_file), "--lat-column", "lat",
+                 "--lon-column", "lon", "--input-format", "d% %m% %S% %H", "--delimiter",
+                 "\\t", "--chunk-size", "2"]) == 0
+    assert output_file.read_text() == _expected("D")
+    assert main(["convert", str(input_file), str(output_file), "--lat-column", "unknown",
+                 "--lon-column", "lon", "--delimiter", "\\t"]) == 1
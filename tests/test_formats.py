@@ -0,0 +1,92 @@
+"""
+Test routines for the compiled coordinate formats in package latloncalc
+Designed for use with pytest
+"""
+
+import io
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose, assert_equal
+
+from latloncalc.arrays import LatLonArray
+from latloncalc.formats import compile_format, compile_output_format
+from latloncalc.latlon import LatLon, Latitude, Longitude, string2geocoord
+
+
+def test_parse_against_string2geocoord():
+    """
+    Test that the compiled parser agrees with string2geocoord
+    """
+    cases = [("D", "5.8833", "-162.0833"),
+             ("d% %m% %S% %H", "5 52 59.88 N", "162 4 59.88 W"),
+             ("d%, %m%, %S%, %H", "5, 52, 59.88, N", "162, 4, 59.88, W"),
+             ("H%_%d%deg %M", "N_5deg 52.998", "W_162deg 4.998"),
+             ("H% %d%, %M", "S 5, 52.998", "E 162, 4.998")]
+    for format_str, lat_str, lon_str in cases:
+        for coord_str, coord_class in ((lat_str, Latitude), (lon_str, Longitude)):
+            expected = string2geocoord(coord_str, coord_class, format_str).decimal_degree
+            parser = compile_format(format_str, coord_class)
+            assert_equal(parser.parse(coord_str), expected)
+            assert_equal(parser.parse_array([coord_str] * 3), [expected] * 3)
+
+
+def test_parse_array():
+    """
+    Test parsing lists and arrays of strings, including per-row error collection
+    """
+    parser = compile_format("d% %m% %S% %H")
+    assert compile_format("d% %m% %S% %H") is parser  # Compiled formats are cached
+    values = parser.parse_array(np.array(["5 52 59.88 N", "162 4 59.88 W"]))
+    assert values.dtype == np.float64
+    assert_allclose(values, [5.8833, -162.0833])
+    with pytest.raises(ValueError):
+        parser.parse_array(["5 52 59.88 N", "not a coordinate"])
+    errors = []
+    values = parser.parse_array(["5 52 59.88 N", "not a coordinate", None, "162 4 59.88 W"],
+                                errors=errors)
+    assert_allclose(values, [5.8833, np.nan, np.nan, -162.0833])
+    assert_equal(errors, [(1, "not a coordinate"), (2, None)])
+    # Latitudes only accept N and S as hemisphere identifiers
+    with pytest.raises(ValueError):
+        compile_format("d% %m% %S% %H", Latitude).parse("162 4 59.88 W")
+    assert parser.parse_array([]).shape == (0,)
+
+
+def test_latlonarray_from_strings():
+    """
+    Test constructing a LatLonArray from coordinate strings
+    """
+    array = LatLonArray.from_strings(["5 52 59.88 N", "21 18 0 N"],
+                                     ["162 4 59.88 W", "157 49 0.12 W"], "d% %m% %S% %H")
+    assert_allclose(array.lat, [5.8833, 21.3])
+    assert_allclose(array.lon, [-162.0833, -157.8167])
+
+
+def test_format_array_against_to_string():
+    """
+    Test that the compiled formatter gives the same output as LatLon.to_string
+    """
+    rng = np.random.default_rng(2)
+    lat = np.concatenate([rng.uniform(-90, 90, 500), [0., -0., 90., -90., 5.8833]])
+    lon = np.concatenate([rng.uniform(-360, 360, 500), [0., -0., 180., -180., 197.9167]])
+    for format_str in ("D", "d% %m% %S% %H", "H%_%d%deg %M%\"", "d%_%M", "S% {%m%}"):
+        for n_digits in (2, 7):
+            lat_strs, lon_strs = LatLonArray(lat, lon).to_string(
+                format_str, n_digits_seconds=n_digits, n_digits_decimal_minutes=n_digits)
+            expected = [LatLon(*position).to_string(format_str, n_digits_seconds=n_digits,
+                                                    n_digits_decimal_minutes=n_digits)
+                        for position in zip(lat.tolist(), lon.tolist())]
+            assert_equal(list(zip(lat_strs, lon_strs)), expected)
+
+
+def test_formatter_write():
+    """
+    Test writing arrays of coordinates straight into a text buffer
+    """
+    formatter = compile_output_format("d% %m% %S% %H", n_digits_seconds=2)
+    assert formatter is compile_output_format("d% %m% %S% %H", n_digits_seconds=2)
+    assert formatter.format(Latitude(5.8833)) == "5 52 59.88 N"
+    buffer = io.StringIO()
+    formatter.write(buffer, [5.8833, 21.3], [-162.0833, -157.8167], delimiter=";", chunk_size=1)
+    assert buffer.getvalue() == "5 52 59.88 N;162 4 59.88 W\n21 18 0.00 N;157 49 0.12 W\n"
@@ -0,0 +1,186 @@
+"""
+Test routines for the geodesic engines in package latloncalc
+Designed for use with pytest
+"""
+
+import subprocess
+import sys
+import threading
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+from latloncalc.arrays import LatLonArray
+from latloncalc.cache import disable_inverse_cache, enable_inverse_cache
+from latloncalc.geodesic import (GeodesicEngine, HaversineEngine, available_backends,
+                                 clear_engine_cache, get_default_backend, get_engine,
+                                 register_backend, set_default_backend)
+from latloncalc.latlon import LatLon
+
+
+def _angle_difference(a, b):
+    return np.abs((np.asarray(a) - np.asarray(b) + 180) % 360 - 180)
+
+
+def _random_points(n=1000, seed=1):
+    rng = np.random.default_rng(seed)
+    lat1, lat2 = rng.uniform(-80, 80, (2, n))
+    lon1, lon2 = rng.uniform(-180, 180, (2, n))
+    return lon1, lat1, lon2, lat2
+
+
+def test_engine_cache():
+    """
+    Test that engines are created once and shared between calls and threads
+    """
+    clear_engine_cache()
+    engine = get_engine("WGS84")
+    assert get_engine("WGS84") is engine
+    assert get_engine("WGS84", backend="vincenty") is not engine
+    assert get_engine((6378137.0, 1 / 298.257223563)) is get_engine([6378137.0, 1 / 298.257223563])
+    engines = []
+    threads = [threading.Thread(target=lambda: engines.append(get_engine("GRS80")))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(e is engines[0] for e in engines)
+    with pytest.raises(ValueError):
+        get_engine("no_such_ellipsoid")
+    with pytest.raises(ValueError):
+        get_engine("WGS84", backend="no_such_backend")
+
+
+def test_numpy_backends_against_pyproj():
+    """
+    Test the vincenty and haversine backends against the pyproj backend
+    """
+    lon1, lat1, lon2, lat2 = _random_points()
+    az12, az21, dist = get_engine("WGS84").inv(lon1, lat1, lon2, lat2)
+    v_az12, v_az21, v_dist = get_engine("WGS84", "vincenty").inv(lon1, lat1, lon2, lat2)
+    assert_allclose(v_dist, dist, atol=1e-3)  # Vincenty agrees to within a mm
+    assert _angle_difference(v_az12, az12).max() < 1e-7
+    assert _angle_difference(v_az21, az21).max() < 1e-7
+    # On a true sphere the haversine formula is exact
+    az12, az21, dist = get_engine("sphere").inv(lon1, lat1, lon2, lat2)
+    h_az12, h_az21, h_dist = get_engine("sphere", "haversine").inv(lon1, lat1, lon2, lat2)
+    assert_allclose(h_dist, dist, atol=1e-3)
+    assert _angle_difference(h_az12, az12).max() < 1e-7
+    assert _angle_difference(h_az21, az21).max() < 1e-7
+    # Forward problem
+    lon, lat, back = get_engine("WGS84").fwd(lon1, lat1, az12, dist)
+    for backend in ("vincenty", "haversine"):
+        ellipse = "WGS84" if backend == "vincenty" else "sphere"
+        ref_lon, ref_lat, ref_back = get_engine(ellipse).fwd(lon1, lat1, az12, dist)
+        b_lon, b_lat, b_back = get_engine(ellipse, backend).fwd(lon1, lat1, az12, dist)
+        assert _angle_difference(b_lon, ref_lon).max() < 1e-7
+        assert_allclose(b_lat, ref_lat, atol=1e-7)
+        assert _angle_difference(b_back, ref_back).max() < 1e-7
+
+
+def test_haversine_error_bounds():
+    """
+    Test the maximum errors of the haversine backend against WGS84 given in its documentation
+    """
+    rng = np.random.default_rng(2)
+    n = 200000
+    lon1 = rng.uniform(-180, 180, n)
+    lat1 = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))  # Uniform over the sphere
+    azimuth = rng.uniform(-180, 180, n)
+    distance = 10 ** rng.uniform(0, np.log10(1.9e7), n)  # From 1 m to 19000 km
+    wgs84, haversine = get_engine("WGS84"), get_engine("WGS84", "haversine")
+    lon2, lat2, _ = wgs84.fwd(lon1, lat1, azimuth, distance)
+    az12, az21, dist = wgs84.inv(lon1, lat1, lon2, lat2)
+    h_az12, h_az21, h_dist = haversine.inv(lon1, lat1, lon2, lat2)
+    assert (np.abs(h_dist - dist) / dist).max() < 0.0057
+    for bound, maximum_distance in ((0.2, 1e7), (1.7, 1.9e7)):
+        selection = dist < maximum_distance
+        assert _angle_difference(h_az12, az12)[selection].max() < bound
+        assert _angle_difference(h_az21, az21)[selection].max() < bound
+    h_lon2, h_lat2, _ = haversine.fwd(lon1, lat1, azimuth, distance)
+    assert (wgs84.inv(lon2, lat2, h_lon2, h_lat2)[2] / distance).max() < 0.0057
+
+
+def test_default_backend():
+    """
+    Test selecting the backend of all calculations globally
+    """
+    palmyra, honolulu = LatLon(5.8833, -162.0833), LatLon(21.3, -157.8167)
+    ports = LatLonArray([5.8833, 21.3], [-162.0833, -157.8167])
+    enable_inverse_cache()  # Cached results must not depend on the default backend
+    exact = palmyra.distance(honolulu)
+    spherical = palmyra.distance(honolulu, backend="haversine")
+    assert abs(spherical - exact) > 1.
+    previous = set_default_backend("haversine")
+    try:
+        assert previous == "pyproj" and get_default_backend() == "haversine"
+        assert palmyra.distance(honolulu) == spherical
+        assert palmyra.distance(honolulu, backend="pyproj") == exact
+        assert_allclose(ports.distance(palmyra), [0., spherical])
+        spherical_offset = palmyra.offset(45., 100., backend="haversine")
+        assert palmyra.offset(45., 100.).almost_equal(spherical_offset)
+    finally:
+        set_default_backend(previous)
+        disable_inverse_cache()
+    assert palmyra.distance(honolulu) == exact
+    with pytest.raises(ValueError):
+        set_default_backend("no_such_backend")
+
+
+def test_scalar_output():
+    """
+    Test that scalar input gives Python floats for all backends
+    """
+    for backend in available_backends():
+        results = get_engine("WGS84", backend).inv(-162.0833, 5.8833, -157.8167, 21.3)
+        assert all(type(value) is float for value in results)
+        results = get_engine("WGS84", backend).fwd(-162.0833, 5.8833, 14.69, 1766.69e3)
+        assert all(type(value) is float for value in results)
+
+
+def test_latlon_backends():
+    """
+    Test LatLon methods using the backend keyword
+    """
+    palmyra, honolulu = LatLon(5.8833, -162.0833), LatLon(21.3, -157.8167)
+    assert '{:.3f}'.format(palmyra.distance(honolulu, backend="vincenty")) == '1766.691'
+    assert abs(palmyra.distance(honolulu, ellipse="sphere", backend="haversine") -
+               palmyra.distance(honolulu, ellipse="sphere")) < 1e-6
+    hnl = palmyra.offset(palmyra.heading_initial(honolulu, backend="vincenty"),
+                         palmyra.distance(honolulu), backend="vincenty")
+    assert honolulu.almost_equal(hnl)
+    assert honolulu.almost_equal(hnl, backend="vincenty")
+
+
+def test_register_backend():
+    """
+    Test adding a custom backend
+    """
+    class FlatEarth(GeodesicEngine):
+        backend = "flat"
+
+        def inv(self, lon1, lat1, lon2, lat2):
+            return 0., 180., 1000.
+
+    register_backend("flat", FlatEarth)
+    assert "flat" in available_backends()
+    assert isinstance(get_engine("WGS84", "flat"), FlatEarth)
+    assert LatLon(0, 0).distance(LatLon(1, 1), backend="flat") == 1.
+    register_backend("flat", HaversineEngine)
+    assert isinstance(get_engine("WGS84", "flat"), HaversineEngine)
+
+
+def test_lazy_pyproj_import():
+    """
+    Test that parsing, formatting and GeoVector arithmetic do not import pyproj
+    """
+    code = ("import sys, latloncalc; from latloncalc.latlon import GeoVector, string2latlon; "
+            "position = string2latlon('5 52 59.88 N', '162 4 59.88 W', 'd% %m% %S% %H'); "
+            "position.to_string('d%deg %M%min'); GeoVector(1., 2.) + GeoVector(3., 4.); "
+            "print('pyproj' in sys.modules); position.distance(position); "
+            "print('pyproj' in sys.modules)")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            check=True).stdout
+    assert output.split() == ["False", "True"]
@@ -0,0 +1,75 @@
+"""
+Test routines for the geohash functions in package latloncalc
+Designed for use with pytest
+"""
+
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+
+from latloncalc.arrays import LatLonArray
+from latloncalc.geohash import (GeohashBuckets, decode, encode, geohash2latlon, neighbours)
+from latloncalc.latlon import LatLon, string2latlon
+
+
+def test_encode_decode():
+    """
+    Test encoding and decoding against known geohashes and the round trip of random positions
+    """
+    assert encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    palmyra = string2latlon("5 52 59.88 N", "162 4 59.88 W", "d% %m% %S% %H")
+    assert palmyra.geohash(6) == "83h9rx"
+    lat, lon, lat_error, lon_error = decode("u4pruydqqvj")
+    assert abs(lat - 57.64911) <= lat_error and abs(lon - 10.40744) <= lon_error
+    assert geohash2latlon("83h9rx").geohash(6) == "83h9rx"
+
+    rng = np.random.default_rng(1)
+    lat, lon = rng.uniform(-90, 90, 1000), rng.uniform(-180, 180, 1000)
+    for precision in (1, 5, 12):
+        geohashes = encode(lat, lon, precision)
+        assert_array_equal(geohashes, [LatLon(y, x).geohash(precision) for y, x in zip(lat, lon)])
+        lat_centre, lon_centre, lat_error, lon_error = decode(geohashes)
+        assert (abs(lat_centre - lat) <= lat_error).all()
+        assert (abs(lon_centre - lon) <= lon_error).all()
+        assert_array_equal(encode(lat_centre, lon_centre, precision), geohashes)
+    with pytest.raises(ValueError):
+        encode(0., 0., 13)
+    with pytest.raises(ValueError):
+        decode("u4pa")
+
+
+def test_neighbours():
+    """
+    Test neighbouring cells, including the antimeridian and the poles
+    """
+    assert neighbours("u4pruydqqvj") == {
+        "n": "u4pruydqqvm", "ne": "u4pruydqqvq", "e": "u4pruydqqvn", "se": "u4pruydqquy",
+        "s": "u4pruydqquv", "sw": "u4pruydqquu", "w": "u4pruydqqvh", "nw": "u4pruydqqvk"}
+    assert neighbours("b") == {"n": "", "ne": "", "e": "c", "se": "9", "s": "8", "sw": "x",
+                               "w": "z", "nw": ""}
+    result = neighbours(["gzzz", "0000"])
+    assert_array_equal(result["e"], ["upbp", "0002"])
+    assert_array_equal(result["w"], ["gzzx", "pbpb"])
+
+
+def test_buckets():
+    """
+    Test grouping, looking up, joining and deduplicating positions by geohash
+    """
+    positions = LatLonArray([5.8833, 21.3, 5.8834, -12.05],
+                           [-162.0833, -157.8167, -162.0833, -77.0333])
+    buckets = GeohashBuckets(positions, precision=6)
+    assert_array_equal(buckets.geohashes, encode(positions.lat, positions.lon, 6))
+    assert_array_equal(buckets.lookup("83h9"), [0, 2])
+    assert_array_equal(buckets.lookup("83h9rxn89"), [0, 2])
+    assert len(buckets.lookup("s")) == 0
+    assert_array_equal(buckets.lookup_near(LatLon(5.8833, -162.0833)), [0, 2])
+    assert {cell: list(indices) for cell, indices in buckets.groups().items()} == {
+        "83h9rx": [0, 2], "87zc0v": [1], "6mc5rn": [3]}
+    assert_array_equal(buckets.deduplicate(), [0, 1, 3])
+
+    other = GeohashBuckets([LatLon(5.8833, -162.0833), LatLon(0, 0), LatLon(21.3, -157.8167)])
+    pairs = sorted(zip(*buckets.join(other)))
+    assert pairs == [(0, 0), (1, 2), (2, 0)]
+    with pytest.raises(ValueError):
+        buckets.join(GeohashBuckets(positions, precision=5))
@@ -0,0 +1,63 @@
+"""
+Test routines for the instrumentation of package latloncalc
+Designed for use with pytest
+"""
+
+import os
+import subprocess
+import sys
+
+from latloncalc import instrument
+from latloncalc.arrays import LatLonArray
+from latloncalc.latlon import GeoCoord, LatLon, Latitude, string2latlon
+
+
+def test_instrumented():
+    """
+    Test counting the instrumented operations and restoring the original functions
+    """
+    original_update = GeoCoord._update
+    palmyra = LatLon(5.8833, -162.0833)
+    calls = []
+    with instrument.instrumented(callback=lambda name, seconds: calls.append(name)):
+        assert instrument.is_enabled()
+        assert GeoCoord._update is not original_update
+        palmyra.distance(LatLon(21.3, -157.8167))
+        palmyra.offset(45., 10.)
+        string2latlon(*palmyra.to_string("d% %m% %S% %H"), "d% %m% %S% %H")
+        Latitude(5.8833).minute = 10
+        LatLonArray([5.8833, 21.3], [-162.0833, -157.8167]).offset(45., 10.)
+    assert not instrument.is_enabled()
+    assert GeoCoord._update is original_update
+    statistics = instrument.snapshot()
+    assert statistics["LatLon._pyproj_inv"]["count"] == 1
+    assert statistics["_solve_inverse"]["count"] == 1
+    assert statistics["LatLon.offset"]["count"] == 1
+    assert statistics["LatLon.to_string"]["count"] == 1
+    assert statistics["GeoCoord.to_string"]["count"] == 2
+    assert statistics["string2geocoord"]["count"] == 2
+    assert statistics["GeoCoord._update"]["count"] >= 3
+    assert statistics["batch_offset"]["count"] == 1
+    assert "LatLonArray._pyproj_inv" not in statistics
+    for value in statistics.values():
+        assert 0 <= value["min_time"] <= value["mean_time"] <= value["max_time"]
+        assert abs(value["total_time"] - value["count"] * value["mean_time"]) < 1e-9
+    assert sorted(set(calls)) == sorted(statistics)
+    # Nothing is recorded while disabled
+    palmyra.distance(LatLon(21.3, -157.8167))
+    assert instrument.snapshot() == statistics
+    instrument.reset()
+    assert instrument.snapshot() == {}
+
+
+def test_instrument_environment():
+    """
+    Test enabling instrumentation with the environment variable
+    """
+    code = ("import latloncalc.instrument as i; from latloncalc.latlon import LatLon; "
+            "LatLon(1, 2).offset(3, 4); print(i.is_enabled(), i.snapshot()['LatLon.offset']"
+            "['count'])")
+    environment = dict(os.environ, LATLONCALC_INSTRUMENT="1")
+    output = subprocess.run([sys.executable, "-c", code], env=environment, capture_output=True,
+                            text=True, check=True).stdout
+    assert output.split() == ["True", "1"]
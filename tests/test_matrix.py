@@ -0,0 +1,43 @@
+"""
+Test routines for the distance matrix in package latloncalc
+Designed for use with pytest
+"""
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+from latloncalc.latlon import LatLon
+from latloncalc.matrix import distance_matrix
+
+
+def test_distance_matrix(random_positions):
+    """
+    Test the distance matrix against LatLon.distance for several tile sizes
+    """
+    a, b = random_positions(7, 1), random_positions(5, 2)
+    expected = np.array([[p.distance(q) for q in b.to_latlons()] for p in a.to_latlons()])
+    for block_size in (1, 3, 512):
+        assert_allclose(distance_matrix(a, b, block_size=block_size), expected)
+    assert_allclose(distance_matrix(a.to_latlons(), b.to_latlons(), block_size=2), expected)
+    assert_allclose(distance_matrix(a, b, block_size=2, n_jobs=3), expected)
+    square = distance_matrix(a)
+    assert_allclose(square, square.T)
+    assert_allclose(np.diag(square), 0.)
+    with pytest.raises(ValueError):
+        distance_matrix(a, b, out=np.empty((5, 7)))
+
+
+def test_distance_matrix_memmap(tmp_path, random_positions):
+    """
+    Test writing the distance matrix into a memory-mapped array
+    """
+    a, b = random_positions(10, 3), [LatLon(5.8833, -162.0833), LatLon(21.3, -157.8167)]
+    out = np.lib.format.open_memmap(str(tmp_path / "matrix.npy"), mode="w+", dtype=np.float64,
+                                    shape=(10, 2))
+    result = distance_matrix(a, b, ellipse="sphere", block_size=4, out=out)
+    assert result is out
+    out.flush()
+    stored = np.load(str(tmp_path / "matrix.npy"))
+    expected = np.column_stack([a.distance(position, ellipse="sphere") for position in b])
+    assert_allclose(stored, expected)
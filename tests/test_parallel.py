@@ -0,0 +1,44 @@
+"""
+Test routines for the parallel batch execution in package latloncalc
+Designed for use with pytest
+"""
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose, assert_array_equal
+
+from latloncalc.arrays import LatLonArray, batch_offset
+from latloncalc.latlon import LatLon
+from latloncalc.parallel import BatchExecutor
+
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+def test_batch_executor(kind, random_positions):
+    """
+    Test the chunked inverse and forward operations against the vectorized LatLonArray methods
+    """
+    a, b = random_positions(23, 1), random_positions(23, 2)
+    palmyra = LatLon(5.8833, -162.0833)
+    with BatchExecutor(kind=kind, n_jobs=2, chunk_size=5) as executor:
+        expected = a._pyproj_inv(b)
+        for key, value in executor.inverse(a, b).items():
+            assert_array_equal(value, expected[key])
+        assert [timing.index for timing in executor.timings] == [0, 1, 2, 3, 4]
+        assert [(timing.start, timing.stop) for timing in executor.timings][-1] == (20, 23)
+        assert all(timing.seconds >= 0 for timing in executor.timings)
+        assert_array_equal(executor.distance(a.to_latlons(), palmyra), a.distance(palmyra))
+        assert_array_equal(executor.heading_initial(a, b), a.heading_initial(b))
+        assert_allclose(executor.heading_reverse(a, b, backend="haversine"),
+                        a.heading_reverse(b, backend="haversine"))
+        destinations, back_bearings = executor.offset(a, np.arange(23.) * 15, 250.)
+        expected_destinations, expected_back_bearings = batch_offset(a, np.arange(23.) * 15, 250.)
+        assert destinations == expected_destinations
+        assert_array_equal(back_bearings, expected_back_bearings)
+        destinations, _ = executor.offset(palmyra, np.arange(0., 360., 30.), 10.)
+        assert len(destinations) == 12
+        with pytest.raises(ValueError):
+            executor.distance(a, b[:3])
+    # Small batches are solved in the calling thread
+    executor = BatchExecutor(kind=kind, chunk_size=100)
+    assert_array_equal(executor.distance(a, b), a.distance(b))
+    assert len(executor.timings) == 1 and executor._pool is None
@@ -0,0 +1,51 @@
+"""
+Test routines for the projection of coordinate arrays in package latloncalc
+Designed for use with pytest
+"""
+
+import threading
+
+import numpy as np
+import pyproj
+from numpy.testing import assert_allclose
+
+from latloncalc.arrays import LatLonArray
+from latloncalc.latlon import LatLon
+from latloncalc.projection import Projection, get_projection, project, unproject
+
+
+def test_projection():
+    """
+    Test projecting arrays in chunks against pyproj and back
+    """
+    rng = np.random.default_rng(5)
+    positions = LatLonArray(rng.uniform(0, 10, 25), rng.uniform(-168, -160, 25))
+    transformer = pyproj.Transformer.from_crs("EPSG:4326", "EPSG:32603", always_xy=True)
+    expected_x, expected_y = transformer.transform(positions.lon, positions.lat)
+    for chunk_size in (1, 7, 100):
+        x, y = Projection(32603, chunk_size=chunk_size).forward(positions)
+        assert_allclose(x, expected_x)
+        assert_allclose(y, expected_y)
+    x, y = project(positions.to_latlons(), "EPSG:32603")
+    assert_allclose(x, expected_x)
+    back = unproject(x, y, 32603)
+    assert_allclose(back.lat, positions.lat, atol=1e-9)
+    assert_allclose(back.lon, positions.lon, atol=1e-9)
+    # A Projection can be passed to LatLon.project
+    x, y = LatLon(5.8833, -162.0833).project(get_projection(32603))
+    assert int(x) == 822995 and int(y) == 651147
+
+
+def test_projection_cache():
+    """
+    Test that projections are shared and that each thread uses its own transformers
+    """
+    projection = get_projection(32603)
+    assert get_projection("EPSG:32603") is projection
+    assert get_projection(pyproj.CRS(3857)) is get_projection(pyproj.CRS(3857))
+    transformers = []
+    thread = threading.Thread(target=lambda: transformers.append(projection._transformers()))
+    thread.start()
+    thread.join()
+    assert transformers[0][0] is not projection._transformers()[0]
+    assert projection._transformers()[0] is projection._transformers()[0]
@@ -0,0 +1,96 @@
+"""
+Test routines for track simplification in package latloncalc
+Designed for use with pytest
+"""
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from latloncalc.geodesic import get_engine
+from latloncalc.latlon import LatLon
+from latloncalc.simplify import douglas_peucker, visvalingam
+from latloncalc.track import Track
+
+
+def _random_track(n, seed):
+    rng = np.random.default_rng(seed)
+    return np.cumsum(rng.normal(0, 0.01, n)), 179.9 + np.cumsum(rng.normal(0, 0.01, n))
+
+
+def _cross_track(position, start, end):
+    """
+    Geodesic cross-track distance in km of position to the leg from start to end (or the distance
+    to the nearest end point if position lies beyond the leg)
+    """
+    radius = 6371.0088
+    angle = np.radians(start.heading_initial(position) - start.heading_initial(end))
+    along = start.distance(position) / radius
+    if np.cos(angle) < 0 or along * np.cos(angle) > start.distance(end) / radius:
+        return min(position.distance(start), position.distance(end))
+    return abs(np.arcsin(np.sin(along) * np.sin(angle))) * radius
+
+
+def test_douglas_peucker():
+    """
+    Test that all removed positions are within the tolerance of the simplified track, across the
+    antimeridian
+    """
+    lat, lon = _random_track(500, 1)
+    positions = Track(lat, lon).to_latlons()
+    for tolerance in (0.5, 5.):
+        kept = douglas_peucker(lat, lon, tolerance)
+        assert kept[0] == 0 and kept[-1] == len(lat) - 1
+        assert 2 < len(kept) < len(lat)
+        for start, end in zip(kept[:-1], kept[1:]):
+            for i in range(start + 1, end):
+                error = _cross_track(positions[i], positions[start], positions[end])
+                assert error <= tolerance * 1.005
+    assert_array_equal(douglas_peucker([0., 0.001, 0., 0.5, 0.], [0., 1., 2., 3., 4.], 1.),
+                       [0, 2, 3, 4])
+    assert_array_equal(douglas_peucker([1., 1., 1.], [2., 2., 2.], 1.), [0, 2])
+    assert_array_equal(douglas_peucker([1., 2.], [2., 3.], 1.), [0, 1])
+
+    track = Track(lat, lon)
+    simplified = track.simplify(5.)
+    assert_array_equal(simplified.lat, lat[douglas_peucker(lat, lon, 5.)])
+    assert simplified.length <= track.length
+
+
+def test_douglas_peucker_geodesic_tolerance():
+    """
+    Test that the tolerance is a geodesic cross-track distance, using positions at a known
+    distance from the middle of long legs, where the geodesic and the great circle separate
+    """
+    engine = get_engine("WGS84")
+    rng = np.random.default_rng(3)
+    n = 200
+    lat1, lon1 = rng.uniform(-70, 70, n), rng.uniform(-180, 180, n)
+    azimuth, length = rng.uniform(-180, 180, n), rng.uniform(200e3, 2000e3, n)
+    middle_lon, middle_lat, back_azimuth = engine.fwd(lon1, lat1, azimuth, length / 2)
+    lon2, lat2, _ = engine.fwd(middle_lon, middle_lat, back_azimuth + 180, length / 2)
+    tolerance = 0.1 * 10 ** rng.uniform(0, 2, n)  # 100 m to 10 km
+    for factor, n_kept in ((0.999, 2), (1.001, 3)):
+        # The geodesic perpendicular to the leg at its middle ends at the given distance
+        lon, lat, _ = engine.fwd(middle_lon, middle_lat, back_azimuth + 90,
+                                 factor * tolerance * 1000)
+        for i in range(n):
+            kept = douglas_peucker([lat1[i], lat[i], lat2[i]], [lon1[i], lon[i], lon2[i]],
+                                   tolerance[i])
+            assert len(kept) == n_kept
+
+
+def test_visvalingam():
+    """
+    Test that positions are removed in order of effective area
+    """
+    lat, lon = _random_track(500, 2)
+    kept_small = visvalingam(lat, lon, 0.01)
+    kept_large = visvalingam(lat, lon, 10.)
+    assert kept_small[0] == 0 and kept_small[-1] == len(lat) - 1
+    assert len(kept_large) < len(kept_small) < len(lat)
+    assert set(kept_large) <= set(kept_small)
+    # A position on a straight leg has no area, a detour of 1 km over a 100 km leg has 50 km2
+    line = [LatLon(0., 0.), LatLon(0., 0.5), LatLon(0., 1.), LatLon(0.009, 1.5), LatLon(0., 2.)]
+    lat, lon = [p.lat.decimal_degree for p in line], [p.lon.decimal_degree for p in line]
+    assert_array_equal(visvalingam(lat, lon, 40.), [0, 2, 3, 4])
+    assert_array_equal(visvalingam(lat, lon, 60.), [0, 4])
@@ -0,0 +1,91 @@
+"""
+Test routines for the spatial index in package latloncalc
+Designed for use with pytest
+"""
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+
+from latloncalc.latlon import LatLon
+from latloncalc.spatial import SpatialIndex
+
+
+def test_nearest_against_brute_force(random_positions):
+    """
+    Test nearest neighbour queries against distances to all positions
+    """
+    positions = random_positions(3000, 1, sphere=True)
+    queries = random_positions(50, 2, sphere=True)
+    for ellipse in ("WGS84", "sphere"):
+        index = SpatialIndex(positions, ellipse=ellipse, leaf_size=8)
+        distances, indices = index.nearest_many(queries, k=4)
+        assert distances.shape == indices.shape == (50, 4)
+        for row, query in enumerate(queries.to_latlons()):
+            brute = positions.distance(query, ellipse=ellipse)
+            assert_allclose(distances[row], np.sort(brute)[:4])
+            assert_allclose(brute[indices[row]], distances[row])
+    distance, index = SpatialIndex(positions).nearest(positions[17])
+    assert_equal(index, [17])
+    assert_allclose(distance, [0.])
+
+
+def test_small_collections():
+    """
+    Test an index with fewer positions than requested neighbours
+    """
+    ports = [LatLon(5.8833, -162.0833), LatLon(21.3, -157.8167)]
+    index = SpatialIndex(ports)
+    distances, indices = index.nearest(LatLon(20, -155), k=5)
+    assert_equal(indices, [1, 0])
+    assert_allclose(distances[1], LatLon(20, -155).distance(ports[0]))
+
+
+def test_save_load(tmp_path, random_positions):
+    """
+    Test storing an index and loading it again
+    """
+    positions = random_positions(500, 3, sphere=True)
+    queries = random_positions(10, 4, sphere=True)
+    index = SpatialIndex(positions, ellipse=(6378137.0, 1 / 298.257223563), leaf_size=4)
+    index.save(str(tmp_path / "index.npz"))
+    loaded = SpatialIndex.load(str(tmp_path / "index.npz"))
+    assert loaded.ellipse == index.ellipse and loaded.leaf_size == 4
+    for expected, result in zip(index.nearest_many(queries, k=3), loaded.nearest_many(queries, k=3)):
+        assert_equal(result, expected)
+
+
+def test_within_distance(random_positions):
+    """
+    Test radius queries, including circles crossing the antimeridian and around a pole
+    """
+    positions = random_positions(5000, 5, sphere=True)
+    index = SpatialIndex(positions, leaf_size=16)
+    for point, radius in ((LatLon(0, 179.9), 800.), (LatLon(89.5, 0), 400.), (LatLon(-30, 20), 0.)):
+        distances, indices = index.within_distance(point, radius)
+        brute = positions.distance(point)
+        assert_equal(np.sort(indices), np.flatnonzero(brute <= radius))
+        assert_allclose(distances, brute[indices])
+        assert np.all(np.diff(distances) >= 0)
+    results = index.within_distance_many([LatLon(0, 179.9), LatLon(0, -179.9)], [800., 0.])
+    assert len(results) == 2 and len(results[0][1]) > 0 and len(results[1][1]) == 0
+    queries = random_positions(20, 7, sphere=True)
+    for point, (distances, indices) in zip(queries.to_latlons(),
+                                           index.within_distance_many(queries, 1000.)):
+        expected_distances, expected_indices = index.within_distance(point, 1000.)
+        assert_equal(indices, expected_indices)
+        assert_allclose(distances, expected_distances)
+
+
+def test_within_box(random_positions):
+    """
+    Test bounding box queries, including boxes crossing the antimeridian
+    """
+    positions = random_positions(5000, 6, sphere=True)
+    index = SpatialIndex(positions, leaf_size=16)
+    for south, west, north, east in ((-10, 170, 10, -170), (0, 0, 30, 90), (-90, -180, 90, 180),
+                                     (-20, -100, 40, 150), (60, 175, 90, -179)):
+        width = (east - west) % 360 if east != 180 or west != -180 else 360
+        offset = (positions.lon - west + 360) % 360
+        expected = np.flatnonzero((positions.lat >= south) & (positions.lat <= north) &
+                                  (offset <= width))
+        assert_equal(index.within_box(south, west, north, east), expected)
@@ -0,0 +1,82 @@
+"""
+Test routines for the asyncio feed pipeline in package latloncalc
+Designed for use with pytest
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+from latloncalc.latlon import LatLon
+from latloncalc.stream import FeedTracker, track_feed
+
+
+def _messages(n, seed):
+    rng = np.random.default_rng(seed)
+    object_ids = rng.choice(["a", "b", "c"], n).tolist()
+    lats, lons = rng.uniform(-1, 1, n).tolist(), rng.uniform(-1, 1, n).tolist()
+    return [(object_id, LatLon(lat, lon)) for object_id, lat, lon in zip(object_ids, lats, lons)]
+
+
+async def _feed(messages, pause_every=None):
+    for i, message in enumerate(messages):
+        if pause_every and i % pause_every == 0:
+            await asyncio.sleep(0.01)
+        yield message
+
+
+def _collect(feed, **kwargs):
+    async def main():
+        return [update async for update in track_feed(feed, **kwargs)]
+    return asyncio.run(main())
+
+
+def test_track_feed():
+    """
+    Test the updates of interleaved objects against LatLon.distance and LatLon.heading_initial
+    """
+    messages = _messages(40, 1)
+    previous = {}
+    expected = []
+    for object_id, position in messages:
+        if object_id in previous:
+            expected.append((position.distance(previous[object_id]),
+                             previous[object_id].heading_initial(position)))
+        else:
+            expected.append((0., np.nan))
+        previous[object_id] = position
+    # Small batches, windows which close while the feed pauses, and one batch
+    for kwargs in ({"max_batch": 3}, {"window": 0.001}, {"window": 10.}):
+        updates = _collect(_feed(messages, pause_every=7), **kwargs)
+        assert [update.position for update in updates] == [p for _, p in messages]
+        assert_allclose([update.leg_distance for update in updates], [e[0] for e in expected])
+        assert_allclose([update.heading_initial for update in updates], [e[1] for e in expected])
+        for object_id in "abc":
+            legs = [update for update in updates if update.object_id == object_id]
+            assert [update.n_fixes for update in legs] == list(range(1, len(legs) + 1))
+            assert_allclose([update.cumulative_distance for update in legs],
+                            np.cumsum([update.leg_distance for update in legs]))
+
+
+def test_feed_tracker():
+    """
+    Test that a tracker keeps its state between batches and feeds, and that feed errors are raised
+    """
+    messages = _messages(10, 2)
+    tracker = FeedTracker()
+    expected = tracker.update(messages)
+    tracker.reset()
+    updates = tracker.update(messages[:4]) + tracker.update(messages[4:])
+    assert_allclose([update.cumulative_distance for update in updates],
+                    [update.cumulative_distance for update in expected])
+    # The heading of a leg of zero length is undefined
+    assert np.isnan(tracker.update([("d", LatLon(1, 1))] * 2)[1].heading_initial)
+
+    async def broken_feed():
+        yield messages[0]
+        raise RuntimeError("connection lost")
+
+    with pytest.raises(RuntimeError):
+        _collect(broken_feed())
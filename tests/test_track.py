@@ -0,0 +1,53 @@
+"""
+Test routines for tracks in package latloncalc
+Designed for use with pytest
+"""
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+from latloncalc.latlon import LatLon
+from latloncalc.track import Track
+
+POSITIONS = [LatLon(5.8833, -162.0833), LatLon(21.3, -157.8167), LatLon(21.3, -156.0),
+             LatLon(21.3, -156.0), LatLon(-12.05, -77.0333)]
+
+
+def test_track_legs():
+    """
+    Test the legs of a track against LatLon distances and headings
+    """
+    track = Track.from_latlons(POSITIONS)
+    pairs = list(zip(POSITIONS[:-1], POSITIONS[1:]))
+    assert_allclose(track.leg_distances(), [p.distance(q) for p, q in pairs])
+    assert_allclose(track.leg_headings(), [p.heading_initial(q) for p, q in pairs])
+    assert_allclose(track.cumulative_distance(),
+                    np.concatenate([[0.], np.cumsum([p.distance(q) for p, q in pairs])]))
+    assert track.length == pytest.approx(sum(p.distance(q) for p, q in pairs))
+    assert len(track[1:3]) == 2 and track[1:3].length == track.leg_distances()[1]
+    assert track[0].almost_equal(POSITIONS[0])
+    assert Track([1.], [2.]).length == 0.
+
+
+def test_track_resample():
+    """
+    Test resampling a track at a fixed spacing
+    """
+    track = Track.from_latlons(POSITIONS, ellipse="sphere")
+    resampled = track.resample(100.)
+    assert resampled.ellipse == "sphere"
+    assert len(resampled) == int(np.ceil(track.length / 100.)) + 1
+    assert resampled[0].almost_equal(POSITIONS[0])
+    assert resampled[-1].almost_equal(POSITIONS[-1])
+    # Consecutive positions on the same leg are exactly one spacing apart
+    cumulative_distance = track.cumulative_distance()
+    distance = np.arange(len(resampled) - 1) * 100.
+    same_leg = (np.searchsorted(cumulative_distance, distance, side="right") ==
+                np.searchsorted(cumulative_distance, distance + 100., side="right"))
+    assert_allclose(resampled.leg_distances()[:-1][same_leg[:-1]], 100.)
+    # Every position lies on the track
+    for position, d in zip(resampled.to_latlons()[:4], distance[:4]):
+        assert position.distance(POSITIONS[0], ellipse="sphere") == pytest.approx(d)
+    with pytest.raises(ValueError):
+        track.resample(0.)